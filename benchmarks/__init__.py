@@ -0,0 +1 @@
+# Offline benchmark / evaluation harnesses (run with `python -m benchmarks.<name>`)
@@ -0,0 +1,119 @@
+"""
+Shared helpers for the benchmark harnesses: corpus loading and latency stats.
+"""
+import json
+import math
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+DEFAULT_QUERIES = [
+    "backend engineer jakarta",
+    "python developer remote",
+    "data analyst sql power bi",
+    "staff admin gudang surabaya",
+    "react native mobile developer",
+    "akuntansi pajak brevet",
+    "customer service bahasa inggris",
+    "devops kubernetes aws",
+    "digital marketing seo",
+    "sales executive otomotif",
+]
+
+
+def load_jobs(jsonl_path: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Load job dicts either from a file (JSON list, {"data": [...]} or NDJSON)
+    or from Postgres jobs_docs.
+    """
+    if jsonl_path:
+        with open(jsonl_path, encoding="utf-8") as f:
+            raw = f.read().strip()
+        if raw.startswith("[") or raw.startswith("{\"data\""):
+            data = json.loads(raw)
+            jobs = data.get("data", []) if isinstance(data, dict) else data
+        else:
+            jobs = [json.loads(line) for line in raw.splitlines() if line.strip()]
+        return jobs[:limit] if limit else jobs
+
+    from database.database import SessionLocal
+    from database.models import Job
+
+    db = SessionLocal()
+    try:
+        q = db.query(Job).order_by(Job.job_id)
+        if limit:
+            q = q.limit(limit)
+        return [
+            {c.name: getattr(j, c.name) for c in Job.__table__.columns}
+            for j in q.all()
+        ]
+    finally:
+        db.close()
+
+
+def load_queries(path: Optional[str] = None) -> List[str]:
+    if not path:
+        return list(DEFAULT_QUERIES)
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def time_calls(fn: Callable[[Any], Any], inputs: List[Any], repeat: int = 1) -> Dict[str, float]:
+    """
+    Run fn over inputs `repeat` times and return latency stats in ms.
+    """
+    timings: List[float] = []
+    for _ in range(repeat):
+        for x in inputs:
+            t0 = time.perf_counter()
+            fn(x)
+            timings.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(statistics.fmean(timings), 3) if timings else 0.0,
+    }
+
+
+def recall_at_k(reference: List[Any], candidate: List[Any], k: int) -> float:
+    ref = set(reference[:k])
+    if not ref:
+        return 1.0
+    return len(ref & set(candidate[:k])) / len(ref)
+
+
+def reciprocal_rank(relevant: List[Any], candidate: List[Any]) -> float:
+    rel = set(relevant)
+    for i, c in enumerate(candidate, start=1):
+        if c in rel:
+            return 1.0 / i
+    return 0.0
+
+
+def ndcg_at_k(relevant: List[Any], candidate: List[Any], k: int) -> float:
+    """
+    Binary-relevance nDCG@k.
+    """
+    rel = set(relevant)
+    dcg = sum(1.0 / math.log2(i + 2) for i, c in enumerate(candidate[:k]) if c in rel)
+    ideal = sum(1.0 / math.log2(i + 2) for i in range(min(len(rel), k)))
+    return dcg / ideal if ideal else 0.0
+
+
+def load_qrels(path: str) -> List[Dict[str, Any]]:
+    """
+    JSONL: {"query": "...", "relevant": ["job_id", ...]} per line.
+    """
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [{"query": r["query"], "relevant": [str(j) for j in r["relevant"]]} for r in rows if r.get("relevant")]
@@ -0,0 +1,108 @@
+"""
+Recall / latency trade-off of shortened dense vectors on our own corpus.
+
+Chunks (document_splitting_multi over jobs_docs or a job file) and the
+queries are embedded ONCE at the model's full size, then truncated +
+re-normalised to each candidate dimension (same as utils.dense.fit_dimensions).
+Recall@k is measured against the full-size ranking.
+
+Usage:
+    python -m benchmarks.dimensions --dims 256 512 768 1024 --limit 2000
+    python -m benchmarks.dimensions --jobs jobs.json --queries queries.txt --qdrant-url http://localhost:6333
+"""
+import argparse
+import json
+from typing import List
+
+from qdrant_client import QdrantClient, models
+
+from retrieval.hybrid import embed_openai
+from store.helper import document_splitting_multi, embed_texts_openai
+from utils.dense import fit_dimensions
+
+from .common import load_jobs, load_queries, recall_at_k, time_calls
+
+
+def embed_full(texts: List[str], batch_size: int = 128) -> List[List[float]]:
+    out: List[List[float]] = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        vectors = embed_texts_openai(batch, dimensions=0)
+        if len(vectors) != len(batch):
+            raise RuntimeError("Embedding failed, check OPENROUTER_API_KEY / EMBEDDING_MODEL")
+        out.extend(vectors)
+    return out
+
+
+def run(args) -> dict:
+    docs = document_splitting_multi(load_jobs(args.jobs, limit=args.limit))
+    queries = load_queries(args.queries)
+
+    doc_vectors = embed_full([d["text"] for d in docs])
+    query_vectors = embed_openai(queries, dimensions=0)
+    full_dim = len(doc_vectors[0])
+
+    client = QdrantClient(location=args.qdrant_url) if args.qdrant_url == ":memory:" else QdrantClient(url=args.qdrant_url)
+    dims = sorted({d for d in args.dims if d < full_dim} | {full_dim}, reverse=True)
+
+    report = {"chunks": len(docs), "queries": len(queries), "full_dim": full_dim, "k": args.k, "dims": {}}
+    reference = None
+
+    for dim in dims:
+        collection = f"bench_dim_{dim}"
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        client.create_collection(
+            collection_name=collection,
+            vectors_config={"dense": models.VectorParams(size=dim, distance=models.Distance.COSINE)},
+        )
+        for start in range(0, len(doc_vectors), 256):
+            client.upsert(
+                collection_name=collection,
+                points=[
+                    models.PointStruct(id=i, vector={"dense": fit_dimensions(v, dim)}, payload={"job_id": docs[i]["job_id"]})
+                    for i, v in enumerate(doc_vectors[start:start + 256], start=start)
+                ],
+            )
+
+        qvs = [fit_dimensions(q, dim) for q in query_vectors]
+
+        def search(qv, collection=collection):
+            # over-fetch chunks so each query yields up to k distinct jobs
+            return client.query_points(collection_name=collection, query=qv, using="dense", limit=args.k * 3).points
+
+        # job-level ranking (top-k distinct jobs) is what /retrieve returns
+        ranked = []
+        for qv in qvs:
+            seen, jobs = set(), []
+            for p in search(qv):
+                if p.payload["job_id"] not in seen:
+                    seen.add(p.payload["job_id"])
+                    jobs.append(p.payload["job_id"])
+            ranked.append(jobs[: args.k])
+        if reference is None:
+            reference = ranked
+
+        recalls = [recall_at_k(ref, got, args.k) for ref, got in zip(reference, ranked)]
+        report["dims"][dim] = {
+            f"recall@{args.k}_vs_full": round(sum(recalls) / len(recalls), 4),
+            "latency": time_calls(search, qvs, repeat=args.repeat),
+            "bytes_per_vector": dim * 4,
+        }
+        client.delete_collection(collection)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dense dimension (Matryoshka truncation) evaluation")
+    parser.add_argument("--jobs", default=None, help="JSON/NDJSON job file (default: Postgres jobs_docs)")
+    parser.add_argument("--limit", type=int, default=2000, help="Max jobs to embed")
+    parser.add_argument("--queries", default=None, help="One query per line")
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 768, 1024])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--qdrant-url", default=":memory:")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args), indent=2))
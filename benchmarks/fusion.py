@@ -0,0 +1,133 @@
+"""
+Offline relevance / latency evaluation of fusion configs (retrieval.fusion).
+
+Runs every config in the grid against an already indexed collection with
+the exact query /retrieve sends (hybrid_query_kwargs, grouped per job_id),
+and reports recall@k, MRR, nDCG@k, p50/p99 latency and nDCG@k per p50 ms.
+Query vectors are computed once (embed_query) so only Qdrant time is
+measured.
+
+Judgements come from a qrels JSONL ({"query": ..., "relevant": [job_id, ...]}).
+Without one, pseudo-qrels are generated from jobs_docs: the job title is the
+query and that job is the only relevant result (known-item search). That is
+a rough proxy, good for comparing configs, not for absolute numbers.
+
+Usage:
+    python -m benchmarks.fusion --qrels qrels.jsonl
+    python -m benchmarks.fusion --pseudo 200 --configs grid.json --k 10
+"""
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+from qdrant_client import QdrantClient
+
+from retrieval.app import hybrid_query_kwargs
+from retrieval.db_helpers import rank_job_ids
+from retrieval.fusion import resolve_fusion
+from retrieval.hybrid import embed_query
+
+from .common import load_jobs, load_qrels, ndcg_at_k, recall_at_k, reciprocal_rank, time_calls
+
+
+# Override di atas default env (FUSION_*); --configs menggantikan grid ini
+CONFIGS: Dict[str, Dict[str, Any]] = {
+    "rrf": {"method": "rrf"},
+    "rrf_k10": {"method": "rrf", "rrf_k": 10},
+    "dbsf": {"method": "dbsf"},
+    "weighted_dense2": {"method": "weighted", "dense_weight": 2.0},
+    "weighted_sparse2": {"method": "weighted", "sparse_weight": 2.0},
+    "rrf_fields": {"method": "rrf", "field_weights": {"title_company": 1.0}},
+    "weighted_fields": {
+        "method": "weighted",
+        "field_weights": {"title_company": 2.0, "skills_requirements": 1.5, "benefits": 0.5},
+    },
+    "weighted_fields_nobenefits": {
+        "method": "weighted",
+        "field_weights": {"title_company": 2.0, "skills_requirements": 1.5, "benefits": 0.0},
+    },
+}
+
+
+def pseudo_qrels(jobs_path: str = None, n: int = 200, seed: int = 42) -> List[Dict[str, Any]]:
+    jobs = [j for j in load_jobs(jobs_path) if j.get("title") and j.get("job_id")]
+    random.Random(seed).shuffle(jobs)
+    return [{"query": j["title"], "relevant": [str(j["job_id"])]} for j in jobs[:n]]
+
+
+def run(args) -> dict:
+    qrels = load_qrels(args.qrels) if args.qrels else pseudo_qrels(args.jobs, args.pseudo, args.seed)
+    configs = CONFIGS
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = json.load(f)
+
+    client = (
+        QdrantClient(location=args.qdrant_url)
+        if args.qdrant_url == ":memory:"
+        else QdrantClient(url=args.qdrant_url, api_key=os.getenv("QDRANT_API_KEY"))
+    )
+
+    vectors = {}
+    for row in qrels:
+        dense, sparse = embed_query(row["query"])
+        if not dense:
+            raise RuntimeError("Embedding failed, check OPENROUTER_API_KEY / EMBEDDING_MODEL")
+        vectors[row["query"]] = (dense, sparse)
+
+    k = args.k
+    report = {
+        "collection": args.collection,
+        "queries": len(qrels),
+        "qrels": args.qrels or f"pseudo (title -> job, n={len(qrels)})",
+        "k": k,
+        "configs": {},
+    }
+
+    for name, options in configs.items():
+        cfg = resolve_fusion(options)
+
+        def search(row, cfg=cfg):
+            dense, sparse = vectors[row["query"]]
+            kwargs = hybrid_query_kwargs(dense, sparse, k, fusion=cfg)
+            kwargs["collection_name"] = args.collection
+            return rank_job_ids(client.query_points_groups(**kwargs))[0]
+
+        try:
+            ranked = [search(row) for row in qrels]
+        except Exception as e:
+            # mis. weighted RRF / DBSF di server Qdrant versi lama
+            report["configs"][name] = {"options": options, "error": str(e)}
+            continue
+
+        n = max(1, len(qrels))
+        latency = time_calls(search, qrels, repeat=args.repeat)
+        ndcg = sum(ndcg_at_k(row["relevant"], r, k) for row, r in zip(qrels, ranked)) / n
+        report["configs"][name] = {
+            "options": options,
+            f"recall@{k}": round(sum(recall_at_k(row["relevant"], r, k) for row, r in zip(qrels, ranked)) / n, 4),
+            "mrr": round(sum(reciprocal_rank(row["relevant"], r) for row, r in zip(qrels, ranked)) / n, 4),
+            f"ndcg@{k}": round(ndcg, 4),
+            "latency": latency,
+            f"ndcg@{k}_per_ms": round(ndcg / latency["p50_ms"], 4) if latency["p50_ms"] else None,
+        }
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fusion config relevance / latency benchmark")
+    parser.add_argument("--qrels", default=None, help="JSONL {query, relevant: [job_id]} (default: pseudo-qrels from titles)")
+    parser.add_argument("--jobs", default=None, help="JSON/NDJSON job file for pseudo-qrels (default: Postgres jobs_docs)")
+    parser.add_argument("--pseudo", type=int, default=200, help="Number of pseudo-qrels queries")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--configs", default=None, help="JSON {name: fusion options} replacing the built-in grid")
+    parser.add_argument("--collection", default=os.getenv("COLLECTION_NAME", "jobsaaa"))
+    parser.add_argument("--qdrant-url", default=os.getenv("QDRANT_URL", ":memory:"))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args), indent=2))
@@ -0,0 +1,134 @@
+"""
+Recall@k / latency / memory of collection profiles against the float32 baseline.
+
+Dense vectors are sampled from the live collection (no re-embedding), or
+generated at random with --synthetic. Each profile gets its own collection
+on a local Qdrant server; a held-out sample of the vectors is used as
+queries, and exact float32 search gives the ground truth.
+
+Usage:
+    docker run -p 6333:6333 qdrant/qdrant
+    python -m benchmarks.quantization --source jobs --limit 20000
+    python -m benchmarks.quantization --synthetic 20000 --dim 1024
+"""
+import argparse
+import json
+import os
+import random
+import time
+from typing import List, Tuple
+
+from qdrant_client import QdrantClient, models
+
+from utils.collection import COLLECTION_PROFILES, collection_profile, dense_search_params, dense_vector_params
+
+from .common import percentile, recall_at_k
+
+
+def load_vectors(args) -> Tuple[List[List[float]], int]:
+    if args.synthetic:
+        rnd = random.Random(0)
+        return [[rnd.gauss(0, 1) for _ in range(args.dim)] for _ in range(args.synthetic)], args.dim
+
+    source = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+    vectors: List[List[float]] = []
+    offset = None
+    while len(vectors) < args.limit:
+        points, offset = source.scroll(
+            collection_name=args.source, limit=512, offset=offset, with_payload=False, with_vectors=["dense"],
+        )
+        vectors.extend(p.vector["dense"] for p in points)
+        if offset is None:
+            break
+    vectors = vectors[: args.limit]
+    return vectors, len(vectors[0])
+
+
+def estimate_memory_bytes(n: int, dim: int, profile: dict) -> dict:
+    """
+    Rough RAM estimate: originals (unless on_disk) + quantized copy + HNSW links.
+    """
+    original = 0 if profile.get("on_disk") else n * dim * 4
+    quantized = {"scalar": n * dim, "binary": n * dim // 8}.get(profile.get("quantization"), 0)
+    links = n * (profile.get("hnsw_m") or 16) * 2 * 4
+    return {"ram_bytes": original + quantized + links, "disk_bytes": n * dim * 4 if profile.get("on_disk") else 0}
+
+
+def wait_indexed(client: QdrantClient, collection: str, timeout: float = 600.0) -> None:
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        if client.get_collection(collection).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1.0)
+
+
+def run(args) -> dict:
+    vectors, dim = load_vectors(args)
+    rnd = random.Random(1)
+    query_idx = set(rnd.sample(range(len(vectors)), min(args.queries, len(vectors) // 10)))
+    queries = [vectors[i] for i in sorted(query_idx)]
+    corpus = [(i, v) for i, v in enumerate(vectors) if i not in query_idx]
+
+    client = QdrantClient(url=args.qdrant_url)
+    report = {"points": len(corpus), "dim": dim, "queries": len(queries), "k": args.k, "profiles": {}}
+    truth = None
+
+    for name in ["default"] + [p for p in args.profiles if p != "default"]:
+        collection = f"bench_quant_{name}"
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        client.create_collection(
+            collection_name=collection,
+            vectors_config={"dense": dense_vector_params(dim, models.Distance.COSINE, profile=name)},
+        )
+        for start in range(0, len(corpus), 512):
+            client.upsert(
+                collection_name=collection,
+                points=[models.PointStruct(id=i, vector={"dense": v}) for i, v in corpus[start:start + 512]],
+                wait=True,
+            )
+        wait_indexed(client, collection)
+
+        if truth is None:
+            truth = [
+                [p.id for p in client.query_points(
+                    collection_name=collection, query=q, using="dense", limit=args.k,
+                    search_params=models.SearchParams(exact=True),
+                ).points]
+                for q in queries
+            ]
+
+        params = dense_search_params(profile=name)
+        timings, recalls = [], []
+        for q, ref in zip(queries, truth):
+            t0 = time.perf_counter()
+            res = client.query_points(collection_name=collection, query=q, using="dense", limit=args.k, search_params=params)
+            timings.append((time.perf_counter() - t0) * 1000.0)
+            recalls.append(recall_at_k(ref, [p.id for p in res.points], args.k))
+
+        report["profiles"][name] = {
+            f"recall@{args.k}": round(sum(recalls) / len(recalls), 4),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            **estimate_memory_bytes(len(corpus), dim, collection_profile(name)),
+        }
+        if not args.keep:
+            client.delete_collection(collection)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantization / on-disk profile benchmark")
+    parser.add_argument("--source", default=os.getenv("COLLECTION_NAME"), help="Collection to sample vectors from")
+    parser.add_argument("--limit", type=int, default=20000)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of --source")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--profiles", nargs="+", default=list(COLLECTION_PROFILES))
+    parser.add_argument("--qdrant-url", default="http://localhost:6333", help="Local Qdrant used for the test collections")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args), indent=2))
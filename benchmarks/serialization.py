@@ -0,0 +1,160 @@
+"""
+Serialization time and bytes on the wire for realistic response sizes.
+
+Builds /retrieve responses (top_k jobs with full docs), /retrieve/batch
+responses and /history responses (assistant messages carrying their
+retrieved_jobs) from real job docs, then compares:
+
+- pydantic : response_model path (model validation + model_dump + stdlib json, like FastAPI)
+- json     : stdlib json on plain dicts
+- orjson   : utils.responses.dumps on plain dicts (the FAST_JSON path)
+
+and, for the orjson body, raw / gzip / brotli bytes plus compression time
+at the levels used by CompressionMiddleware.
+
+Usage:
+    python -m benchmarks.serialization --jobs jobs.json
+    python -m benchmarks.serialization --sizes 10 50 100 --batch 20 --repeat 50
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+from typing import Any, Callable, Dict, List
+
+from retrieval.db_helpers import DOC_FIELDS, LIST_FIELDS
+from schema.generation import HistoryResponse
+from schema.retrieval import RetrieveBatchResponse, RetrieveResponse
+from utils.responses import BROTLI_QUALITY, GZIP_LEVEL, brotli, dumps, orjson
+
+from .common import load_jobs, time_calls
+
+
+def to_doc(job: Dict[str, Any], score: float) -> Dict[str, Any]:
+    # bentuk yang sama dengan db_helpers.row_to_doc
+    doc: Dict[str, Any] = {"job_id": str(job.get("job_id"))}
+    for f in DOC_FIELDS:
+        value = job.get(f)
+        if f in LIST_FIELDS:
+            value = value or []
+        elif f == "created_at" and hasattr(value, "isoformat"):
+            value = value.isoformat()
+        doc[f] = value
+    doc["score"] = score
+    return doc
+
+
+def retrieve_content(docs: List[Dict[str, Any]], query: str) -> Dict[str, Any]:
+    return {
+        "query": query,
+        "collection": "bench",
+        "results": docs,
+        "search_query": query,
+        "applied_filters": None,
+        "reranked": None,
+        "degraded": False,
+        "degraded_reason": None,
+    }
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    # sama dengan starlette JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def measure(cases: Dict[str, Callable[[], bytes]], repeat: int) -> Dict[str, Any]:
+    return {name: time_calls(lambda _, fn=fn: fn(), [None], repeat=repeat) for name, fn in cases.items()}
+
+
+def wire_bytes(body: bytes, repeat: int) -> Dict[str, Any]:
+    sizes: Dict[str, Any] = {"raw": len(body)}
+
+    def timed(fn: Callable[[bytes], bytes]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            compressed = fn(body)
+        return {"bytes": len(compressed), "ms": round((time.perf_counter() - t0) * 1000.0 / repeat, 3)}
+
+    def gzip_compress(b: bytes) -> bytes:
+        # sama dengan GzipStream di CompressionMiddleware (satu body)
+        c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return c.compress(b) + c.flush()
+
+    sizes[f"gzip_{GZIP_LEVEL}"] = timed(gzip_compress)
+    if brotli is not None:
+        sizes[f"brotli_{BROTLI_QUALITY}"] = timed(lambda b: brotli.compress(b, quality=BROTLI_QUALITY))
+    return sizes
+
+
+def run(args) -> dict:
+    jobs = [j for j in load_jobs(args.jobs) if j.get("job_id")]
+    if not jobs:
+        raise RuntimeError("No jobs to build responses from")
+    rng = random.Random(args.seed)
+
+    def sample_docs(n: int) -> List[Dict[str, Any]]:
+        picked = [jobs[rng.randrange(len(jobs))] for _ in range(n)]
+        return [to_doc(j, round(1.0 / (i + 1), 6)) for i, j in enumerate(picked)]
+
+    report: Dict[str, Any] = {
+        "jobs": len(jobs),
+        "orjson": orjson is not None,
+        "brotli": brotli is not None,
+        "retrieve": {},
+    }
+
+    for size in args.sizes:
+        content = retrieve_content(sample_docs(size), "backend engineer jakarta")
+        cases = {
+            "pydantic": lambda c=content: stdlib_dumps(RetrieveResponse(**c).model_dump(mode="json")),
+            "json": lambda c=content: stdlib_dumps(c),
+            "orjson": lambda c=content: dumps(c),
+        }
+        timings = measure(cases, args.repeat)
+        report["retrieve"][f"top_{size}"] = {"serialize": timings, "wire": wire_bytes(dumps(content), args.repeat)}
+
+    batch = [retrieve_content(sample_docs(args.batch_top_k), f"query {i}") for i in range(args.batch)]
+    batch_content = {"collection": "bench", "results": batch}
+    report[f"batch_{args.batch}x{args.batch_top_k}"] = {
+        "serialize": measure({
+            "pydantic": lambda: stdlib_dumps(RetrieveBatchResponse(**batch_content).model_dump(mode="json")),
+            "orjson": lambda: dumps(batch_content),
+        }, args.repeat),
+        "wire": wire_bytes(dumps(batch_content), args.repeat),
+    }
+
+    messages = []
+    for i in range(args.history):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": "cari lowongan backend jakarta", "timestamp": "2025-01-01T00:00:00", "metadata": None})
+        else:
+            messages.append({
+                "role": "assistant",
+                "content": "Berikut beberapa lowongan yang cocok. " * 20,
+                "timestamp": "2025-01-01T00:00:01",
+                "metadata": {"retrieved_jobs": sample_docs(args.batch_top_k)},
+            })
+    history = {"conversation_id": "bench", "messages": messages}
+    report[f"history_{args.history}_messages"] = {
+        "serialize": measure({
+            "pydantic": lambda: stdlib_dumps(HistoryResponse(**history).model_dump(mode="json")),
+            "orjson": lambda: dumps(history),
+        }, args.repeat),
+        "wire": wire_bytes(dumps(history), args.repeat),
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response serialization / compression benchmark")
+    parser.add_argument("--jobs", default=None, help="JSON/NDJSON job file (default: Postgres jobs_docs)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100], help="/retrieve top_k sizes")
+    parser.add_argument("--batch", type=int, default=20, help="Queries per /retrieve/batch response")
+    parser.add_argument("--batch-top-k", type=int, default=10, help="Jobs per batch query / per history message")
+    parser.add_argument("--history", type=int, default=40, help="Messages per /history response")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args), indent=2))
@@ -0,0 +1,100 @@
+"""
+Sparse index size and sparse query latency before/after pruning.
+
+Builds one sparse-only collection per pruning config from the same chunks
+(document_splitting_multi) and reports non-zero entries, approximate
+sparse index bytes, query latency and top-k overlap with the unpruned run.
+
+Usage:
+    python -m benchmarks.sparse_pruning --jobs jobs.json --qdrant-url http://localhost:6333
+    python -m benchmarks.sparse_pruning            # jobs from Postgres, in-memory Qdrant
+"""
+import argparse
+import json
+
+from qdrant_client import QdrantClient, models
+
+from store.helper import document_splitting_multi
+from utils.sparse import (
+    DEFAULT_STOPWORDS,
+    SPARSE_MAX_TERMS,
+    query_to_bm25_vector,
+    text_to_bm25_vector,
+)
+
+from .common import load_jobs, load_queries, recall_at_k, time_calls
+
+
+CONFIGS = {
+    "baseline": {"stopwords": frozenset(), "stemmer": "none", "max_terms": 0},
+    "stopwords": {"stopwords": DEFAULT_STOPWORDS, "stemmer": "none", "max_terms": 0},
+    "pruned": {"stopwords": DEFAULT_STOPWORDS, "stemmer": "none", "max_terms": SPARSE_MAX_TERMS},
+    "pruned+stem": {"stopwords": DEFAULT_STOPWORDS, "stemmer": "light", "max_terms": SPARSE_MAX_TERMS},
+}
+
+BYTES_PER_ENTRY = 8  # u32 index + f32 value, excluding posting-list overhead
+
+
+def run(jobs_path=None, queries_path=None, qdrant_url=":memory:", top_k=10, repeat=20):
+    docs = document_splitting_multi(load_jobs(jobs_path))
+    queries = load_queries(queries_path)
+    client = QdrantClient(location=qdrant_url) if qdrant_url == ":memory:" else QdrantClient(url=qdrant_url)
+
+    report = {"chunks": len(docs), "queries": len(queries), "configs": {}}
+    reference = {}
+
+    for name, cfg in CONFIGS.items():
+        collection = f"bench_sparse_{name.replace('+', '_')}"
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        client.create_collection(
+            collection_name=collection,
+            vectors_config={},
+            sparse_vectors_config={"sparse": models.SparseVectorParams(modifier=models.Modifier.IDF)},
+        )
+
+        nnz = 0
+        points = []
+        for i, d in enumerate(docs):
+            sv = text_to_bm25_vector(d["text"], **cfg)
+            nnz += len(sv.indices)
+            points.append(models.PointStruct(id=i, vector={"sparse": sv}, payload={"job_id": d["job_id"]}))
+            if len(points) >= 256:
+                client.upsert(collection_name=collection, points=points)
+                points = []
+        if points:
+            client.upsert(collection_name=collection, points=points)
+
+        def search(q, cfg=cfg, collection=collection):
+            qv = query_to_bm25_vector(q, stopwords=cfg["stopwords"], stemmer=cfg["stemmer"])
+            return client.query_points(
+                collection_name=collection, query=qv, using="sparse", limit=top_k, with_payload=False,
+            ).points
+
+        results = {q: [p.id for p in search(q)] for q in queries}
+        if name == "baseline":
+            reference = results
+
+        overlap = [recall_at_k(reference[q], results[q], top_k) for q in queries]
+        report["configs"][name] = {
+            "nnz_total": nnz,
+            "nnz_per_vector": round(nnz / max(1, len(docs)), 2),
+            "approx_index_bytes": nnz * BYTES_PER_ENTRY,
+            "latency": time_calls(search, queries, repeat=repeat),
+            f"overlap@{top_k}_vs_baseline": round(sum(overlap) / max(1, len(overlap)), 3),
+        }
+        client.delete_collection(collection)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sparse pruning benchmark")
+    parser.add_argument("--jobs", default=None, help="JSON/NDJSON job file (default: Postgres jobs_docs)")
+    parser.add_argument("--queries", default=None, help="One query per line")
+    parser.add_argument("--qdrant-url", default=":memory:")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.jobs, args.queries, args.qdrant_url, args.top_k, args.repeat), indent=2))
@@ -2,7 +2,7 @@ from database.database import engine
 from database.models import Base
 
 # Import all models to ensure they are registered
-from database.models import Job
+from database.models import Job, JobChunk, JobChunkStaged, IngestTask, ImageExtraction, ImageHashBand, IndexGeneration, IndexChange
 
 print("Creating tables...")
 Base.metadata.create_all(bind=engine)
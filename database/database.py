@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from urllib.parse import parse_qsl, urlencode
 import os
 
 load_dotenv()
@@ -19,3 +20,65 @@ SessionLocal = sessionmaker(
 )
 
 Base = declarative_base()
+
+
+# Opsi libpq (DSN Supabase dsb.) yang tidak diterima asyncpg.connect()
+LIBPQ_ONLY_PARAMS = frozenset([
+    "sslrootcert", "sslcert", "sslkey", "sslcrl", "connect_timeout", "target_session_attrs",
+    "gssencmode", "channel_binding", "options", "application_name", "keepalives", "keepalives_idle",
+])
+
+
+def asyncpg_query(query: str) -> str:
+    """
+    Query string libpq -> asyncpg: sslmode=require -> ssl=require, opsi libpq lain dibuang.
+    """
+    params = []
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        if key == "sslmode":
+            params.append(("ssl", value))
+        elif key not in LIBPQ_ONLY_PARAMS:
+            params.append((key, value))
+    return urlencode(params)
+
+
+# Async engine untuk retrieval path (asyncpg). Dibuat lazy supaya modul lain
+# tetap bisa import database.database walau driver async belum terpasang.
+def async_database_url(url: str) -> str:
+    for sync_prefix, async_prefix in [
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ]:
+        if url.startswith(sync_prefix):
+            url = async_prefix + url[len(sync_prefix):]
+            if async_prefix == "postgresql+asyncpg://" and "?" in url:
+                base, query = url.split("?", 1)
+                query = asyncpg_query(query)
+                url = f"{base}?{query}" if query else base
+            return url
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (async_database_url(DATABASE_URL) if DATABASE_URL else None)
+
+_async_sessionmaker = None
+
+def get_async_sessionmaker():
+    """
+    async_sessionmaker untuk ASYNC_DATABASE_URL (default: DATABASE_URL dengan driver asyncpg).
+    Raise ImportError kalau driver async tidak terpasang.
+    """
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        import greenlet  # noqa: F401  (wajib untuk sqlalchemy asyncio, cek di awal)
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_size=int(os.getenv("ASYNC_DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20")),
+            pool_pre_ping=True,
+        )
+        _async_sessionmaker = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+    return _async_sessionmaker
@@ -0,0 +1,134 @@
+"""
+Index generation counter (table index_generations).
+
+bump_generation() dipanggil oleh store (ingest / delete / reindex / reconcile)
+setiap kali isi collection berubah; retrieval memakai get_generation() sebagai
+bagian dari key cache hasil, jadi entry lama otomatis tidak terpakai lagi.
+
+Setiap bump juga mencatat job yang doc Postgres-nya berubah (index_changes),
+supaya hydration cache cukup di-evict per job_id (get_changed_job_ids).
+"""
+import os
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from database.database import SessionLocal
+from database.models import IndexChange, IndexGeneration
+
+# Baris index_changes yang disimpan per collection; proses yang tertinggal lebih jauh clear seluruh hydration cache
+INDEX_CHANGES_KEEP = int(os.getenv("INDEX_CHANGES_KEEP", "1000"))
+
+
+def get_generation(collection: str) -> int:
+    db = SessionLocal()
+    try:
+        row = db.get(IndexGeneration, collection)
+        return row.generation if row else 0
+    finally:
+        db.close()
+
+
+async def get_generation_async(collection: str) -> int:
+    """
+    get_generation lewat async session (retrieval async path).
+    """
+    from database.database import get_async_sessionmaker
+
+    async with get_async_sessionmaker()() as db:
+        row = await db.get(IndexGeneration, collection)
+        return row.generation if row else 0
+
+
+def changes_query(collection: str, since: int, until: int):
+    return select(IndexChange.job_ids).where(
+        IndexChange.collection == collection,
+        IndexChange.generation > since,
+        IndexChange.generation <= until,
+    )
+
+
+def merge_changes(rows: List[Optional[List[str]]], since: int, until: int) -> Optional[List[str]]:
+    # baris hilang (sudah di-prune / bump gagal dicatat) atau job_ids None -> tidak diketahui
+    if len(rows) != until - since or any(job_ids is None for job_ids in rows):
+        return None
+    return list({jid for job_ids in rows for jid in job_ids})
+
+
+def get_changed_job_ids(collection: str, since: int, until: int) -> Optional[List[str]]:
+    """
+    job_id yang doc-nya berubah di generation (since, until]; None = tidak
+    diketahui (caller harus invalidasi semua).
+    """
+    db = SessionLocal()
+    try:
+        return merge_changes(list(db.scalars(changes_query(collection, since, until))), since, until)
+    finally:
+        db.close()
+
+
+async def get_changed_job_ids_async(collection: str, since: int, until: int) -> Optional[List[str]]:
+    from database.database import get_async_sessionmaker
+
+    async with get_async_sessionmaker()() as db:
+        rows = list((await db.scalars(changes_query(collection, since, until))).all())
+        return merge_changes(rows, since, until)
+
+
+def record_change(db, collection: str, generation: int, job_ids: Optional[List[str]]) -> None:
+    """
+    Di savepoint: gagal (mis. tabel index_changes belum dibuat) tidak
+    membatalkan bump; reader melihat baris hilang -> invalidasi semua.
+    """
+    try:
+        with db.begin_nested():
+            db.add(IndexChange(collection=collection, generation=generation, job_ids=job_ids))
+            if INDEX_CHANGES_KEEP > 0:
+                db.query(IndexChange).filter(
+                    IndexChange.collection == collection,
+                    IndexChange.generation <= generation - INDEX_CHANGES_KEEP,
+                ).delete(synchronize_session=False)
+    except Exception as e:
+        print(f"Index change log failed for '{collection}': {e}")
+
+
+def bump_generation(collection: str, job_ids: Optional[List[str]] = None) -> int:
+    """
+    generation += 1 (atomic di sisi DB) dan catat job_ids yang doc Postgres-nya
+    berubah ([] = hanya index Qdrant yang berubah, None = tidak diketahui).
+    Error tidak diteruskan: cache hanya bergantung pada TTL kalau bump gagal.
+    """
+    job_ids = sorted(set(job_ids)) if job_ids is not None else None
+    db = SessionLocal()
+    try:
+        for _ in range(2):
+            updated = (
+                db.query(IndexGeneration)
+                .filter(IndexGeneration.collection == collection)
+                .update({"generation": IndexGeneration.generation + 1}, synchronize_session=False)
+            )
+            if updated:
+                # row sudah ter-lock oleh UPDATE sampai commit -> generation ini milik transaksi ini
+                generation = db.scalar(select(IndexGeneration.generation).where(IndexGeneration.collection == collection))
+                record_change(db, collection, generation, job_ids)
+                db.commit()
+                return generation
+
+            db.add(IndexGeneration(collection=collection, generation=1))
+            try:
+                db.flush()
+            except IntegrityError:
+                # proses lain baru saja insert row ini -> ulangi sebagai update
+                db.rollback()
+                continue
+            record_change(db, collection, 1, job_ids)
+            db.commit()
+            return 1
+        return get_generation(collection)
+    except Exception as e:
+        db.rollback()
+        print(f"Index generation bump failed for '{collection}': {e}")
+        return -1
+    finally:
+        db.close()
@@ -0,0 +1,31 @@
+"""
+Migration script to create image_hash_bands and backfill it from image_extractions.
+Run this once to update existing database (safe to re-run).
+"""
+from sqlalchemy import text
+
+from database.database import engine
+from database.models import ImageHashBand
+from store.imaging import hash_bands
+
+def migrate():
+    ImageHashBand.__table__.create(bind=engine, checkfirst=True)
+    print("✅ Table image_hash_bands ready")
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT e.id, e.dhash, e.phash FROM image_extractions e
+            WHERE NOT EXISTS (SELECT 1 FROM image_hash_bands b WHERE b.extraction_id = e.id)
+        """)).all()
+        values = [
+            {"band": band, "value": value, "extraction_id": row_id}
+            for row_id, dhash, phash in rows
+            for band, value in hash_bands({"dhash": dhash, "phash": phash})
+        ]
+        if values:
+            conn.execute(ImageHashBand.__table__.insert(), values)
+            conn.commit()
+        print(f"✅ Backfilled hash bands for {len(rows)} image extraction(s)")
+
+if __name__ == "__main__":
+    migrate()
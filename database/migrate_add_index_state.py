@@ -0,0 +1,44 @@
+"""
+Migration script to add index state (outbox) columns to jobs_docs table.
+Run this once to update existing database.
+
+Existing rows are marked 'indexed'; `python -m store.reconcile --drift`
+moves any of them that are actually missing from Qdrant back to 'pending'.
+"""
+from sqlalchemy import text
+from database.database import engine
+
+COLUMNS = [
+    ("index_status", "VARCHAR(20) NOT NULL DEFAULT 'pending'"),
+    ("index_attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("index_error", "TEXT"),
+    ("index_updated_at", "TIMESTAMP"),
+]
+
+def migrate():
+    with engine.connect() as conn:
+        for name, ddl in COLUMNS:
+            try:
+                conn.execute(text(f"ALTER TABLE jobs_docs ADD COLUMN {name} {ddl}"))
+                conn.commit()
+                print(f"✅ Migration successful: Added {name} column to jobs_docs table")
+                if name == "index_status":
+                    conn.execute(text("UPDATE jobs_docs SET index_status = 'indexed'"))
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                if "duplicate column name" in str(e).lower() or "already exists" in str(e).lower():
+                    print(f"ℹ️  Column {name} already exists, skipping migration")
+                else:
+                    print(f"❌ Migration failed: {e}")
+                    raise
+
+        try:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_docs_index_status ON jobs_docs (index_status)"))
+            conn.commit()
+        except Exception as e:
+            print(f"❌ Index creation failed: {e}")
+            raise
+
+if __name__ == "__main__":
+    migrate()
@@ -30,6 +30,120 @@ class Job(Base):
 
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
+    # Outbox state untuk index Qdrant (lihat store/reconcile.py)
+    index_status = Column(String(20), nullable=False, default="pending", server_default="pending", index=True)  # pending | indexed | failed
+    index_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    index_error = Column(Text, nullable=True)
+    index_updated_at = Column(DateTime, nullable=True)  # UTC, diisi python
+
+class JobChunk(Base):
+    """
+    Satu baris per point Qdrant (hasil document_splitting_multi).
+    Dipakai untuk re-embed hanya chunk yang berubah saat job di-scrape ulang.
+    """
+    __tablename__ = "jobs_chunks"
+
+    point_id = Column(String, primary_key=True)          # "{job_id}:{field}:{chunk_idx}"
+    job_id = Column(String, index=True, nullable=False)
+    field = Column(String, nullable=False)
+    chunk_idx = Column(Integer, nullable=False, default=0)
+
+    content_hash = Column(String(64), nullable=False)    # sha256(text) -> perlu re-embed
+    payload_hash = Column(String(64), nullable=False)    # sha256(payload) -> cukup set payload
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class JobChunkStaged(Base):
+    """
+    Hash chunk yang sudah di-upsert ke shadow collection selama
+    `python -m store.reindex`. Baru dipindah ke jobs_chunks setelah alias
+    swap sukses, jadi reindex yang gagal / tidak di-resume tidak mengubah
+    jobs_chunks milik collection aktif.
+    """
+    __tablename__ = "jobs_chunks_staged"
+
+    collection = Column(String, primary_key=True)        # nama shadow collection
+    point_id = Column(String, primary_key=True)
+    job_id = Column(String, index=True, nullable=False)
+    field = Column(String, nullable=False)
+    chunk_idx = Column(Integer, nullable=False, default=0)
+
+    content_hash = Column(String(64), nullable=False)
+    payload_hash = Column(String(64), nullable=False)
+
+class IngestTask(Base):
+    """
+    Antrian ingestion /store?background=true (diproses worker di store/queue.py).
+    """
+    __tablename__ = "ingest_tasks"
+
+    task_id = Column(String, primary_key=True)
+    idempotency_key = Column(String(128), unique=True, index=True, nullable=False)
+
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued | running | done | failed
+    payload = Column(JSON, nullable=False)
+    jobs_count = Column(Integer, nullable=False, default=0)
+    result = Column(JSON, nullable=True)    # counts dari store_jobs_pipeline
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_until = Column(DateTime, nullable=True)  # lease worker (UTC), lewat = boleh di-claim ulang
+
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class ImageExtraction(Base):
+    """
+    Cache hasil ekstraksi poster (store/imaging.py), di-key dengan perceptual hash.
+    """
+    __tablename__ = "image_extractions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    dhash = Column(String(16), nullable=False, index=True)  # 64-bit hex
+    phash = Column(String(16), nullable=False)
+
+    image_url = Column(Text, nullable=False)   # object Supabase hasil upload pertama
+    job_id = Column(String, index=True)
+    job_data = Column(JSON, nullable=False)    # output extract_job_from_image (+ url)
+
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+class ImageHashBand(Base):
+    """
+    dHash / pHash image_extractions dipotong per 16 bit (band 0-3 dHash,
+    4-7 pHash). Kandidat near-duplicate = row dengan minimal satu band sama,
+    jadi lookup tidak perlu scan seluruh image_extractions.
+    """
+    __tablename__ = "image_hash_bands"
+
+    band = Column(Integer, primary_key=True)
+    value = Column(String(4), primary_key=True)           # 16-bit hex
+    extraction_id = Column(Integer, primary_key=True)     # image_extractions.id
+
+class IndexGeneration(Base):
+    """
+    Counter per collection/alias, dinaikkan setiap kali isi index berubah
+    (ingest, delete, reindex). Dipakai sebagai versi cache hasil /retrieve.
+    """
+    __tablename__ = "index_generations"
+
+    collection = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class IndexChange(Base):
+    """
+    Satu baris per bump_generation: job yang doc Postgres-nya berubah di
+    generation itu (job_ids None = tidak diketahui, invalidasi semua).
+    Dipakai proses retrieval untuk evict hydration cache per job_id.
+    """
+    __tablename__ = "index_changes"
+
+    collection = Column(String, primary_key=True)
+    generation = Column(Integer, primary_key=True)
+    job_ids = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
 class Conversation(Base):
     __tablename__ = "conversations"
     
@@ -7,13 +7,13 @@ from schema.generation import (
     GenerateRequest, 
     GenerateResponse, 
     HistoryResponse, 
-    MessageResponse,
     ConversationListResponse,
     ConversationListItem
 )
 from .helper import generate_answer, generate_answer_stream
 from database.database import SessionLocal
 from database.models import Conversation
+from utils.responses import fast_or_model
 
 router = APIRouter(tags=["Generation"])
 
@@ -72,19 +72,20 @@ async def get_history(conversation_id: str):
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         message_list = [
-            MessageResponse(
-                role=msg.role,
-                content=msg.content,
-                timestamp=msg.timestamp.isoformat(),
-                metadata=msg.extra_data  # Return extra_data as metadata in API
-            )
+            {
+                "role": msg.role,
+                "content": msg.content,
+                "timestamp": msg.timestamp.isoformat(),
+                "metadata": msg.extra_data  # Return extra_data as metadata in API
+            }
             for msg in messages
         ]
         
-        return HistoryResponse(
-            conversation_id=conversation_id,
-            messages=message_list
-        )
+        # FAST_JSON: metadata (retrieved jobs) langsung di-encode orjson tanpa validasi Pydantic
+        return fast_or_model(HistoryResponse, {
+            "conversation_id": conversation_id,
+            "messages": message_list
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -8,6 +8,11 @@ from scrapping.app import router as scrapping_router
 from store.app import router as store_router
 from retrieval.app import router as retrieval_router
 from generation.app import router as generation_router
+from store.app import pipeline_kwargs
+from store.queue import INGEST_WORKERS, start_ingest_workers, stop_ingest_workers
+from retrieval.query_parser import query_parser
+from retrieval.rerank import RERANK_ENABLED, reranker_ready
+from utils.responses import RESPONSE_COMPRESSION, CompressionMiddleware
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -29,12 +34,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip / brotli untuk response besar (opt-in, SSE tidak dikompres)
+if RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
 # Include Routers
 app.include_router(scrapping_router)
 app.include_router(store_router)
 app.include_router(retrieval_router)
 app.include_router(generation_router)
 
+# Background workers untuk /store?background=true
+@app.on_event("startup")
+def start_background_workers():
+    if INGEST_WORKERS > 0:
+        start_ingest_workers(pipeline_kwargs())
+    # build gazetteer query parser di background (tidak menahan startup)
+    query_parser.maybe_refresh()
+    # load cross-encoder di thread rerank (request pakai urutan fused sampai siap)
+    if RERANK_ENABLED:
+        reranker_ready()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    stop_ingest_workers()
+
 @app.get("/")
 def read_root():
     return {
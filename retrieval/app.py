@@ -1,26 +1,95 @@
 import sys
 import os
+import hashlib
+import json
+import time
 from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
 
 # Import relative jika dijalankan sebagai package
-from .hybrid import embed_openai, sparse_query_manual
-from .db_helpers import qdrant_result_to_full_docs
+from .hybrid import QUERY_CACHE_REDIS_URL, embed_queries_async, embed_query, embed_query_async, normalize_query
+from .filters import build_filter
+from .fusion import build_prefetches, fusion_query, resolve_fusion
+from .explain import EXPLAIN_PAYLOAD_KEYS, build_explain, explain_branches, explain_branches_async, new_timings, stage
+from .query_parser import query_parser
+from .db_helpers import (
+    HYDRATION_CACHE_SIZE,
+    project_docs,
+    qdrant_result_to_full_docs,
+    qdrant_result_to_full_docs_async,
+    qdrant_results_to_full_docs,
+    qdrant_results_to_full_docs_async,
+    refresh_hydration_cache,
+    refresh_hydration_cache_async,
+    union_fields,
+)
+from .rerank import (
+    RERANK_BUDGET_MS,
+    RERANK_CANDIDATES,
+    RERANK_ENABLED,
+    RERANK_MODEL,
+    RERANK_PAYLOAD_KEYS,
+    rerank_docs,
+    rerank_docs_async,
+)
 
 # Import dari parent package (asumsi run dari production root)
-from database.database import SessionLocal  
-from schema.retrieval import RetrieveRequest, RetrieveResponse
+from database.database import SessionLocal, get_async_sessionmaker
+from database.index_generation import get_generation, get_generation_async
+from schema.retrieval import (
+    RetrieveBatchRequest,
+    RetrieveBatchResponse,
+    RetrieveFilters,
+    RetrieveRequest,
+    RetrieveResponse,
+)
+from utils.cache import cache_stats, get_cache
+from utils.collection import RETRIEVAL_PAYLOAD_KEYS, dense_search_params
+from utils.responses import FAST_JSON, FastJSONResponse
 
 router = APIRouter(tags=["Retrieval"])
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+# Setelah `python -m store.reindex` nama ini adalah alias ke collection aktif,
+# jadi query selalu lewat alias dan tidak terganggu saat reindex berjalan.
 QDRANT_COLLECTION = os.getenv("COLLECTION_NAME", "jobsaaa")
 
 PREFETCH_LIMIT = int(os.getenv("PREFETCH_LIMIT", "10"))
 
+# Grouping per job_id: top_k = jumlah job unik, bukan jumlah chunk.
+# Tiap prefetch mengambil minimal top_k * GROUP_PREFETCH_FACTOR chunk supaya
+# setelah di-group masih ada cukup kandidat job.
+GROUP_PREFETCH_FACTOR = int(os.getenv("GROUP_PREFETCH_FACTOR", "3"))
+GROUP_SIZE = int(os.getenv("GROUP_SIZE", "1"))  # chunk per job yang dikembalikan Qdrant
+
+# Rescoring / oversampling sesuai COLLECTION_PROFILE (None untuk profile default)
+DENSE_SEARCH_PARAMS = dense_search_params()
+
+# Cache hasil /retrieve (docs final), versi = index generation collection.
+# Ingest / delete / reindex menaikkan generation -> entry lama tidak terpakai.
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))  # 0 = disabled
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+
+# Deadline per request (override: RetrieveRequest.budget_ms, 0 = tanpa budget).
+# Dense embedding ditunggu sampai budget - RETRIEVE_RESERVE_MS (cadangan untuk
+# Qdrant + Postgres); kalau belum kembali, query turun ke sparse-only.
+RETRIEVE_BUDGET_MS = float(os.getenv("RETRIEVE_BUDGET_MS", "2000"))
+RETRIEVE_RESERVE_MS = float(os.getenv("RETRIEVE_RESERVE_MS", "300"))
+
+# Maks. query per /retrieve/batch
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "500"))
+
+result_cache = get_cache(
+    "retrieve_result",
+    maxsize=RESULT_CACHE_SIZE,
+    ttl=RESULT_CACHE_TTL,
+    redis_url=QUERY_CACHE_REDIS_URL if RESULT_CACHE_SIZE > 0 else None,
+)
+
 if not QDRANT_URL or not QDRANT_API_KEY:
     # Bisa di-warning saja atau raise error saat startup, 
     # di sini kita biarkan, tapi akan error kalau dipanggil jika env belum set
@@ -33,50 +102,554 @@ qdrant_client = QdrantClient(
     api_key=QDRANT_API_KEY,
 )
 
-@router.post("/retrieve", response_model=RetrieveResponse)
-def retrieve(req: RetrieveRequest):
+# Dipakai /retrieve (async path); qdrant_client tetap untuk /retrieve/sync
+async_qdrant_client = AsyncQdrantClient(
+    url=QDRANT_URL,
+    api_key=QDRANT_API_KEY,
+)
+
+def result_cache_key(
+    req: RetrieveRequest,
+    generation: int,
+    fusion: Optional[Dict[str, Any]] = None,
+    variant: str = "group",
+) -> str:
+    """
+    Normalized query + semua parameter request lain + collection + generation.
+    variant memisahkan hasil /retrieve ("group") dan /retrieve/batch ("batch").
+    """
+    params = req.model_dump(exclude={"fusion", "budget_ms", "explain"})
+    params["query"] = normalize_query(req.query)
+    gazetteer = query_parser.version if req.parse_query else None
+    # fusion yang sudah di-resolve (default env ikut), bukan hanya override request
+    fusion = fusion or resolve_fusion(req.fusion.model_dump() if req.fusion else None)
+    rerank = [RERANK_MODEL, RERANK_CANDIDATES] if use_rerank(req) else None
+    raw = json.dumps(
+        [QDRANT_COLLECTION, variant, generation, gazetteer, PREFETCH_LIMIT, GROUP_PREFETCH_FACTOR, GROUP_SIZE, fusion, rerank, params],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def prefetch_limit(top_k: int) -> int:
+    return max(PREFETCH_LIMIT, top_k * GROUP_PREFETCH_FACTOR)
+
+
+def use_rerank(req: RetrieveRequest) -> bool:
+    return RERANK_ENABLED if req.rerank is None else req.rerank
+
+
+def candidate_limit(req: RetrieveRequest) -> int:
+    """
+    Jumlah job yang diambil dari Qdrant: top_k, atau RERANK_CANDIDATES kalau
+    hasil masih akan di-rerank.
+    """
+    return max(req.top_k, RERANK_CANDIDATES) if use_rerank(req) else req.top_k
+
+
+def cacheable_result(result: Dict[str, Any]) -> bool:
+    # hasil fallback (rerank kena budget, sparse-only) tidak di-cache supaya request berikutnya mencoba lagi
+    return result.get("reranked") is not False and not result.get("degraded")
+
+
+def embed_timeout(plan: Dict[str, Any]) -> Optional[float]:
+    """
+    Detik yang boleh dipakai menunggu dense embedding (None = tanpa batas).
+    """
+    if plan["deadline"] is None:
+        return None
+    return max(0.0, plan["deadline"] - time.monotonic() - RETRIEVE_RESERVE_MS / 1000.0)
+
+
+def remaining_ms(plan: Dict[str, Any], default: float) -> float:
+    if plan["deadline"] is None:
+        return default
+    return min(default, max(0.0, (plan["deadline"] - time.monotonic()) * 1000.0))
+
+
+def degraded_reason(dense_vec: List[float], started: float, timeout: Optional[float]) -> Optional[str]:
+    if dense_vec:
+        return None
+    if timeout is not None and time.monotonic() - started >= timeout:
+        return "embedding_timeout"
+    return "embedding_failed"
+
+
+def hybrid_query_kwargs(
+    dense_vec: List[float],
+    sparse_vec: Any,
+    top_k: int,
+    query_filter: Optional[models.Filter] = None,
+    fusion: Optional[Dict[str, Any]] = None,
+    payload_keys: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Argumen query_points_groups untuk hybrid query, di-group per job_id
+    di sisi Qdrant. Filter dipasang di semua prefetch, jadi kandidat sudah
+    tersaring di level index. Metode fusion / layout prefetch dari
+    retrieval.fusion (default: sparse + dense, RRF). Tanpa dense vector
+    (embedding lewat budget / gagal) jadi query sparse-only. Dipakai bersama
+    oleh path sync dan async.
+    """
+    if not dense_vec:
+        # degraded (embedding timeout / error): sparse-only, tanpa fusion
+        return dict(
+            collection_name=QDRANT_COLLECTION,
+            query=models.SparseVector(indices=sparse_vec.indices, values=sparse_vec.values),
+            using="sparse",
+            query_filter=query_filter,
+            group_by="job_id",
+            group_size=GROUP_SIZE,
+            limit=top_k,
+            with_payload=payload_keys or RETRIEVAL_PAYLOAD_KEYS,
+        )
+
+    cfg = fusion or resolve_fusion()
+    prefetch, weights = build_prefetches(
+        dense_vec,
+        sparse_vec,
+        cfg,
+        default_limit=prefetch_limit(top_k),
+        query_filter=query_filter,
+        dense_params=DENSE_SEARCH_PARAMS,
+    )
+    return dict(
+        collection_name=QDRANT_COLLECTION,
+        prefetch=prefetch,
+        query=fusion_query(cfg, weights),
+        group_by="job_id",
+        group_size=GROUP_SIZE,
+        limit=top_k,
+        with_payload=payload_keys or RETRIEVAL_PAYLOAD_KEYS,  # hanya job_id, sisanya dari Postgres
+    )
+
+
+def plan_query(req: RetrieveRequest, generation: Optional[int] = None, started: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Query understanding: filter dari teks query (query_parser) digabung dengan
+    req.filters (yang eksplisit menang per field). Sisa teks yang di-embed.
+    deadline (time.monotonic) dihitung dari started + budget request.
+    """
+    text = req.query
+    filters: Dict[str, List[str]] = {}
+    if req.parse_query:
+        query_parser.maybe_refresh(generation)
+        parsed = query_parser.parse(req.query)
+        text = parsed["text"]
+        filters.update(parsed["filters"])
+
+    if req.filters is not None:
+        filters.update({k: v for k, v in req.filters.model_dump().items() if v})
+
     try:
-        # 1) build vectors
-        dense_vec = embed_openai(req.query)          # List[float]
-        sparse_vec = sparse_query_manual(req.query)  # SparseVector
+        fusion = resolve_fusion(req.fusion.model_dump() if req.fusion else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    budget_ms = RETRIEVE_BUDGET_MS if req.budget_ms is None else req.budget_ms
+    deadline = (started or time.monotonic()) + budget_ms / 1000.0 if budget_ms > 0 else None
+
+    return {
+        "text": text,
+        "filters": filters,
+        "filter": build_filter(RetrieveFilters(**filters)) if filters else None,
+        "fusion": fusion,
+        "deadline": deadline,
+        "generation": generation,  # key hydration cache (None = tanpa cache)
+    }
+
+
+def search_kwargs(req: RetrieveRequest, plan: Dict[str, Any], dense_vec: List[float], sparse_vec: Any) -> Dict[str, Any]:
+    payload_keys = None
+    if use_rerank(req):
+        payload_keys = RERANK_PAYLOAD_KEYS
+    elif req.explain:
+        payload_keys = EXPLAIN_PAYLOAD_KEYS
+    return hybrid_query_kwargs(
+        dense_vec,
+        sparse_vec,
+        candidate_limit(req),
+        plan["filter"],
+        plan["fusion"],
+        payload_keys=payload_keys,
+    )
+
+
+def search_docs(req: RetrieveRequest, plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return {"docs": [...], "reranked": None | True | False (fallback ke urutan fused),
+    "degraded": None | alasan sparse-only, "explain": hanya kalau req.explain}.
+    """
+    timings = new_timings(req.explain)  # None -> stage() no-op
+
+    with stage(timings, "total_ms"):
+        # 1) build vectors (cached per normalized query), dense dibatasi deadline
+        started, timeout = time.monotonic(), embed_timeout(plan)
+        with stage(timings, "embedding_ms"):
+            dense_vec, sparse_vec = embed_query(plan["text"], timeout=timeout, timings=timings)  # List[float], SparseVector
+        degraded = degraded_reason(dense_vec, started, timeout)
 
         # Jika QDRANT belum terinisialisasi dengan benar (misal env kosong)
         if not qdrant_client:
              raise HTTPException(status_code=500, detail="Qdrant client not initialized")
 
-        # 2) hybrid query with RRF fusion (fixed prefetch limit)
-        qdrant_res = qdrant_client.query_points(
-            collection_name=QDRANT_COLLECTION,
-            prefetch=[
-                models.Prefetch(
-                    query=models.SparseVector(
-                        indices=sparse_vec.indices,
-                        values=sparse_vec.values,
-                    ),
-                    using="sparse",
-                    limit=PREFETCH_LIMIT,
-                ),
-                models.Prefetch(
-                    query=dense_vec,
-                    using="dense",
-                    limit=PREFETCH_LIMIT,
-                ),
-            ],
-            query=models.FusionQuery(fusion=models.Fusion.RRF),
-        )
+        # 2) hybrid query (fusion), grouped per job_id
+        kwargs = search_kwargs(req, plan, dense_vec, sparse_vec)
+        with stage(timings, "qdrant_ms"):
+            qdrant_res = qdrant_client.query_points_groups(**kwargs)
+
+        # 3) fetch docs (hydration cache / kolom yang diminta) from Postgres based on job_id
+        with stage(timings, "hydration_ms"):
+            docs = hydrate_sync(qdrant_res, hydrate_fields(req), plan["generation"])
+
+        # 4) optional cross-encoder rerank (dengan budget waktu, tidak melewati deadline)
+        if not use_rerank(req):
+            result = {"docs": docs[:req.top_k], "reranked": None, "degraded": degraded}
+        else:
+            with stage(timings, "rerank_ms"):
+                docs, reranked = rerank_docs(
+                    req.query, docs, qdrant_res, req.top_k, budget_ms=remaining_ms(plan, RERANK_BUDGET_MS)
+                )
+            result = {"docs": project_docs(docs, req.fields), "reranked": reranked, "degraded": degraded}
+
+    # 5) explain: rank per prefetch (query tambahan, di luar total_ms)
+    if timings is not None:
+        with stage(timings, "explain_ms"):
+            branches = explain_branches(qdrant_client, kwargs, prefetch_limit(candidate_limit(req)))
+        result["explain"] = build_explain(timings, dense_vec, kwargs, plan["fusion"], result["docs"], qdrant_res, branches)
+    return result
+
+
+def hydrate_fields(req: RetrieveRequest) -> Optional[List[str]]:
+    # rerank membangun ulang teks chunk dari doc lengkap; fields dipotong setelah rerank
+    return None if use_rerank(req) else req.fields
+
+
+def hydrate_sync(
+    qdrant_res: Any, fields: Optional[List[str]] = None, generation: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        return qdrant_result_to_full_docs(db, qdrant_res, fields, generation)
+    finally:
+        db.close()
+
+
+_async_db_error: Optional[str] = None
+
 
-        # 3) fetch full docs from Postgres based on job_id
-        db = SessionLocal()
+def disable_async_db(e: Exception) -> None:
+    """
+    Matikan path DB async untuk proses ini (sekali warning); request memakai session sync.
+    """
+    global _async_db_error
+    if _async_db_error is None:
+        _async_db_error = str(e)
+        print(f"Async DB unavailable, using sync hydration: {type(e).__name__}: {e}")
+
+
+def async_sessionmaker_or_none():
+    """
+    Async sessionmaker, atau None kalau driver async (asyncpg) tidak terpasang
+    / engine tidak bisa dibuat (mis. URL tidak valid).
+    """
+    if _async_db_error is None:
+        try:
+            return get_async_sessionmaker()
+        except Exception as e:
+            disable_async_db(e)
+    return None
+
+
+async def hydrate_async(
+    qdrant_res: Any, fields: Optional[List[str]] = None, generation: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Hydrate lewat AsyncSession; kalau driver async tidak terpasang atau
+    engine / koneksi gagal, fallback ke session sync di threadpool.
+    """
+    sessionmaker = async_sessionmaker_or_none()
+    if sessionmaker is not None:
+        try:
+            async with sessionmaker() as db:
+                return await qdrant_result_to_full_docs_async(db, qdrant_res, fields, generation)
+        except Exception as e:
+            disable_async_db(e)
+    return await run_in_threadpool(hydrate_sync, qdrant_res, fields, generation)
+
+
+def hydrate_batch_sync(
+    qdrant_results: List[Any], limits: List[int], fields: Optional[List[str]] = None, generation: Optional[int] = None
+) -> List[List[Dict[str, Any]]]:
+    db = SessionLocal()
+    try:
+        return qdrant_results_to_full_docs(db, qdrant_results, limits, fields, generation)
+    finally:
+        db.close()
+
+
+async def hydrate_batch_async(
+    qdrant_results: List[Any], limits: List[int], fields: Optional[List[str]] = None, generation: Optional[int] = None
+) -> List[List[Dict[str, Any]]]:
+    sessionmaker = async_sessionmaker_or_none()
+    if sessionmaker is not None:
+        try:
+            async with sessionmaker() as db:
+                return await qdrant_results_to_full_docs_async(db, qdrant_results, limits, fields, generation)
+        except Exception as e:
+            disable_async_db(e)
+    return await run_in_threadpool(hydrate_batch_sync, qdrant_results, limits, fields, generation)
+
+
+async def search_docs_async(req: RetrieveRequest, plan: Dict[str, Any]) -> Dict[str, Any]:
+    timings = new_timings(req.explain)  # None -> stage() no-op
+
+    with stage(timings, "total_ms"):
+        # 1) build vectors; sparse dihitung selagi request embedding berjalan,
+        #    dense ditunggu paling lama sampai deadline (lalu sparse-only)
+        started, timeout = time.monotonic(), embed_timeout(plan)
+        with stage(timings, "embedding_ms"):
+            dense_vec, sparse_vec = await embed_query_async(plan["text"], timeout=timeout, timings=timings)
+        degraded = degraded_reason(dense_vec, started, timeout)
+
+        # 2) hybrid query (AsyncQdrantClient), grouped per job_id
+        kwargs = search_kwargs(req, plan, dense_vec, sparse_vec)
+        with stage(timings, "qdrant_ms"):
+            qdrant_res = await async_qdrant_client.query_points_groups(**kwargs)
+
+        # 3) fetch docs (hydration cache / kolom yang diminta) from Postgres based on job_id
+        with stage(timings, "hydration_ms"):
+            docs = await hydrate_async(qdrant_res, hydrate_fields(req), plan["generation"])
+
+        # 4) optional cross-encoder rerank di thread rerank, event loop tidak ter-block
+        if not use_rerank(req):
+            result = {"docs": docs[:req.top_k], "reranked": None, "degraded": degraded}
+        else:
+            with stage(timings, "rerank_ms"):
+                docs, reranked = await rerank_docs_async(
+                    req.query, docs, qdrant_res, req.top_k, budget_ms=remaining_ms(plan, RERANK_BUDGET_MS)
+                )
+            result = {"docs": project_docs(docs, req.fields), "reranked": reranked, "degraded": degraded}
+
+    # 5) explain: rank per prefetch (query tambahan, di luar total_ms)
+    if timings is not None:
+        with stage(timings, "explain_ms"):
+            branches = await explain_branches_async(async_qdrant_client, kwargs, prefetch_limit(candidate_limit(req)))
+        result["explain"] = build_explain(timings, dense_vec, kwargs, plan["fusion"], result["docs"], qdrant_res, branches)
+    return result
+
+
+def batch_query_request(
+    req: RetrieveRequest, plan: Dict[str, Any], dense_vec: List[float], sparse_vec: Any
+) -> models.QueryRequest:
+    """
+    Satu item query_batch_points. Batch API Qdrant tidak punya group_by, jadi
+    diambil prefetch_limit(top_k) chunk hasil fusion lalu di-dedup per job_id
+    saat hydrate (bisa < top_k job kalau satu job mendominasi chunk teratas).
+    """
+    kwargs = hybrid_query_kwargs(dense_vec, sparse_vec, req.top_k, plan["filter"], plan["fusion"])
+    return models.QueryRequest(
+        prefetch=kwargs.get("prefetch"),
+        query=kwargs["query"],
+        using=kwargs.get("using"),
+        filter=kwargs.get("query_filter"),  # hanya untuk sparse-only
+        limit=prefetch_limit(req.top_k),
+        with_payload=kwargs["with_payload"],
+    )
+
+
+async def search_docs_batch_async(reqs: List[RetrieveRequest], plans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # 1) satu (atau beberapa, per EMBED_BATCH_SIZE) request embedding untuk semua query;
+    #    ditunggu sampai deadline paling longgar, query tanpa dense jadi sparse-only
+    timeouts = [embed_timeout(plan) for plan in plans]
+    timeout = None if None in timeouts else max(timeouts)
+    started = time.monotonic()
+    vectors = await embed_queries_async([plan["text"] for plan in plans], timeout=timeout)
+
+    # 2) satu query_batch_points untuk semua query
+    qdrant_results = await async_qdrant_client.query_batch_points(
+        collection_name=QDRANT_COLLECTION,
+        requests=[batch_query_request(req, plan, dense, sparse) for req, plan, (dense, sparse) in zip(reqs, plans, vectors)],
+    )
+
+    # 3) satu query IN ke Postgres untuk job dari semua query (gabungan fields semua query)
+    docs_per_query = await hydrate_batch_async(
+        qdrant_results, [req.top_k for req in reqs], union_fields([req.fields for req in reqs]), plans[0]["generation"]
+    )
+    return [
+        {"docs": project_docs(docs, req.fields), "reranked": None, "degraded": degraded_reason(dense, started, timeout)}
+        for req, docs, (dense, _) in zip(reqs, docs_per_query, vectors)
+    ]
+
+
+def current_generation() -> int:
+    """
+    Index generation (key result cache); job yang berubah sejak generation
+    sebelumnya di-evict dari hydration cache lokal.
+    """
+    generation = get_generation(QDRANT_COLLECTION)
+    refresh_hydration_cache(QDRANT_COLLECTION, generation)
+    return generation
+
+
+async def current_generation_async() -> int:
+    if _async_db_error is None:
         try:
-            docs = qdrant_result_to_full_docs(db, qdrant_res)
-        finally:
-            db.close()
+            generation = await get_generation_async(QDRANT_COLLECTION)
+            await refresh_hydration_cache_async(QDRANT_COLLECTION, generation)
+            return generation
+        except Exception as e:
+            disable_async_db(e)
+    return await run_in_threadpool(current_generation)
 
-        return RetrieveResponse(
-            query=req.query,
+
+def response_content(req: RetrieveRequest, plan: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "query": req.query,
+        "collection": QDRANT_COLLECTION,
+        "results": result["docs"],
+        "search_query": plan["text"],
+        "applied_filters": plan["filters"] or None,
+        "reranked": result["reranked"],
+        "degraded": bool(result.get("degraded")),
+        "degraded_reason": result.get("degraded"),
+        "explain": result.get("explain"),
+    }
+
+
+@router.post("/retrieve", response_model=RetrieveResponse)
+async def retrieve(req: RetrieveRequest):
+    """
+    Async end-to-end: embedding, Qdrant dan Postgres tidak memakai threadpool,
+    jadi throughput tidak dibatasi ukuran threadpool.
+    """
+    started = time.monotonic()
+    try:
+        generation = None
+        if RESULT_CACHE_SIZE > 0 or HYDRATION_CACHE_SIZE > 0:
+            try:
+                generation = await current_generation_async()
+            except Exception as e:
+                # generation tidak terbaca -> jangan pakai cache (bisa stale)
+                print(f"Result cache bypassed: {e}")
+
+        plan = plan_query(req, generation, started)
+        # explain (timing per request) tidak lewat result cache
+        cached = generation is not None and RESULT_CACHE_SIZE > 0 and not req.explain
+        key = result_cache_key(req, generation, plan["fusion"]) if cached else None
+        if key is not None:
+            result = await result_cache.aget_or_compute(key, lambda: search_docs_async(req, plan), cacheable_result)
+        else:
+            result = await search_docs_async(req, plan)
+
+        content = response_content(req, plan, result)
+        if FAST_JSON:
+            return FastJSONResponse(content)
+        return RetrieveResponse(**content)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/retrieve/sync", response_model=RetrieveResponse)
+def retrieve_sync(req: RetrieveRequest):
+    """
+    Versi sync (threadpool) dari /retrieve, untuk perbandingan / fallback.
+    """
+    started = time.monotonic()
+    try:
+        generation = None
+        if RESULT_CACHE_SIZE > 0 or HYDRATION_CACHE_SIZE > 0:
+            try:
+                generation = current_generation()
+            except Exception as e:
+                # generation tidak terbaca -> jangan pakai cache (bisa stale)
+                print(f"Result cache bypassed: {e}")
+
+        plan = plan_query(req, generation, started)
+        # explain (timing per request) tidak lewat result cache
+        cached = generation is not None and RESULT_CACHE_SIZE > 0 and not req.explain
+        key = result_cache_key(req, generation, plan["fusion"]) if cached else None
+        if key is not None:
+            result = result_cache.get_or_compute(key, lambda: search_docs(req, plan), cacheable_result)
+        else:
+            result = search_docs(req, plan)
+
+        content = response_content(req, plan, result)
+        if FAST_JSON:
+            return FastJSONResponse(content)
+        return RetrieveResponse(**content)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/retrieve/batch", response_model=RetrieveBatchResponse)
+async def retrieve_batch(batch: RetrieveBatchRequest):
+    """
+    Banyak query dalam satu round-trip (evaluasi, job alert, admin): embedding
+    di-batch, satu query_batch_points ke Qdrant, satu query IN ke Postgres.
+    Query yang sudah ada di result cache dilewati. Rerank tidak dijalankan.
+    """
+    if len(batch.requests) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUERIES} queries per batch")
+    if any(r.rerank for r in batch.requests):
+        raise HTTPException(status_code=400, detail="rerank is not supported in /retrieve/batch")
+    if any(r.explain for r in batch.requests):
+        raise HTTPException(status_code=400, detail="explain is not supported in /retrieve/batch")
+
+    started = time.monotonic()
+    try:
+        reqs = [r.model_copy(update={"rerank": False}) for r in batch.requests]
+
+        generation = None
+        if RESULT_CACHE_SIZE > 0 or HYDRATION_CACHE_SIZE > 0:
+            try:
+                generation = await current_generation_async()
+            except Exception as e:
+                # generation tidak terbaca -> jangan pakai cache (bisa stale)
+                print(f"Result cache bypassed: {e}")
+
+        plans = [plan_query(req, generation, started) for req in reqs]
+        keys = [
+            result_cache_key(req, generation, plan["fusion"], variant="batch")
+            if generation is not None and RESULT_CACHE_SIZE > 0 else None
+            for req, plan in zip(reqs, plans)
+        ]
+
+        results: List[Optional[Dict[str, Any]]] = []
+        for key in keys:
+            results.append(await result_cache.aget(key) if key is not None else None)
+
+        todo = [i for i, result in enumerate(results) if result is None]
+        if todo:
+            computed = await search_docs_batch_async([reqs[i] for i in todo], [plans[i] for i in todo])
+            for i, result in zip(todo, computed):
+                results[i] = result
+                if keys[i] is not None and cacheable_result(result):
+                    await result_cache.aset(keys[i], result)
+
+        contents = [response_content(req, plan, result) for req, plan, result in zip(reqs, plans, results)]
+        if FAST_JSON:
+            return FastJSONResponse({"collection": QDRANT_COLLECTION, "results": contents})
+        return RetrieveBatchResponse(
             collection=QDRANT_COLLECTION,
-            results=docs,
+            results=[RetrieveResponse(**content) for content in contents],
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/retrieve/cache/stats")
+def retrieve_cache_stats():
+    """
+    Hit rate dan perkiraan latency yang dihemat per cache di proses ini.
+    """
+    return cache_stats()
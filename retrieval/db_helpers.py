@@ -1,24 +1,57 @@
-from typing import Any, Dict, List
+"""
+Qdrant result -> job docs dari Postgres (hydration).
+
+Doc per job_id di-cache (hydration_cache, key = job_id, value = doc dengan
+field yang pernah di-fetch; hit kalau semua field yang diminta ada). Update
+job di Postgres hanya meng-evict job itu: store meng-evict key-nya (lokal +
+Redis) dan mencatatnya di index_changes, proses retrieval lain meng-evict
+LRU lokalnya saat melihat generation baru (refresh_hydration_cache). Miss
+di-fetch dalam satu query IN yang hanya memilih kolom yang diminta (row
+query, tanpa ORM object), jadi request dengan fields tanpa "description"
+tidak membaca teks deskripsi sama sekali.
+"""
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, get_args
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+if TYPE_CHECKING:  # sqlalchemy.ext.asyncio butuh greenlet, hanya dipakai path async
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 # Pastikan sys.path sudah dikonfigurasi di entry point (app.py)
 # sehingga 'database' package (parent) bisa ditemukan.
+from database.index_generation import get_changed_job_ids, get_changed_job_ids_async
 from database.models import Job
+from schema.retrieval import JobDocField
+from utils.cache import get_cache
 
+# Field doc yang bisa diminta lewat RetrieveRequest.fields (job_id & score selalu ada)
+DOC_FIELDS: List[str] = list(get_args(JobDocField))
+LIST_FIELDS = frozenset(["requirements_tags", "skills", "benefits"])
 
-def qdrant_result_to_full_docs(db: Session, qdrant_result: Any) -> List[Dict[str, Any]]:
-    """
-    Input:
-        - db: SQLAlchemy Session
-        - qdrant_result: hasil retrieve Qdrant (punya .points)
+HYDRATION_CACHE_SIZE = int(os.getenv("HYDRATION_CACHE_SIZE", "5000"))  # 0 = disabled
+HYDRATION_CACHE_TTL = float(os.getenv("HYDRATION_CACHE_TTL", "3600"))
 
-    Output:
-        - list dict full document dari PostgreSQL table jobs_docs
-        - SETIAP ITEM ada field 'score' (diambil dari Qdrant)
-        - urutan mengikuti ranking Qdrant
+hydration_cache = get_cache(
+    "job_hydration",
+    maxsize=HYDRATION_CACHE_SIZE,
+    ttl=HYDRATION_CACHE_TTL,
+    redis_url=(os.getenv("QUERY_CACHE_REDIS_URL") or os.getenv("REDIS_URL")) if HYDRATION_CACHE_SIZE > 0 else None,
+)
+
+
+def rank_job_ids(qdrant_result: Any) -> Tuple[List[str], Dict[str, float]]:
     """
+    job_id unik sesuai ranking Qdrant + score tertinggi per job_id.
+    Menerima hasil query_points (.points) maupun query_points_groups (.groups,
+    sudah satu grup per job_id dan terurut).
+    """
+    groups = getattr(qdrant_result, "groups", None)
+    if groups is not None:
+        ordered_job_ids = [str(g.id) for g in groups if g.hits]
+        job_score_map = {str(g.id): max(float(h.score or 0.0) for h in g.hits) for g in groups if g.hits}
+        return ordered_job_ids, job_score_map
 
-    # 1) Extract job_ids + ambil score tertinggi per job_id
     points = getattr(qdrant_result, "points", None) or []
 
     ordered_job_ids: List[str] = []
@@ -42,37 +75,293 @@ def qdrant_result_to_full_docs(db: Session, qdrant_result: Any) -> List[Dict[str
             seen.add(job_id)
             ordered_job_ids.append(job_id)
 
+    return ordered_job_ids, job_score_map
+
+
+def resolve_fields(fields: Optional[List[str]] = None) -> List[str]:
+    if not fields:
+        return DOC_FIELDS
+    wanted = set(fields)
+    return [f for f in DOC_FIELDS if f in wanted]
+
+
+def fields_signature(fields: List[str]) -> str:
+    return "all" if fields == DOC_FIELDS else ",".join(fields)
+
+
+def doc_query(job_ids: List[str], fields: List[str]):
+    return select(Job.job_id, *[getattr(Job, f) for f in fields]).where(Job.job_id.in_(job_ids))
+
+
+def row_to_doc(row: Any, fields: List[str]) -> Dict[str, Any]:
+    m = row._mapping
+    doc: Dict[str, Any] = {"job_id": m["job_id"]}
+    for f in fields:
+        value = m[f]
+        if f in LIST_FIELDS:
+            value = value or []
+        elif f == "created_at":
+            value = value.isoformat() if value else None
+        doc[f] = value
+    return doc
+
+
+def project_doc(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    if len(doc) == len(fields) + 1:  # job_id + tepat fields yang diminta
+        return doc
+    return {"job_id": doc["job_id"], **{f: doc[f] for f in fields}}
+
+
+def cache_enabled(generation: Optional[int]) -> bool:
+    return generation is not None and HYDRATION_CACHE_SIZE > 0
+
+
+def split_cached(
+    found: Dict[str, Dict[str, Any]], job_ids: List[str], fields: List[str]
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    (doc yang entry-nya punya semua field yang diminta, field yang di-fetch
+    untuk miss). Entry yang kurang field dihitung miss; field-nya ikut
+    di-fetch supaya entry baru tidak lebih sempit dari yang lama.
+    """
+    docs: Dict[str, Dict[str, Any]] = {}
+    extra = set()
+    for jid, doc in found.items():
+        if all(f in doc for f in fields):
+            docs[jid] = project_doc(doc, fields)
+        else:
+            extra.update(doc)
+    # miss dihitung per job_id
+    hydration_cache.record_misses(len(set(job_ids)) - len(docs))
+    return docs, resolve_fields(fields + [f for f in DOC_FIELDS if f in extra]) if extra else fields
+
+
+def lookup_cached(
+    job_ids: List[str], fields: List[str], generation: Optional[int]
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Doc yang sudah ada di hydration_cache (key = job_id) + field yang perlu di-fetch untuk sisanya.
+    """
+    if not cache_enabled(generation) or not job_ids:
+        return {}, fields
+    return split_cached(hydration_cache.get_many(list(dict.fromkeys(job_ids)), record_misses=False), job_ids, fields)
+
+
+async def lookup_cached_async(
+    job_ids: List[str], fields: List[str], generation: Optional[int]
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    if not cache_enabled(generation) or not job_ids:
+        return {}, fields
+    found = await hydration_cache.aget_many(list(dict.fromkeys(job_ids)), record_misses=False)
+    return split_cached(found, job_ids, fields)
+
+
+def store_cached(docs: Dict[str, Dict[str, Any]], generation: Optional[int]) -> None:
+    if cache_enabled(generation) and docs:
+        hydration_cache.set_many(docs)
+
+
+async def store_cached_async(docs: Dict[str, Dict[str, Any]], generation: Optional[int]) -> None:
+    if cache_enabled(generation) and docs:
+        await hydration_cache.aset_many(docs)
+
+
+def evict_hydrated(job_ids: List[str]) -> None:
+    """
+    Dipanggil store setelah doc job berubah di Postgres: evict LRU lokal + Redis.
+    LRU lokal proses lain di-evict lewat refresh_hydration_cache.
+    """
+    if HYDRATION_CACHE_SIZE > 0 and job_ids:
+        hydration_cache.delete_many(job_ids)
+
+
+# generation terakhir yang perubahannya sudah di-evict dari LRU lokal, per collection
+_seen_generation: Dict[str, int] = {}
+
+
+def hydration_since(collection: str, generation: Optional[int]) -> Optional[int]:
+    """
+    Generation lama kalau ada perubahan yang belum di-evict, selain itu None.
+    """
+    if not cache_enabled(generation):
+        return None
+    seen = _seen_generation.get(collection)
+    if seen is None or generation < seen:
+        if seen is not None:  # counter di-reset -> tidak bisa dibandingkan
+            hydration_cache.clear(shared=False)
+        _seen_generation[collection] = generation
+        return None
+    return seen if generation > seen else None
+
+
+def apply_hydration_changes(collection: str, generation: int, changed: Optional[List[str]]) -> None:
+    if changed is None:
+        hydration_cache.clear(shared=False)
+    else:
+        hydration_cache.delete_many(changed, shared=False)
+    _seen_generation[collection] = max(generation, _seen_generation.get(collection, generation))
+
+
+def refresh_hydration_cache(collection: str, generation: Optional[int]) -> None:
+    """
+    Evict job yang berubah sejak generation terakhir yang dilihat proses ini
+    (index_changes). Log tidak lengkap / tidak terbaca -> clear LRU lokal.
+    """
+    since = hydration_since(collection, generation)
+    if since is None:
+        return
+    try:
+        changed = get_changed_job_ids(collection, since, generation)
+    except Exception as e:
+        print(f"Hydration cache cleared, index changes unavailable: {e}")
+        changed = None
+    apply_hydration_changes(collection, generation, changed)
+
+
+async def refresh_hydration_cache_async(collection: str, generation: Optional[int]) -> None:
+    since = hydration_since(collection, generation)
+    if since is None:
+        return
+    try:
+        changed = await get_changed_job_ids_async(collection, since, generation)
+    except Exception as e:
+        print(f"Hydration cache cleared, index changes unavailable: {e}")
+        changed = None
+    apply_hydration_changes(collection, generation, changed)
+
+
+def hydrate_docs(
+    db: Session, job_ids: List[str], fields: Optional[List[str]] = None, generation: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    job_id -> doc (tanpa score): cache dulu, sisanya satu query IN kolom yang diminta.
+    generation None -> cache dilewati.
+    """
+    fields = resolve_fields(fields)
+    docs, fetch_fields = lookup_cached(job_ids, fields, generation)
+    missing = [jid for jid in job_ids if jid not in docs]
+    if missing:
+        fetched = {row.job_id: row_to_doc(row, fetch_fields) for row in db.execute(doc_query(missing, fetch_fields))}
+        store_cached(fetched, generation)
+        docs.update({jid: project_doc(doc, fields) for jid, doc in fetched.items()})
+    return docs
+
+
+async def hydrate_docs_async(
+    db: "AsyncSession", job_ids: List[str], fields: Optional[List[str]] = None, generation: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    fields = resolve_fields(fields)
+    # aget_many / aset_many: tier Redis (sync) di thread supaya event loop tidak ter-block
+    docs, fetch_fields = await lookup_cached_async(job_ids, fields, generation)
+    missing = [jid for jid in job_ids if jid not in docs]
+    if missing:
+        rows = (await db.execute(doc_query(missing, fetch_fields))).all()
+        fetched = {row.job_id: row_to_doc(row, fetch_fields) for row in rows}
+        await store_cached_async(fetched, generation)
+        docs.update({jid: project_doc(doc, fields) for jid, doc in fetched.items()})
+    return docs
+
+
+def scored_docs(
+    docs: Dict[str, Dict[str, Any]], ordered_job_ids: List[str], job_score_map: Dict[str, float]
+) -> List[Dict[str, Any]]:
+    # Return sesuai ranking Qdrant (skip yang tidak ada di DB); dict baru, entry cache tidak diubah
+    return [
+        {**docs[jid], "score": job_score_map.get(jid, 0.0)}
+        for jid in ordered_job_ids if jid in docs
+    ]
+
+
+def qdrant_result_to_full_docs(
+    db: Session, qdrant_result: Any, fields: Optional[List[str]] = None, generation: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Input:
+        - db: SQLAlchemy Session
+        - qdrant_result: hasil retrieve Qdrant (punya .points atau .groups)
+        - fields: subset DOC_FIELDS (None = semua)
+        - generation: index generation untuk hydration_cache (None = tanpa cache)
+
+    Output:
+        - list dict document dari PostgreSQL table jobs_docs
+        - SETIAP ITEM ada field 'score' (diambil dari Qdrant)
+        - urutan mengikuti ranking Qdrant
+    """
+    ordered_job_ids, job_score_map = rank_job_ids(qdrant_result)
     if not ordered_job_ids:
         return []
 
-    # 2) Fetch all matching rows in ONE query (Postgres)
-    jobs: List[Job] = db.query(Job).filter(Job.job_id.in_(ordered_job_ids)).all()
-
-    # 3) Convert ke dict + attach score
-    def job_to_dict(job: Job) -> Dict[str, Any]:
-        return {
-            "job_id": job.job_id,
-            "score": job_score_map.get(job.job_id, 0.0),
-
-            "url": job.url,
-            "title": job.title,
-            "company": job.company,
-            "logo": job.logo,
-            "salary": job.salary,
-            "posted_at": job.posted_at,
-            "work_type": job.work_type,
-            "experience": job.experience,
-            "education": job.education,
-            "requirements_tags": job.requirements_tags or [],
-            "skills": job.skills or [],
-            "benefits": job.benefits or [],
-            "description": job.description,
-            "address": job.address,
-            "source": job.source,
-            "created_at": job.created_at.isoformat() if job.created_at else None,
-        }
-
-    job_map = {j.job_id: job_to_dict(j) for j in jobs}
-
-    # 4) Return sesuai ranking Qdrant (skip yang tidak ada di DB)
-    return [job_map[jid] for jid in ordered_job_ids if jid in job_map]
+    docs = hydrate_docs(db, ordered_job_ids, fields, generation)
+    return scored_docs(docs, ordered_job_ids, job_score_map)
+
+
+async def qdrant_result_to_full_docs_async(
+    db: "AsyncSession", qdrant_result: Any, fields: Optional[List[str]] = None, generation: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Sama dengan qdrant_result_to_full_docs, untuk AsyncSession.
+    """
+    ordered_job_ids, job_score_map = rank_job_ids(qdrant_result)
+    if not ordered_job_ids:
+        return []
+
+    docs = await hydrate_docs_async(db, ordered_job_ids, fields, generation)
+    return scored_docs(docs, ordered_job_ids, job_score_map)
+
+
+def rank_batch(qdrant_results: List[Any], limits: List[int]) -> List[Tuple[List[str], Dict[str, float]]]:
+    """
+    rank_job_ids per hasil, dipotong ke limit (jumlah job) masing-masing.
+    """
+    ranked = []
+    for result, limit in zip(qdrant_results, limits):
+        ordered_job_ids, job_score_map = rank_job_ids(result)
+        ranked.append((ordered_job_ids[:limit], job_score_map))
+    return ranked
+
+
+def batch_job_ids(ranked: List[Tuple[List[str], Dict[str, float]]]) -> List[str]:
+    return list(dict.fromkeys(jid for ordered_job_ids, _ in ranked for jid in ordered_job_ids))
+
+
+def qdrant_results_to_full_docs(
+    db: Session,
+    qdrant_results: List[Any],
+    limits: List[int],
+    fields: Optional[List[str]] = None,
+    generation: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Versi batch: semua job dari semua query di-fetch dengan SATU query IN.
+    """
+    ranked = rank_batch(qdrant_results, limits)
+    docs = hydrate_docs(db, batch_job_ids(ranked), fields, generation)
+    return [scored_docs(docs, ordered_job_ids, job_score_map) for ordered_job_ids, job_score_map in ranked]
+
+
+async def qdrant_results_to_full_docs_async(
+    db: "AsyncSession",
+    qdrant_results: List[Any],
+    limits: List[int],
+    fields: Optional[List[str]] = None,
+    generation: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    ranked = rank_batch(qdrant_results, limits)
+    docs = await hydrate_docs_async(db, batch_job_ids(ranked), fields, generation)
+    return [scored_docs(docs, ordered_job_ids, job_score_map) for ordered_job_ids, job_score_map in ranked]
+
+
+def project_docs(docs: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Potong doc ke job_id + score + fields (dipakai kalau hydrate mengambil lebih banyak field).
+    """
+    if not fields:
+        return docs
+    keep = {"job_id", "score", *fields}
+    return [{k: v for k, v in d.items() if k in keep} for d in docs]
+
+
+def union_fields(field_lists: List[Optional[List[str]]]) -> Optional[List[str]]:
+    if any(not fields for fields in field_lists):
+        return None
+    return resolve_fields([f for fields in field_lists for f in fields])
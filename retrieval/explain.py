@@ -0,0 +1,173 @@
+"""
+Explain mode for /retrieve (RetrieveRequest.explain).
+
+Returns the time per stage (sparse encoding, dense embedding, Qdrant query,
+Postgres hydration, rerank). For every result it also returns:
+- the matched chunk (payload "field" / "chunk_idx" of the best hit in the
+  fused query);
+- the job's rank and score in the sparse and dense prefetches separately.
+
+Qdrant does not return per-prefetch ranks from a fusion query. When explain
+is on, every prefetch of the real query is re-run as a plain chunk-level
+query with the same vector, filter, limit and params, in one
+query_batch_points call. The chunks are then de-duplicated per job_id (rank
+1 = best job of that branch). With per-field prefetches, a job reports its
+best-ranked field per branch. The extra round-trip is reported as
+explain_ms and is not part of total_ms.
+
+Without explain nothing is collected: timings is None, stage() is a shared
+no-op context manager, and no extra query is sent.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from qdrant_client import models
+
+from .db_helpers import rank_job_ids
+from .hybrid import elapsed_ms
+from .rerank import best_chunks
+
+# Payload query utama saat explain (chunk yang match per hasil)
+EXPLAIN_PAYLOAD_KEYS: List[str] = ["job_id", "field", "chunk_idx"]
+
+_NOOP = nullcontext()
+
+
+def new_timings(enabled: bool) -> Optional[Dict[str, float]]:
+    return {} if enabled else None
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = elapsed_ms(t0)
+
+
+def stage(timings: Optional[Dict[str, float]], name: str):
+    """
+    `with stage(timings, "qdrant_ms"):` -> durasi blok dalam ms; no-op kalau timings None.
+    """
+    return _NOOP if timings is None else _timed(timings, name)
+
+
+def branch_requests(query_kwargs: Dict[str, Any], default_limit: int) -> Tuple[List[str], List[models.QueryRequest]]:
+    """
+    (branch per request, QueryRequest per prefetch) dari argumen
+    query_points_groups (hybrid_query_kwargs). Sparse-only (degraded) -> satu
+    query sparse.
+    """
+    prefetches = query_kwargs.get("prefetch") or [
+        models.Prefetch(
+            query=query_kwargs["query"],
+            using=query_kwargs["using"],
+            filter=query_kwargs.get("query_filter"),
+            limit=default_limit,
+        )
+    ]
+    branches = [p.using for p in prefetches]
+    requests = [
+        models.QueryRequest(
+            query=p.query,
+            using=p.using,
+            filter=p.filter,
+            limit=p.limit,
+            params=p.params,
+            with_payload=EXPLAIN_PAYLOAD_KEYS,
+        )
+        for p in prefetches
+    ]
+    return branches, requests
+
+
+def branch_ranks(branches: List[str], responses: List[Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    branch -> job_id -> {rank, score, field, chunk_idx}; rank per job (chunk
+    pertama job itu di hasil prefetch), rank terbaik kalau ada beberapa
+    prefetch per branch.
+    """
+    ranks: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for branch, response in zip(branches, responses):
+        best = ranks.setdefault(branch, {})
+        seen = set()
+        for p in getattr(response, "points", None) or []:
+            payload = p.payload or {}
+            job_id = payload.get("job_id")
+            if not job_id or job_id in seen:
+                continue
+            seen.add(job_id)
+            hit = {
+                "rank": len(seen),
+                "score": float(p.score or 0.0),
+                "field": payload.get("field"),
+                "chunk_idx": payload.get("chunk_idx"),
+            }
+            current = best.get(job_id)
+            if current is None or (hit["rank"], -hit["score"]) < (current["rank"], -current["score"]):
+                best[job_id] = hit
+    return ranks
+
+
+def explain_branches(client: Any, query_kwargs: Dict[str, Any], default_limit: int) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    branches, requests = branch_requests(query_kwargs, default_limit)
+    responses = client.query_batch_points(collection_name=query_kwargs["collection_name"], requests=requests)
+    return branch_ranks(branches, responses)
+
+
+async def explain_branches_async(
+    client: Any, query_kwargs: Dict[str, Any], default_limit: int
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    branches, requests = branch_requests(query_kwargs, default_limit)
+    responses = await client.query_batch_points(collection_name=query_kwargs["collection_name"], requests=requests)
+    return branch_ranks(branches, responses)
+
+
+def explain_results(
+    docs: List[Dict[str, Any]], qdrant_result: Any, branches: Dict[str, Dict[str, Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Satu entry per doc final (urutan response): rank/score final, rank/score
+    di query fused, chunk yang match, dan hit per branch (None = job tidak
+    masuk kandidat branch itu).
+    """
+    ordered_job_ids, job_score_map = rank_job_ids(qdrant_result)
+    fused_rank = {jid: i for i, jid in enumerate(ordered_job_ids, start=1)}
+    chunks = best_chunks(qdrant_result)
+
+    rows = []
+    for i, doc in enumerate(docs, start=1):
+        jid = doc["job_id"]
+        chunk = chunks.get(jid, {})
+        rows.append({
+            "job_id": jid,
+            "rank": i,
+            "score": doc.get("score"),
+            "fused_rank": fused_rank.get(jid),
+            "fused_score": job_score_map.get(jid),
+            "field": chunk.get("field"),
+            "chunk_idx": chunk.get("chunk_idx"),
+            "sparse": branches.get("sparse", {}).get(jid),
+            "dense": branches.get("dense", {}).get(jid),
+        })
+    return rows
+
+
+def build_explain(
+    timings: Dict[str, float],
+    dense_vec: List[float],
+    query_kwargs: Dict[str, Any],
+    fusion: Dict[str, Any],
+    docs: List[Dict[str, Any]],
+    qdrant_result: Any,
+    branches: Dict[str, Dict[str, Dict[str, Any]]],
+) -> Dict[str, Any]:
+    return {
+        "timings": dict(timings),  # copy: embedding di background bisa masih menulis
+        # dense ada tapi tidak dihitung request ini -> query_cache hit
+        "embedding_cache_hit": bool(dense_vec) and "dense_embedding_ms" not in timings,
+        "fusion": fusion if query_kwargs.get("prefetch") else None,
+        "results": explain_results(docs, qdrant_result, branches),
+    }
@@ -0,0 +1,44 @@
+"""
+Structured /retrieve filters -> Qdrant Filter (applied to every prefetch).
+
+- source    : exact match (keyword index), any of the given values
+- work_type : full-text match on payload "work_type", any of the given values
+- education : full-text match on payload "education", any of the given values
+- location  : full-text match on payload "address", any of the given values
+
+Different fields are AND-ed, values inside one field are OR-ed.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+
+from qdrant_client import models
+
+from schema.retrieval import RetrieveFilters
+
+# filter field -> (payload key, match type)
+FILTER_FIELDS: Dict[str, Tuple[str, str]] = {
+    "source": ("source", "keyword"),
+    "work_type": ("work_type", "text"),
+    "education": ("education", "text"),
+    "location": ("address", "text"),
+}
+
+
+def field_condition(key: str, kind: str, values: List[str]) -> Union[models.FieldCondition, models.Filter]:
+    if kind == "keyword":
+        return models.FieldCondition(key=key, match=models.MatchAny(any=values))
+    if len(values) == 1:
+        return models.FieldCondition(key=key, match=models.MatchText(text=values[0]))
+    return models.Filter(should=[models.FieldCondition(key=key, match=models.MatchText(text=v)) for v in values])
+
+
+def build_filter(filters: Optional[RetrieveFilters]) -> Optional[models.Filter]:
+    if filters is None:
+        return None
+
+    must = []
+    for name, (key, kind) in FILTER_FIELDS.items():
+        values = [v.strip() for v in (getattr(filters, name) or []) if v and v.strip()]
+        if values:
+            must.append(field_condition(key, kind, values))
+
+    return models.Filter(must=must) if must else None
@@ -0,0 +1,137 @@
+"""
+Fusion strategy + prefetch layout for the hybrid /retrieve query.
+
+Methods (env FUSION_METHOD or request "fusion.method"):
+- "rrf"      : reciprocal rank fusion, all branches equal (original behaviour)
+- "weighted" : RRF with per-branch weights (dense / sparse, x per-field weight)
+- "dbsf"     : distribution-based score fusion (normalised scores, no weights)
+
+Per-field prefetches (env FUSION_FIELD_WEIGHTS or "fusion.field_weights"):
+instead of one sparse + one dense prefetch over all chunks, one prefetch per
+(branch, payload "field") pair, e.g. "title_company=2,skills_requirements=1.5,
+benefits=0.5". Unlisted fields keep weight 1, weight 0 drops the field.
+Weights only affect the "weighted" method; per-field prefetches still give
+every field its own candidate slots under "rrf" / "dbsf".
+
+Weighted RRF needs a Qdrant server with RRF weights support (1.16+).
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from qdrant_client import models
+
+# Nilai "field" yang dihasilkan store.helper.document_splitting_multi
+CHUNK_FIELDS = ["title_company", "skills_requirements", "description", "meta", "education", "benefits"]
+
+FUSION_METHODS = ("rrf", "weighted", "dbsf")
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """
+    "title_company=2,benefits=0.5" -> {"title_company": 2.0, "benefits": 0.5}
+    """
+    weights: Dict[str, float] = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            weights[name.strip()] = float(value)
+    return weights
+
+
+def _optional_int(name: str) -> Optional[int]:
+    return int(os.getenv(name)) if os.getenv(name) else None
+
+
+FUSION_DEFAULTS: Dict[str, Any] = {
+    "method": os.getenv("FUSION_METHOD", "rrf").lower(),
+    "rrf_k": _optional_int("FUSION_RRF_K"),
+    "dense_limit": _optional_int("FUSION_DENSE_LIMIT"),
+    "sparse_limit": _optional_int("FUSION_SPARSE_LIMIT"),
+    "dense_weight": float(os.getenv("FUSION_DENSE_WEIGHT", "1.0")),
+    "sparse_weight": float(os.getenv("FUSION_SPARSE_WEIGHT", "1.0")),
+    "field_weights": parse_weights(os.getenv("FUSION_FIELD_WEIGHTS", "")) or None,
+}
+
+
+def resolve_fusion(options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Default dari env, ditimpa field request yang diisi.
+    """
+    cfg = dict(FUSION_DEFAULTS)
+    cfg.update({k: v for k, v in (options or {}).items() if v is not None})
+    if cfg["method"] not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{cfg['method']}', expected one of {list(FUSION_METHODS)}")
+    unknown = set(cfg["field_weights"] or {}) - set(CHUNK_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown chunk field(s) {sorted(unknown)}, expected any of {CHUNK_FIELDS}")
+    if cfg["dense_weight"] <= 0 and cfg["sparse_weight"] <= 0:
+        raise ValueError("At least one of dense_weight / sparse_weight must be > 0")
+    if cfg["field_weights"] and all(cfg["field_weights"].get(f, 1.0) <= 0 for f in CHUNK_FIELDS):
+        raise ValueError("field_weights excludes every chunk field")
+    return cfg
+
+
+def and_filter(base: Optional[models.Filter], condition: models.FieldCondition) -> models.Filter:
+    if base is None:
+        return models.Filter(must=[condition])
+    return models.Filter(must=[base, condition])
+
+
+def build_prefetches(
+    dense_vec: List[float],
+    sparse_vec: Any,
+    cfg: Dict[str, Any],
+    *,
+    default_limit: int,
+    query_filter: Optional[models.Filter] = None,
+    dense_params: Optional[models.SearchParams] = None,
+) -> Tuple[List[models.Prefetch], List[float]]:
+    """
+    Return (prefetches, weights) dengan urutan yang sama.
+    """
+    branches = [
+        (
+            "sparse",
+            models.SparseVector(indices=sparse_vec.indices, values=sparse_vec.values),
+            cfg["sparse_limit"] or default_limit,
+            cfg["sparse_weight"],
+            None,
+        ),
+        (
+            "dense",
+            dense_vec,
+            cfg["dense_limit"] or default_limit,
+            cfg["dense_weight"],
+            dense_params,
+        ),
+    ]
+
+    if cfg["field_weights"]:
+        fields = [(f, cfg["field_weights"].get(f, 1.0)) for f in CHUNK_FIELDS]
+        fields = [(f, w) for f, w in fields if w > 0]
+    else:
+        fields = [(None, 1.0)]
+
+    prefetches: List[models.Prefetch] = []
+    weights: List[float] = []
+    for using, query, limit, branch_weight, params in branches:
+        if branch_weight <= 0:
+            continue
+        for field, field_weight in fields:
+            flt = query_filter
+            if field is not None:
+                flt = and_filter(query_filter, models.FieldCondition(key="field", match=models.MatchValue(value=field)))
+            prefetches.append(models.Prefetch(query=query, using=using, filter=flt, limit=limit, params=params))
+            weights.append(branch_weight * field_weight)
+
+    return prefetches, weights
+
+
+def fusion_query(cfg: Dict[str, Any], weights: List[float]) -> models.Query:
+    if cfg["method"] == "dbsf":
+        return models.FusionQuery(fusion=models.Fusion.DBSF)
+    if cfg["method"] == "weighted":
+        return models.RrfQuery(rrf=models.Rrf(k=cfg["rrf_k"], weights=weights))
+    if cfg["rrf_k"] is not None:
+        return models.RrfQuery(rrf=models.Rrf(k=cfg["rrf_k"]))
+    return models.FusionQuery(fusion=models.Fusion.RRF)
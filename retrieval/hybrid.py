@@ -1,43 +1,309 @@
 import os
-from typing import List, Union
+import asyncio
+import hashlib
+import json
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from qdrant_client.models import SparseVector
 
 # Use shared sparse vector utilities
-from utils.sparse import text_to_sparse_vector as sparse_query_manual
+from utils.sparse import (
+    SPARSE_MAX_TERMS,
+    SPARSE_SCHEME,
+    SPARSE_STEMMER,
+    SPARSE_STOPWORDS,
+    query_sparse_vector as sparse_query_manual,
+)
+from utils.dense import EMBEDDING_DIMENSIONS, embedding_request_kwargs, fit_dimensions
+from utils.cache import get_cache
+
+# Query embedding cache (normalized query + model -> dense + sparse)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))  # 0 = disabled
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+QUERY_CACHE_REDIS_URL = os.getenv("QUERY_CACHE_REDIS_URL") or os.getenv("REDIS_URL")
+
+# Maks. input per request embedding untuk /retrieve/batch
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "128"))
+
+# Timeout HTTP per request embedding (juga membatasi request yang dibiarkan
+# selesai di background setelah budget /retrieve habis)
+EMBED_HTTP_TIMEOUT = float(os.getenv("EMBED_HTTP_TIMEOUT", "10"))
+# Hedged request: kalau request embedding belum kembali setelah EMBED_HEDGE_MS,
+# kirim request kedua dan pakai yang lebih dulu berhasil (0 = off)
+EMBED_HEDGE_MS = float(os.getenv("EMBED_HEDGE_MS", "0"))
+
+query_cache = get_cache(
+    "query_embedding",
+    maxsize=QUERY_CACHE_SIZE,
+    ttl=QUERY_CACHE_TTL,
+    redis_url=QUERY_CACHE_REDIS_URL if QUERY_CACHE_SIZE > 0 else None,
+)
+
+
+@lru_cache(maxsize=4)
+def openrouter_client(api_key: str) -> OpenAI:
+    # Satu client per proses (connection pool di-reuse antar request)
+    return OpenAI(
+        base_url="https://openrouter.ai/api/v1",
+        api_key=api_key,
+        timeout=EMBED_HTTP_TIMEOUT,
+    )
+
+
+@lru_cache(maxsize=4)
+def async_openrouter_client(api_key: str) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        base_url="https://openrouter.ai/api/v1",
+        api_key=api_key,
+        timeout=EMBED_HTTP_TIMEOUT,
+    )
 
 
 def embed_openai(
     texts: Union[str, List[str]],
     model: str = "text-embedding-3-small",
+    dimensions: Optional[int] = EMBEDDING_DIMENSIONS,
+    timeout: Optional[float] = None,
 ) -> Union[List[float], List[List[float]]]:
     """
-    Uses OpenRouter for Embeddings. 
+    Uses OpenRouter for Embeddings.
     Ensure valid model ID in .env (EMBEDDING_MODEL).
+    Vectors are shortened to EMBEDDING_DIMENSIONS, same as at ingest.
+    timeout (detik): batas keras untuk request ini, tanpa retry; [] kalau lewat.
     """
-    
+
     api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
     embedding_model = os.getenv("EMBEDDING_MODEL", "qwen/qwen-embedding")
-    
+
     if not api_key:
         raise RuntimeError("OPENROUTER_API_KEY env var is not set")
-    
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key
-    )
+
+    client = openrouter_client(api_key)
+    if timeout is not None:
+        client = client.with_options(timeout=max(timeout, 0.001), max_retries=0)
 
     try:
         resp = client.embeddings.create(
             model=embedding_model,
             input=texts,
+            **embedding_request_kwargs(dimensions),
         )
     except Exception as e:
         print(f"OpenRouter Embedding Error: {e}")
         return [] if isinstance(texts, list) else []
 
     if isinstance(texts, str):
-        return resp.data[0].embedding
+        return fit_dimensions(resp.data[0].embedding, dimensions)
+
+    # batch
+    return [fit_dimensions(item.embedding, dimensions) for item in resp.data]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def query_cache_key(query: str, dimensions: Optional[int] = EMBEDDING_DIMENSIONS) -> str:
+    """
+    Key = normalized query + embedding model/dimensions + sparse analyzer settings,
+    jadi ganti model / analyzer otomatis tidak memakai entry lama.
+    """
+    raw = json.dumps([
+        normalize_query(query),
+        os.getenv("EMBEDDING_MODEL", "qwen/qwen-embedding"),
+        dimensions,
+        SPARSE_SCHEME,
+        SPARSE_STOPWORDS,
+        SPARSE_STEMMER,
+        SPARSE_MAX_TERMS,
+    ])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def elapsed_ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000.0, 3)
+
+
+def sparse_encode(normalized: str, timings: Optional[Dict[str, float]] = None) -> SparseVector:
+    if timings is None:
+        return sparse_query_manual(normalized)
+    t0 = time.perf_counter()
+    sparse = sparse_query_manual(normalized)
+    timings["sparse_encoding_ms"] = elapsed_ms(t0)
+    return sparse
+
+
+def embed_query(
+    query: str, timeout: Optional[float] = None, timings: Optional[Dict[str, float]] = None
+) -> Tuple[List[float], SparseVector]:
+    """
+    Dense + sparse vector untuk satu query, lewat query_cache.
+    Embedding yang gagal / lewat timeout (list kosong) tidak di-cache.
+    timings (explain): diisi dense_embedding_ms / sparse_encoding_ms kalau
+    benar-benar dihitung (tidak ada = cache hit).
+    """
+    normalized = normalize_query(query)
+
+    def compute():
+        t0 = time.perf_counter()
+        dense = embed_openai(normalized, timeout=timeout)
+        if timings is not None:
+            timings["dense_embedding_ms"] = elapsed_ms(t0)
+        if not dense:
+            return None
+        sparse = sparse_encode(normalized, timings)
+        return {"dense": dense, "sparse": {"indices": list(sparse.indices), "values": list(sparse.values)}}
+
+    value = query_cache.get_or_compute(query_cache_key(query), compute)
+    if value is None:
+        return [], sparse_encode(normalized, timings)
+    return value["dense"], SparseVector(**value["sparse"])
+
+
+async def embed_openai_async(
+    text: Union[str, List[str]], dimensions: Optional[int] = EMBEDDING_DIMENSIONS
+) -> Union[List[float], List[List[float]]]:
+    """
+    Async variant of embed_openai (single text or batch). Returns [] on error.
+    """
+    api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
+    embedding_model = os.getenv("EMBEDDING_MODEL", "qwen/qwen-embedding")
+
+    if not api_key:
+        raise RuntimeError("OPENROUTER_API_KEY env var is not set")
+
+    try:
+        resp = await async_openrouter_client(api_key).embeddings.create(
+            model=embedding_model,
+            input=text,
+            **embedding_request_kwargs(dimensions),
+        )
+    except Exception as e:
+        print(f"OpenRouter Embedding Error: {e}")
+        return []
+
+    if isinstance(text, str):
+        return fit_dimensions(resp.data[0].embedding, dimensions)
 
     # batch
-    return [item.embedding for item in resp.data]
+    return [fit_dimensions(item.embedding, dimensions) for item in resp.data]
+
+
+async def embed_hedged_async(text: str) -> List[float]:
+    """
+    embed_openai_async dengan hedging (EMBED_HEDGE_MS): request kedua dikirim
+    kalau yang pertama lambat / gagal, hasil berhasil pertama yang dipakai.
+    """
+    first = asyncio.create_task(embed_openai_async(text))
+    if EMBED_HEDGE_MS <= 0:
+        return await first
+
+    done, _ = await asyncio.wait({first}, timeout=EMBED_HEDGE_MS / 1000.0)
+    if done and first.result():
+        return first.result()
+
+    pending = set() if done else {first}
+    pending.add(asyncio.create_task(embed_openai_async(text)))
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result():
+                    return task.result()
+        return []
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _consume_result(task: "asyncio.Future") -> None:
+    # task background (setelah timeout) jangan sampai error-nya tidak terbaca
+    if not task.cancelled():
+        task.exception()
+
+
+async def embed_query_async(
+    query: str, timeout: Optional[float] = None, timings: Optional[Dict[str, float]] = None
+) -> Tuple[List[float], SparseVector]:
+    """
+    Async embed_query: embedding request dikirim dulu, sparse vector dihitung
+    selagi menunggu response (tanpa threadpool).
+    timeout (detik): lewat dari ini dense = [] (caller turun ke sparse-only);
+    request embedding tetap selesai di background dan mengisi query_cache.
+    timings: seperti embed_query (dense_embedding_ms overlap dengan sparse).
+    """
+    normalized = normalize_query(query)
+
+    async def compute():
+        t0 = time.perf_counter()
+        task = asyncio.create_task(embed_hedged_async(normalized))
+        await asyncio.sleep(0)  # biarkan request embedding mulai jalan
+        sparse = sparse_encode(normalized, timings)
+        dense = await task
+        if timings is not None:
+            timings["dense_embedding_ms"] = elapsed_ms(t0)
+        if not dense:
+            return None
+        return {"dense": dense, "sparse": {"indices": list(sparse.indices), "values": list(sparse.values)}}
+
+    lookup = asyncio.ensure_future(query_cache.aget_or_compute(query_cache_key(query), compute))
+    try:
+        value = await asyncio.wait_for(asyncio.shield(lookup), timeout)
+    except asyncio.TimeoutError:
+        lookup.add_done_callback(_consume_result)
+        value = None
+
+    if value is None:
+        return [], sparse_encode(normalized, timings)
+    return value["dense"], SparseVector(**value["sparse"])
+
+
+async def embed_queries_async(
+    queries: List[str], timeout: Optional[float] = None
+) -> List[Tuple[List[float], SparseVector]]:
+    """
+    Batch embed_query_async: query yang sudah ada di query_cache tidak
+    di-embed ulang, sisanya (dedup per normalized query) dikirim dalam
+    request embedding per EMBED_BATCH_SIZE. Dense [] untuk query yang gagal
+    atau belum selesai saat timeout (detik).
+    """
+    keys = [query_cache_key(q) for q in queries]
+    normalized = [normalize_query(q) for q in queries]
+
+    # satu round-trip Redis (MGET) untuk semua query
+    cached = await query_cache.aget_many(list(dict.fromkeys(keys)))
+
+    missing = list(dict.fromkeys(n for k, n in zip(keys, normalized) if k not in cached))
+
+    async def embed_batch(batch: List[str]) -> None:
+        vectors = await embed_openai_async(batch)
+        if len(vectors) != len(batch):
+            return  # gagal -> dense kosong untuk query di batch ini, tidak di-cache
+        values = {}
+        for text, dense in zip(batch, vectors):
+            sparse = sparse_query_manual(text)
+            values[query_cache_key(text)] = {"dense": dense, "sparse": {"indices": list(sparse.indices), "values": list(sparse.values)}}
+        cached.update(values)
+        await query_cache.aset_many(values)  # satu pipeline Redis per batch
+
+    if missing:
+        # batch embedding jalan paralel; yang belum selesai saat timeout tetap mengisi cache di background
+        work = asyncio.ensure_future(asyncio.gather(*(
+            embed_batch(missing[start:start + EMBED_BATCH_SIZE]) for start in range(0, len(missing), EMBED_BATCH_SIZE)
+        )))
+        try:
+            await asyncio.wait_for(asyncio.shield(work), timeout)
+        except asyncio.TimeoutError:
+            work.add_done_callback(_consume_result)
+
+    out = []
+    for key, text in zip(keys, normalized):
+        value = cached.get(key)
+        if value is None:
+            out.append(([], sparse_query_manual(text)))
+        else:
+            out.append((value["dense"], SparseVector(**value["sparse"])))
+    return out
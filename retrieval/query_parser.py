@@ -0,0 +1,384 @@
+"""
+Rule-based (LLM-free) query understanding for /retrieve.
+
+"Backend Engineer di Jakarta full-time S1"
+    -> text="backend engineer", filters={"location": ["Jakarta"],
+       "work_type": ["full time"], "education": ["s1"]}
+
+Gazetteers come from the distinct address / work_type / education values
+in jobs_docs: whole comma-separated address parts plus the curated cities /
+provinces (KNOWN_LOCATIONS) that occur in them, and work_type / education
+values plus static aliases ("penuh waktu", "sarjana") that resolve to a
+canonical token ("full time", "s1"), never to one arbitrary stored value.
+Generic words that double as job-title vocabulary ("master data", "remote
+sensing", "intern audit") only become filters in a filter position: after a
+cue word ("lulusan master", "kerja remote") or in the run of filters that
+ends the query ("data engineer jakarta remote"); elsewhere they stay in the
+embedded text.
+Phrases are matched on word tokens with an Aho-Corasick automaton,
+leftmost-longest and non-overlapping, so parsing a query is a single pass
+over its tokens.
+
+The gazetteer is refreshed in a background thread whenever the index
+generation changes (or every GAZETTEER_REFRESH_SECONDS). Only rows written
+since the previous refresh are read (index_updated_at), and the automaton
+is rebuilt and swapped only when new phrases appear. Until the first
+build finishes, parse() returns the query unchanged.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import or_
+
+from database.database import SessionLocal
+from database.models import Job
+
+GAZETTEER_REFRESH_SECONDS = float(os.getenv("GAZETTEER_REFRESH_SECONDS", "300"))
+GAZETTEER_FULL_REFRESH_SECONDS = float(os.getenv("GAZETTEER_FULL_REFRESH_SECONDS", "86400"))
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Kata administratif yang tidak boleh jadi lokasi sendirian ("selatan", "dki", ...)
+LOCATION_STOPWORDS = frozenset("""
+di ke dari kota kab kabupaten provinsi prov daerah istimewa dki
+utara selatan barat timur tengah pusat raya jawa kepulauan indonesia
+""".split())
+
+# Bagian alamat yang merupakan jalan / gedung, bukan lokasi ("Jl. Sudirman Kav 52", "Gedung Data Center")
+STREET_WORDS = frozenset("""
+jl jln jalan gedung gd kav kavling no nomor blok rt rw lantai lt tower menara komplek kompleks ruko
+""".split())
+
+# Kota / provinsi yang juga dikenali di dalam bagian alamat ("Jakarta Selatan" -> "Jakarta")
+KNOWN_LOCATIONS = [
+    "Jakarta", "Bogor", "Depok", "Tangerang", "Tangerang Selatan", "Bekasi", "Bandung", "Cimahi", "Cirebon",
+    "Karawang", "Purwakarta", "Sukabumi", "Tasikmalaya", "Semarang", "Solo", "Surakarta", "Yogyakarta", "Jogja",
+    "Magelang", "Tegal", "Pekalongan", "Kudus", "Surabaya", "Sidoarjo", "Gresik", "Malang", "Kediri", "Mojokerto",
+    "Jember", "Madiun", "Denpasar", "Bali", "Medan", "Batam", "Pekanbaru", "Padang", "Palembang", "Jambi",
+    "Bengkulu", "Lampung", "Bandar Lampung", "Pontianak", "Banjarmasin", "Balikpapan", "Samarinda",
+    "Makassar", "Manado", "Palu", "Kendari", "Ambon", "Jayapura", "Mataram", "Kupang", "Banten", "Serang",
+    "Cilegon", "Aceh", "Banda Aceh",
+    "Jawa Barat", "Jawa Tengah", "Jawa Timur", "DKI Jakarta", "DI Yogyakarta", "Sumatera Utara", "Sumatera Barat",
+    "Sumatera Selatan", "Riau", "Kepulauan Riau", "Kalimantan Barat", "Kalimantan Timur", "Kalimantan Selatan",
+    "Sulawesi Selatan", "Sulawesi Utara", "Nusa Tenggara Barat", "Nusa Tenggara Timur", "Papua",
+]
+KNOWN_LOCATION_TOKENS = [(tuple(name.lower().split()), name) for name in KNOWN_LOCATIONS]
+
+# Kata penghubung sebelum lokasi yang ikut dibuang dari teks query
+LOCATION_PREPOSITIONS = frozenset(["di", "in", "at", "daerah", "area", "lokasi", "sekitar", "wilayah"])
+
+# alias -> nilai kanonik (dipakai hanya kalau nilai kanoniknya ada di data)
+WORK_TYPE_ALIASES = {
+    "full time": "full time", "fulltime": "full time", "penuh waktu": "full time",
+    "part time": "part time", "parttime": "part time", "paruh waktu": "part time",
+    "contract": "kontrak", "kontrak": "kontrak",
+    "intern": "magang", "internship": "magang", "magang": "magang",
+    "freelance": "freelance", "lepas": "freelance",
+    "remote": "remote", "wfh": "remote",
+}
+EDUCATION_ALIASES = {
+    "sarjana": "s1", "bachelor": "s1", "s1": "s1",
+    "magister": "s2", "master": "s2", "s2": "s2",
+    "doktor": "s3", "s3": "s3",
+    "diploma": "d3", "d3": "d3", "d4": "d4",
+    "sma": "sma", "smk": "smk", "slta": "sma",
+}
+
+# Phrase generik: filter hanya di posisi filter (lihat filter_position)
+AMBIGUOUS_PHRASES = frozenset([
+    ("master",), ("remote",), ("intern",), ("contract",), ("kontrak",), ("lepas",),
+    ("bachelor",), ("diploma",), ("doktor",),
+])
+# Kata isyarat tepat sebelum filter ("lulusan master", "minimal diploma", "kerja remote")
+FILTER_CUES = frozenset([
+    "lulusan", "pendidikan", "minimal", "min", "gelar", "degree", "education",
+    "kerja", "bekerja", "sistem", "status", "tipe", "jenis", "type", "secara",
+])
+# Kata yang boleh ada di antara filter di ekor query ("jakarta dan remote")
+FILTER_CONNECTORS = LOCATION_PREPOSITIONS | frozenset(["dan", "atau", "and", "or"])
+# Naik kalau aturan parse berubah (ikut version -> key cache hasil)
+PARSE_RULES_VERSION = 2
+
+
+def tokenize(text: str) -> List[str]:
+    return WORD_RE.findall(text.lower())
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick atas token (bukan karakter), jadi "s1" tidak match di "s10".
+    """
+
+    def __init__(self, phrases: Dict[Tuple[str, ...], Tuple[str, str]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, Tuple[str, str]]]] = [[]]  # (panjang phrase, (field, value))
+
+        for tokens, target in phrases.items():
+            node = 0
+            for tok in tokens:
+                nxt = self.goto[node].get(tok)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][tok] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append((len(tokens), target))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for tok, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(tok, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, tokens: List[str]) -> List[Tuple[int, int, Tuple[str, str]]]:
+        """
+        Semua match (start, end_exclusive, target).
+        """
+        matches = []
+        node = 0
+        for i, tok in enumerate(tokens):
+            while node and tok not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(tok, 0)
+            for length, target in self.out[node]:
+                matches.append((i - length + 1, i + 1, target))
+        return matches
+
+
+def select_matches(matches: List[Tuple[int, int, Tuple[str, str]]]) -> List[Tuple[int, int, Tuple[str, str]]]:
+    """
+    Leftmost-longest, tidak overlap.
+    """
+    chosen = []
+    last_end = 0
+    for start, end, target in sorted(matches, key=lambda m: (m[0], -(m[1] - m[0]))):
+        if start >= last_end:
+            chosen.append((start, end, target))
+            last_end = end
+    return chosen
+
+
+def filter_position(
+    tokens: List[str], chosen: List[Tuple[int, int, Tuple[str, str]]]
+) -> List[Tuple[int, int, Tuple[str, str]]]:
+    """
+    Buang match AMBIGUOUS_PHRASES yang bukan di posisi filter: tidak didahului
+    FILTER_CUES dan bukan bagian ekor query yang isinya hanya filter (diproses
+    dari kanan; match yang dibuang memutus ekor).
+    """
+    kept = []
+    frontier = len(tokens)  # awal ekor yang isinya filter / connector saja
+    for start, end, target in reversed(chosen):
+        in_tail = all(tok in FILTER_CONNECTORS for tok in tokens[end:frontier])
+        cued = start > 0 and tokens[start - 1] in FILTER_CUES
+        if tuple(tokens[start:end]) in AMBIGUOUS_PHRASES and not (in_tail or cued):
+            frontier = -1  # token ini tetap teks -> match di kirinya bukan ekor lagi
+            continue
+        kept.append((start, end, target))
+        if in_tail:
+            frontier = start
+    return kept[::-1]
+
+
+def contains(tokens: Tuple[str, ...], sub: Tuple[str, ...]) -> bool:
+    n = len(sub)
+    return any(tokens[i:i + n] == sub for i in range(len(tokens) - n + 1))
+
+
+def location_phrases(address: str) -> Iterable[Tuple[Tuple[str, ...], str]]:
+    """
+    Bagian alamat utuh + kota / provinsi KNOWN_LOCATIONS di dalamnya, tanpa token lepas.
+    "Jakarta Selatan, DKI Jakarta" -> ("jakarta","selatan"), ("jakarta",), ("dki","jakarta")
+    "Jl. Sudirman Kav 52, Gedung Data Center, Jakarta Selatan" -> hanya "Jakarta Selatan" / "Jakarta"
+    """
+    for part in address.split(","):
+        part = part.strip()
+        tokens = tuple(tokenize(part))
+        if not tokens or any(tok in STREET_WORDS or tok.isdigit() for tok in tokens):
+            continue
+        if all(tok in LOCATION_STOPWORDS for tok in tokens):
+            continue
+        yield tokens, part
+        for known_tokens, name in KNOWN_LOCATION_TOKENS:
+            if known_tokens != tokens and contains(tokens, known_tokens):
+                yield known_tokens, name
+
+
+def value_phrases(value: str, aliases: Dict[str, str]) -> Iterable[Tuple[Tuple[str, ...], str]]:
+    """
+    Nilai work_type / education + alias yang mengarah ke nilai ini. Alias
+    menghasilkan token kanonik (dicocokkan MatchText ke semua nilai yang
+    memuatnya), bukan salah satu nilai tersimpan.
+    "SMA/SMK" -> ("sma","smk") -> "SMA/SMK", ("sma",) -> "sma", ("smk",) -> "smk", ("slta",) -> "sma"
+    """
+    tokens = tuple(tokenize(value))
+    if not tokens:
+        return
+    joined = " ".join(tokens)
+    yield tokens, aliases.get(joined, value)
+    for alias, canonical in aliases.items():
+        canonical_tokens = tuple(canonical.split())
+        if canonical == joined or (len(canonical_tokens) == 1 and canonical_tokens[0] in tokens):
+            yield tuple(alias.split()), canonical
+
+
+def table_version(phrases: Dict[Tuple[str, ...], Tuple[str, str]]) -> str:
+    """
+    Hash isi gazetteer (bagian dari key cache hasil): sama di semua worker
+    dengan phrase table yang sama.
+    """
+    raw = json.dumps([PARSE_RULES_VERSION, sorted([list(tokens), list(target)] for tokens, target in phrases.items())])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class QueryParser:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phrases: Dict[Tuple[str, ...], Tuple[str, str]] = {}
+        self._matcher: Optional[PhraseMatcher] = None
+        self._seen: Set[Tuple[str, str]] = set()
+        self._since: Optional[datetime] = None
+        self._last_full = 0.0
+        self._last_refresh = 0.0
+        self._generation: Optional[int] = None
+        self._refreshing = False
+        self.version = table_version({})  # hash phrase table (bagian dari key cache hasil)
+
+    @property
+    def ready(self) -> bool:
+        return self._matcher is not None
+
+    def add_values(self, field: str, values: Iterable[Optional[str]]) -> int:
+        """
+        Tambah nilai distinct ke gazetteer; return jumlah phrase baru.
+        """
+        added = 0
+        # urutan tetap (bukan urutan hash set) -> phrase yang sama selalu ke nilai yang sama
+        for value in sorted(v for v in values if v):
+            if (field, value) in self._seen:
+                continue
+            self._seen.add((field, value))
+            if field == "location":
+                phrases = location_phrases(value)
+            elif field == "work_type":
+                phrases = value_phrases(value, WORK_TYPE_ALIASES)
+            else:
+                phrases = value_phrases(value, EDUCATION_ALIASES)
+            for tokens, filter_value in phrases:
+                # phrase yang sudah dipakai field lain tidak ditimpa
+                if tokens not in self._phrases:
+                    self._phrases[tokens] = (field, filter_value)
+                    added += 1
+        return added
+
+    def refresh(self, full: bool = False) -> int:
+        """
+        Baca nilai distinct (hanya row yang berubah sejak refresh terakhir,
+        kecuali full) lalu rebuild automaton kalau ada phrase baru.
+        """
+        started = datetime.utcnow()
+        full = full or self._since is None
+
+        db = SessionLocal()
+        try:
+            rows: Dict[str, Set[str]] = {}
+            for field, column in [("location", Job.address), ("work_type", Job.work_type), ("education", Job.education)]:
+                q = db.query(column).distinct()
+                if not full:
+                    q = q.filter(or_(Job.index_updated_at >= self._since, Job.created_at >= self._since))
+                rows[field] = {v for (v,) in q.all() if v}
+        finally:
+            db.close()
+
+        with self._lock:
+            if full:
+                self._phrases, self._seen = {}, set()
+            added = sum(self.add_values(field, values) for field, values in rows.items())
+            if added or self._matcher is None:
+                self._matcher = PhraseMatcher(dict(self._phrases))
+                self.version = table_version(self._phrases)
+            self._since = started
+            self._last_refresh = time.monotonic()
+            if full:
+                self._last_full = self._last_refresh
+        return added
+
+    def maybe_refresh(self, generation: Optional[int] = None) -> None:
+        """
+        Non-blocking: jalankan refresh di background thread kalau index
+        generation berubah / interval refresh lewat.
+        """
+        now = time.monotonic()
+        stale = (
+            self._matcher is None
+            or (generation is not None and generation != self._generation)
+            or now - self._last_refresh > GAZETTEER_REFRESH_SECONDS
+        )
+        if not stale or self._refreshing:
+            return
+
+        self._refreshing = True
+        self._generation = generation
+        full = now - self._last_full > GAZETTEER_FULL_REFRESH_SECONDS
+
+        def run():
+            try:
+                self.refresh(full=full)
+            except Exception as e:
+                print(f"Query parser gazetteer refresh failed: {e}")
+                self._generation = None
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="gazetteer-refresh", daemon=True).start()
+
+    def parse(self, query: str) -> Dict[str, Any]:
+        """
+        Return {"text": sisa query, "filters": {field: [value, ...]}, "matches": [...]}.
+        """
+        matcher = self._matcher
+        if matcher is None:
+            return {"text": query, "filters": {}, "matches": []}
+
+        tokens = tokenize(query)
+        chosen = filter_position(tokens, select_matches(matcher.find(tokens)))
+        if not chosen:
+            return {"text": query, "filters": {}, "matches": []}
+
+        drop: Set[int] = set()
+        filters: Dict[str, List[str]] = {}
+        matches = []
+        for start, end, (field, value) in chosen:
+            drop.update(range(start, end))
+            if field == "location" and start > 0 and tokens[start - 1] in LOCATION_PREPOSITIONS:
+                drop.add(start - 1)
+            if value not in filters.setdefault(field, []):
+                filters[field].append(value)
+            matches.append({"field": field, "value": value, "span": " ".join(tokens[start:end])})
+
+        # "jakarta dan remote": connector di antara dua filter ikut dibuang
+        drop.update(
+            i for i, tok in enumerate(tokens)
+            if tok in FILTER_CONNECTORS and i - 1 in drop and i + 1 in drop
+        )
+        text = " ".join(tok for i, tok in enumerate(tokens) if i not in drop)
+        # query yang isinya hanya filter ("jakarta s1") tetap di-embed utuh
+        return {"text": text or query, "filters": filters, "matches": matches}
+
+
+query_parser = QueryParser()
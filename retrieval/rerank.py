@@ -0,0 +1,219 @@
+"""
+Optional cross-encoder rerank stage after the fused Qdrant query.
+
+/retrieve asks Qdrant for RERANK_CANDIDATES jobs instead of top_k, scores
+(query, chunk text) pairs with a local CPU cross-encoder (fastembed
+TextCrossEncoder, ONNX) in batches of RERANK_BATCH_SIZE, and keeps the best
+top_k. The chunk text is the payload "text" (PAYLOAD_PROFILE=full) or is
+rebuilt from the hydrated job with document_splitting_multi, prefixed with
+the title / company chunk so every candidate carries its job title.
+
+The model is loaded in the background (at startup via warmup(), or on the
+first request, which keeps the fused order until it is ready).
+
+Hard budget: inference runs in a small dedicated thread pool and the caller
+waits at most RERANK_BUDGET_MS. When the budget runs out (or the model is
+unavailable) the fused order is returned unchanged; the worker stops after
+the batch it is running, so late work does not pile up.
+
+fastembed is optional at import time; without it rerank is disabled with a
+single warning.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from store.helper import document_splitting_multi
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+# Multilingual (korpus berbahasa Indonesia); ganti ke "Xenova/ms-marco-MiniLM-L-6-v2" untuk yang lebih ringan
+RERANK_MODEL = os.getenv("RERANK_MODEL", "jinaai/jina-reranker-v2-base-multilingual")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "250"))
+RERANK_MAX_CHARS = int(os.getenv("RERANK_MAX_CHARS", "1000"))
+RERANK_THREADS = int(os.getenv("RERANK_THREADS", "0")) or None  # onnxruntime intra-op threads, None = default
+RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "1"))
+
+# Payload yang diminta dari Qdrant saat rerank aktif ("text" hanya ada di profile full)
+RERANK_PAYLOAD_KEYS: List[str] = ["job_id", "field", "chunk_idx", "text"]
+
+_executor = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rerank")
+_load_lock = threading.Lock()
+_load_error: Optional[str] = None
+_loading = False
+
+
+@lru_cache(maxsize=1)
+def _reranker():
+    from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+    return TextCrossEncoder(model_name=RERANK_MODEL, threads=RERANK_THREADS)
+
+
+def load_reranker() -> Optional[Any]:
+    """
+    Model di-load sekali; kalau gagal (fastembed tidak terpasang, model tidak
+    bisa diunduh) rerank dimatikan untuk proses ini.
+    """
+    global _load_error
+    if _load_error is not None:
+        return None
+    with _load_lock:
+        try:
+            return _reranker()
+        except Exception as e:
+            _load_error = str(e)
+            print(f"Reranker unavailable, keeping fused order: {e}")
+            return None
+
+
+def reranker_ready() -> bool:
+    """
+    Non-blocking: True kalau model sudah di-load. Kalau belum, load dimulai
+    di thread rerank dan request ini memakai urutan fused.
+    """
+    global _loading
+    if _load_error is not None:
+        return False
+    if _reranker.cache_info().currsize:
+        return True
+    if not _loading:
+        _loading = True
+        _executor.submit(warmup)
+    return False
+
+
+def warmup() -> None:
+    """
+    Load model + satu inference supaya request pertama tidak kena cold start.
+    """
+    model = load_reranker()
+    if model is not None:
+        list(model.rerank("warmup", ["warmup"], batch_size=1))
+
+
+def best_chunks(qdrant_result: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    job_id -> payload chunk dengan score tertinggi.
+    """
+    chunks: Dict[str, Dict[str, Any]] = {}
+    groups = getattr(qdrant_result, "groups", None)
+    if groups is not None:
+        for g in groups:
+            if g.hits:
+                chunks[str(g.id)] = g.hits[0].payload or {}
+        return chunks
+
+    for p in getattr(qdrant_result, "points", None) or []:
+        payload = p.payload or {}
+        job_id = payload.get("job_id")
+        if job_id and job_id not in chunks:
+            chunks[job_id] = payload
+    return chunks
+
+
+def rerank_text(doc: Dict[str, Any], payload: Dict[str, Any]) -> str:
+    """
+    Judul/perusahaan + teks chunk yang match, dipotong RERANK_MAX_CHARS.
+    """
+    chunks = {(c["field"], c["payload"].get("chunk_idx", 0)): c["text"] for c in document_splitting_multi([doc])}
+    title = chunks.get(("title_company", 0), "")
+    key = (payload.get("field"), payload.get("chunk_idx", 0))
+    text = payload.get("text") or chunks.get(key, "")
+    if key[0] != "title_company" and text:
+        text = f"{title}\n{text}" if title else text
+    return (text or title)[:RERANK_MAX_CHARS]
+
+
+def score_pairs(query: str, texts: List[str], deadline: float) -> Optional[List[float]]:
+    """
+    Score per batch; berhenti (None) kalau deadline lewat di antara batch.
+    """
+    model = load_reranker()
+    if model is None:
+        return None
+
+    scores: List[float] = []
+    for start in range(0, len(texts), RERANK_BATCH_SIZE):
+        if time.monotonic() > deadline:
+            return None
+        batch = texts[start:start + RERANK_BATCH_SIZE]
+        scores.extend(float(s) for s in model.rerank(query, batch, batch_size=len(batch)))
+    return scores
+
+
+def apply_scores(docs: List[Dict[str, Any]], scores: List[float], top_k: int) -> List[Dict[str, Any]]:
+    # sort stabil: score sama -> urutan fused tetap
+    order = sorted(range(len(docs)), key=lambda i: -scores[i])
+    out = []
+    for i in order[:top_k]:
+        doc = dict(docs[i])
+        doc["score"] = scores[i]
+        out.append(doc)
+    return out
+
+
+def rerank_inputs(docs: List[Dict[str, Any]], qdrant_result: Any) -> List[str]:
+    chunks = best_chunks(qdrant_result)
+    return [rerank_text(d, chunks.get(d["job_id"], {})) for d in docs]
+
+
+def rerank_docs(
+    query: str,
+    docs: List[Dict[str, Any]],
+    qdrant_result: Any,
+    top_k: int,
+    budget_ms: float = RERANK_BUDGET_MS,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Return (docs, reranked). reranked=False -> urutan fused (budget habis /
+    model tidak tersedia).
+    """
+    if len(docs) <= 1 or not reranker_ready():
+        return docs[:top_k], False
+
+    deadline = time.monotonic() + budget_ms / 1000.0
+    future = _executor.submit(score_pairs, query, rerank_inputs(docs, qdrant_result), deadline)
+    try:
+        scores = future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeout:
+        scores = None
+    except Exception as e:
+        print(f"Rerank failed, keeping fused order: {e}")
+        scores = None
+
+    if scores is None:
+        return docs[:top_k], False
+    return apply_scores(docs, scores, top_k), True
+
+
+async def rerank_docs_async(
+    query: str,
+    docs: List[Dict[str, Any]],
+    qdrant_result: Any,
+    top_k: int,
+    budget_ms: float = RERANK_BUDGET_MS,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    if len(docs) <= 1 or not reranker_ready():
+        return docs[:top_k], False
+
+    deadline = time.monotonic() + budget_ms / 1000.0
+    future = asyncio.get_running_loop().run_in_executor(
+        _executor, score_pairs, query, rerank_inputs(docs, qdrant_result), deadline
+    )
+    try:
+        scores = await asyncio.wait_for(future, timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        scores = None
+    except Exception as e:
+        print(f"Rerank failed, keeping fused order: {e}")
+        scores = None
+
+    if scores is None:
+        return docs[:top_k], False
+    return apply_scores(docs, scores, top_k), True
@@ -1,12 +1,60 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, Literal, Optional, List, Union
 
 
+# Field JobDocOut yang bisa dipilih lewat RetrieveRequest.fields (job_id & score selalu ada)
+JobDocField = Literal[
+    "url", "title", "company", "logo", "salary", "posted_at", "work_type", "experience", "education",
+    "requirements_tags", "skills", "benefits", "description", "address", "source", "created_at",
+]
 
 
 
+
+
+class RetrieveFilters(BaseModel):
+    source: Optional[List[str]] = Field(None, description="Exact source, any of")
+    work_type: Optional[List[str]] = Field(None, description="Work type text match, any of")
+    education: Optional[List[str]] = Field(None, description="Education text match, any of")
+    location: Optional[List[str]] = Field(None, description="Address text match, any of")
+
+    @field_validator("source", "work_type", "education", "location", mode="before")
+    @classmethod
+    def single_value_to_list(cls, v: Union[str, List[str], None]):
+        return [v] if isinstance(v, str) else v
+
+
+class FusionOptions(BaseModel):
+    """
+    Override per request; field yang kosong memakai default env (FUSION_*).
+    """
+    method: Optional[Literal["rrf", "weighted", "dbsf"]] = Field(None, description="Fusion method")
+    rrf_k: Optional[int] = Field(None, ge=1, description="RRF constant k (server default when empty)")
+    dense_limit: Optional[int] = Field(None, ge=1, le=1000, description="Candidates per dense prefetch")
+    sparse_limit: Optional[int] = Field(None, ge=1, le=1000, description="Candidates per sparse prefetch")
+    dense_weight: Optional[float] = Field(None, ge=0, description="Dense branch weight (weighted), 0 = skip branch")
+    sparse_weight: Optional[float] = Field(None, ge=0, description="Sparse branch weight (weighted), 0 = skip branch")
+    field_weights: Optional[Dict[str, float]] = Field(
+        None, description="Separate prefetch per chunk field with this weight, e.g. {\"title_company\": 2, \"benefits\": 0.5}"
+    )
+
+
 class RetrieveRequest(BaseModel):
     query: str = Field(..., min_length=1, description="User query")
+    top_k: int = Field(10, ge=1, le=100, description="Number of distinct jobs to return")
+    filters: Optional[RetrieveFilters] = Field(None, description="Structured filters applied inside Qdrant")
+    parse_query: bool = Field(True, description="Extract location / work type / education filters from the query text")
+    fusion: Optional[FusionOptions] = Field(None, description="Fusion method / prefetch layout override")
+    rerank: Optional[bool] = Field(None, description="Cross-encoder rerank of the fused candidates (default: RERANK_ENABLED)")
+    fields: Optional[List[JobDocField]] = Field(
+        None, description="Job fields to return (default: all); e.g. leave out description for lighter responses"
+    )
+    budget_ms: Optional[int] = Field(
+        None, ge=0, le=60000, description="Latency budget; dense embedding not back in time -> sparse-only (default: RETRIEVE_BUDGET_MS, 0 = none)"
+    )
+    explain: bool = Field(
+        False, description="Debug: per-stage timings and per-result sparse / dense prefetch ranks (not cached, one extra Qdrant call)"
+    )
 
 
 class JobDocOut(BaseModel):
@@ -34,7 +82,49 @@ class JobDocOut(BaseModel):
     created_at: Optional[str] = None
 
 
+class BranchHit(BaseModel):
+    rank: int                           # rank job di prefetch ini (1 = teratas, dedup per job_id)
+    score: float
+    field: Optional[str] = None         # chunk field yang match di prefetch ini
+    chunk_idx: Optional[int] = None
+
+
+class ResultExplain(BaseModel):
+    job_id: str
+    rank: int                           # posisi di results
+    score: float
+    fused_rank: Optional[int] = None    # posisi di query fused (sebelum rerank)
+    fused_score: Optional[float] = None
+    field: Optional[str] = None         # chunk yang match di query fused
+    chunk_idx: Optional[int] = None
+    sparse: Optional[BranchHit] = None  # None = tidak masuk kandidat prefetch sparse
+    dense: Optional[BranchHit] = None   # None = tidak masuk kandidat prefetch dense / sparse-only
+
+
+class RetrieveExplain(BaseModel):
+    # ms: sparse_encoding, dense_embedding, embedding (total), qdrant, hydration, rerank, total, explain
+    timings: Dict[str, float]
+    embedding_cache_hit: bool = False
+    fusion: Optional[Dict[str, Any]] = None  # config fusion yang di-resolve (None = sparse-only)
+    results: List[ResultExplain] = []
+
+
 class RetrieveResponse(BaseModel):
     query: str
     collection: str
     results: List[JobDocOut]
+    search_query: Optional[str] = None       # teks yang di-embed setelah filter diekstrak
+    applied_filters: Optional[Dict[str, List[str]]] = None
+    reranked: Optional[bool] = None          # False = rerank diminta tapi fallback ke urutan fused
+    degraded: bool = False                   # True = sparse-only (dense embedding lewat budget / gagal)
+    degraded_reason: Optional[str] = None    # "embedding_timeout" | "embedding_failed"
+    explain: Optional[RetrieveExplain] = None  # hanya kalau request explain=true
+
+
+class RetrieveBatchRequest(BaseModel):
+    requests: List[RetrieveRequest] = Field(..., min_length=1, description="Queries, each with its own top_k / filters / fusion")
+
+
+class RetrieveBatchResponse(BaseModel):
+    collection: str
+    results: List[RetrieveResponse]  # urutan sama dengan requests
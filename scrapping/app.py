@@ -6,6 +6,7 @@ from .helper import scrape_loker_jobs
 from .glints_helper import scrape_glints_jobs
 from .jobstreet_helper import scrape_jobstreet_jobs
 from schema.scrapping import ScrapeRequest
+from utils.responses import FAST_JSON, FastJSONResponse
 
 router = APIRouter(tags=["Scrapping"])
 
@@ -21,7 +22,7 @@ async def scrapping_loker(request : ScrapeRequest):
         "max_page" : request.max_page,
         "data" : data
     }
-    return data_json
+    return FastJSONResponse(data_json) if FAST_JSON else data_json
 
 @router.post("/scrapping/glints")
 async def scrapping_glints(request : ScrapeRequest):
@@ -31,7 +32,7 @@ async def scrapping_glints(request : ScrapeRequest):
         "max_page" : request.max_page,
         "data" : data
     }
-    return data_json
+    return FastJSONResponse(data_json) if FAST_JSON else data_json
 
 @router.post("/scrapping/jobstreet")
 async def scrapping_jobstreet(request : ScrapeRequest):
@@ -41,4 +42,4 @@ async def scrapping_jobstreet(request : ScrapeRequest):
         "max_page" : request.max_page,
         "data" : data
     }
-    return data_json
\ No newline at end of file
+    return FastJSONResponse(data_json) if FAST_JSON else data_json
\ No newline at end of file
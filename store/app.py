@@ -1,8 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from qdrant_client import QdrantClient
 # Gunakan relative import dengan titik (.) agar bisa dijalankan dari main app
-from .helper import store_jobs_pipeline
+from .helper import STORE_BATCH_SIZE, merge_counts, store_jobs_pipeline
 from .vision import extract_job_from_image
-from .storage import upload_image_to_supabase
+from .storage import delete_image_from_supabase, upload_bytes_to_supabase
+from .imaging import IMAGE_CACHE_ENABLED, find_cached_extraction, prepare_poster, save_extraction
+from .queue import enqueue_ingest, get_task
 import os
 from dotenv import load_dotenv
 
@@ -11,10 +20,9 @@ load_dotenv()
 # Ganti FastAPI() dengan APIRouter()
 router = APIRouter(tags=["Store"])
 
-@router.post("/store")
-def store(payload: dict):
-    return store_jobs_pipeline(
-        payload,
+
+def pipeline_kwargs() -> Dict[str, Any]:
+    return dict(
         collection_name=os.getenv("COLLECTION_NAME"),
         qdrant_url=os.getenv("QDRANT_URL"),
         qdrant_api_key=os.getenv("QDRANT_API_KEY"),
@@ -22,56 +30,218 @@ def store(payload: dict):
         openai_api_key=os.getenv("OPENAI_API_KEY"),
     )
 
+
+@router.post("/store")
+def store(
+    payload: dict,
+    response: Response,
+    background: bool = False,
+    idempotency_key: Optional[str] = Header(None),
+):
+    """
+    background=true: payload masuk antrian ingest_tasks dan langsung dibalas
+    ticket (202); status/counts dicek lewat GET /store/tasks/{task_id}.
+    Task baru diproses kalau ada proses dengan INGEST_WORKERS > 0.
+    """
+    if not background:
+        return store_jobs_pipeline(payload, **pipeline_kwargs())
+
+    try:
+        ticket = enqueue_ingest(payload, idempotency_key=idempotency_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.status_code = 202
+    return ticket
+
+
+@router.get("/store/tasks/{task_id}")
+def store_task_status(task_id: str):
+    task = get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+async def iter_ndjson_batches(request: Request, batch_size: int, errors: List[int]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Baca body NDJSON secara incremental (satu job per baris) dan yield per batch.
+    Baris yang bukan JSON object dihitung di errors[0].
+    """
+    buffer = b""
+    batch: List[Dict[str, Any]] = []
+
+    def parse(line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+        try:
+            item = json.loads(line)
+        except ValueError:
+            errors[0] += 1
+            return
+        if isinstance(item, dict):
+            batch.append(item)
+        else:
+            errors[0] += 1
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            parse(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    parse(buffer)
+    if batch:
+        yield batch
+
+
+@router.post("/store/bulk")
+async def store_bulk(request: Request, batch_size: int = STORE_BATCH_SIZE):
+    """
+    Bulk ingest NDJSON (Content-Type: application/x-ndjson), satu job per baris.
+    Body dibaca bertahap; setiap batch langsung DB -> split -> embed -> upsert,
+    jadi peak memory tergantung batch_size, bukan ukuran upload.
+    """
+    kwargs = pipeline_kwargs()
+    client = QdrantClient(url=kwargs["qdrant_url"], api_key=kwargs["qdrant_api_key"])
+    errors = [0]
+    total: Dict[str, Any] = {
+        "db": {"inserted": 0, "skipped": 0, "updated": 0},
+        "docs": {"generated": 0},
+        "qdrant": {"inserted": 0, "skipped": 0},
+        "batches": 0,
+    }
+
+    try:
+        async for batch in iter_ndjson_batches(request, batch_size, errors):
+            res = await run_in_threadpool(
+                store_jobs_pipeline, batch, batch_size=batch_size, client=client, **kwargs
+            )
+            merge_counts(total, res)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{e} (after {total['batches']} batches)")
+
+    total["invalid_lines"] = errors[0]
+    return total
+
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+
+
+def supabase_bucket() -> str:
+    # Assumption: Bucket "job-posters" exists or env var SUPABASE_BUCKET is used
+    return os.getenv("SUPABASE_BUCKET", "images")
+
+
+async def process_poster(
+    content: bytes,
+    filename: Optional[str],
+    content_type: Optional[str],
+    client: Optional[QdrantClient] = None,
+) -> Dict[str, Any]:
+    """
+    1. Preprocess (resize, re-encode JPEG, strip EXIF) + perceptual hash.
+    2. Poster yang (hampir) sama pernah diproses -> pakai ekstraksi lama,
+       tanpa Vision call dan tanpa object Supabase baru.
+    3. Selain itu upload Supabase dan ekstraksi Vision jalan bersamaan di
+       threadpool, lalu job disimpan lewat pipeline. Kalau salah satu gagal,
+       object yang sudah ter-upload dihapus lagi.
+    """
+    try:
+        image_bytes, mime_type, hashes = await run_in_threadpool(prepare_poster, content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    poster: Dict[str, Any] = {"cached": False, **hashes, "bytes_in": len(content), "bytes_out": len(image_bytes)}
+
+    cached = await run_in_threadpool(find_cached_extraction, hashes) if IMAGE_CACHE_ENABLED else None
+    if cached:
+        poster.update(cached=True, distance=cached["distance"], image_url=cached["image_url"])
+        payload = {"data": [cached["job_data"]]}
+        res = await run_in_threadpool(store_jobs_pipeline, payload, client=client, **pipeline_kwargs())
+        return {**res, "poster": poster}
+
+    bucket_name = supabase_bucket()
+    stem = (filename or "poster").rsplit(".", 1)[0]
+    upload_res, vision_res = await asyncio.gather(
+        run_in_threadpool(upload_bytes_to_supabase, image_bytes, f"{stem}.jpg", mime_type, bucket_name),
+        run_in_threadpool(extract_job_from_image, image_bytes, mime_type),
+        return_exceptions=True,
+    )
+
+    if isinstance(upload_res, Exception) or isinstance(vision_res, Exception) or not vision_res:
+        if isinstance(upload_res, str):
+            await run_in_threadpool(delete_image_from_supabase, upload_res, bucket_name)
+        if isinstance(upload_res, Exception):
+            raise HTTPException(status_code=500, detail=f"Supabase upload failed: {upload_res}")
+        if isinstance(vision_res, Exception):
+            raise HTTPException(status_code=500, detail=f"Vision extraction failed: {vision_res}")
+        raise HTTPException(status_code=500, detail="Failed to extract job details from image")
+
+    # Inject Real URL
+    job_data = vision_res
+    job_data["url"] = upload_res
+
+    # Wrap in expected list structure for pipeline
+    payload = {"data": [job_data]}
+    res = await run_in_threadpool(store_jobs_pipeline, payload, client=client, **pipeline_kwargs())
+
+    if IMAGE_CACHE_ENABLED:
+        await run_in_threadpool(save_extraction, hashes, upload_res, job_data)
+    poster["image_url"] = upload_res
+    return {**res, "poster": poster}
+
+
 @router.post("/store/upload-image")
 async def upload_image(file: UploadFile = File(...)):
-    print(f"DEBUG: Received upload request. Filename: {file.filename}, Content-Type: {file.content_type}")
-    if not file.content_type.startswith("image/"):
-        print("DEBUG: Invalid content type")
+    if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
-    
+
+    content = await file.read()
     try:
-        # 1. Read content for Vision API
-        print("DEBUG: Reading file content...")
-        content = await file.read()
-        print(f"DEBUG: Read {len(content)} bytes")
-        await file.seek(0) # Reset cursor for Supabase upload
-        
-        # 2. Upload to Supabase to get real URL
-        # Assumption: Bucket "job-posters" exists or env var SUPABASE_BUCKET is used
-        bucket_name = os.getenv("SUPABASE_BUCKET", "images")
-        print(f"DEBUG: Uploading to Supabase bucket: {bucket_name}")
-        try:
-            public_url = await upload_image_to_supabase(file, bucket_name)
-            print(f"DEBUG: Upload success. URL: {public_url}")
-        except Exception as e:
-            print(f"DEBUG: Supabase upload failed: {e}")
-            # For now let's raise error as user requested Supabase
-            raise HTTPException(status_code=500, detail=f"Supabase upload failed: {str(e)}")
-
-        # 3. Extract details using Vision
-        print("DEBUG: Extracting job details with Vision...")
-        job_data = extract_job_from_image(content)
-        
-        if not job_data:
-            print("DEBUG: Vision extraction returned empty")
-            raise HTTPException(status_code=500, detail="Failed to extract job details from image")
-        
-        print("DEBUG: Vision extraction success")
-        # 4. Inject Real URL
-        job_data["url"] = public_url
-        
-        # Wrap in expected list structure for pipeline
-        payload = {"data": [job_data]}
-        
-        print("DEBUG: Storing to pipeline...")
-        return store_jobs_pipeline(
-            payload,
-            collection_name=os.getenv("COLLECTION_NAME"),
-            qdrant_url=os.getenv("QDRANT_URL"),
-            qdrant_api_key=os.getenv("QDRANT_API_KEY"),
-            embedding_model=os.getenv("EMBEDDING_MODEL"),
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-        )
+        return await process_poster(content, file.filename, file.content_type)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"DEBUG: Exception in endpoint: {e}")
+        print(f"Upload image error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/store/upload-images")
+async def upload_images(files: List[UploadFile] = File(...), concurrency: int = UPLOAD_CONCURRENCY):
+    """
+    Batch upload poster. Maksimal `concurrency` poster diproses bersamaan;
+    hasil tiap poster di-stream sebagai satu baris NDJSON begitu selesai
+    (urutan = urutan selesai, pakai "index" untuk mencocokkan dengan input).
+    """
+    # Baca semua file sebelum response mulai di-stream (UploadFile ditutup setelah handler return)
+    items = [(i, f.filename, f.content_type, await f.read()) for i, f in enumerate(files)]
+    kwargs = pipeline_kwargs()
+    client = QdrantClient(url=kwargs["qdrant_url"], api_key=kwargs["qdrant_api_key"])
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(index: int, filename: Optional[str], content_type: Optional[str], content: bytes) -> Dict[str, Any]:
+        line: Dict[str, Any] = {"index": index, "filename": filename}
+        if not content_type or not content_type.startswith("image/"):
+            return {**line, "status": "error", "error": "File must be an image"}
+        async with semaphore:
+            try:
+                result = await process_poster(content, filename, content_type, client=client)
+                return {**line, "status": "ok", "result": result}
+            except HTTPException as e:
+                return {**line, "status": "error", "error": e.detail}
+            except Exception as e:
+                return {**line, "status": "error", "error": str(e)}
+
+    async def stream() -> AsyncIterator[str]:
+        tasks = [asyncio.create_task(run_one(*item)) for item in items]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield json.dumps(await done, default=str) + "\n"
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,27 +1,35 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Union, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Union, Tuple, Optional
 import os
+import json
 import uuid
+import hashlib
+from datetime import datetime
 
+from sqlalchemy import insert, select
 from sqlalchemy.exc import IntegrityError
 
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Distance,
-    VectorParams,
-    SparseVectorParams,
+    Modifier,
     SparseVector,
     PointStruct,
+    PointIdsList,
 )
 
 from openai import OpenAI
 
 from database.database import SessionLocal
-from database.models import Job
+from database.models import Job, JobChunk, JobChunkStaged
+from database.index_generation import bump_generation
+from retrieval.db_helpers import evict_hydrated
 
 # Use shared sparse vector utilities
-from utils.sparse import text_to_sparse_vector as text_to_sparse_hash_vector
+from utils.sparse import document_sparse_vector, sparse_vector_params
+from utils.collection import PAYLOAD_INDEX_FIELDS, dense_vector_params, point_payload
+from utils.dense import EMBEDDING_DIMENSIONS, embedding_request_kwargs, fit_dimensions
 
 
 
@@ -32,14 +40,24 @@ from utils.sparse import text_to_sparse_vector as text_to_sparse_hash_vector
 # =========================
 # 1) SAVE TO SQL DB
 # =========================
+JOB_FIELDS = [
+    "title", "company", "logo", "salary", "posted_at", "work_type", "experience",
+    "education", "requirements_tags", "skills", "benefits", "description", "address", "source",
+]
+
+
 def save_documents_database(
     payload: Union[Dict[str, Any], List[Dict[str, Any]]]
-) -> Tuple[List[Dict[str, Any]], int, int]:
+) -> Tuple[List[Dict[str, Any]], int, int, int]:
     """
+    Upsert berdasarkan url. Row baru / berubah ditandai index_status="pending"
+    di transaksi yang sama (outbox), jadi job yang gagal di-embed tidak hilang.
+
     Return:
-      inserted_jobs: list job dict yang BERHASIL masuk DB (ini yang di-embed)
+      changed_jobs: list job dict yang baru / berubah / belum ter-index (ini yang di-split & dicek hash-nya)
       inserted: jumlah inserted
-      skipped: jumlah skipped
+      skipped: jumlah skipped (invalid, duplikat dalam batch, atau tidak berubah & sudah ter-index)
+      updated: jumlah row lama yang field-nya berubah atau belum ter-index
     """
     data = payload.get("data", []) if isinstance(payload, dict) else payload
     if not isinstance(data, list):
@@ -47,9 +65,10 @@ def save_documents_database(
 
     db = SessionLocal()
 
-    inserted_jobs: List[Dict[str, Any]] = []
+    changed_jobs: List[Dict[str, Any]] = []
     inserted = 0
     skipped = 0
+    updated = 0
     seen_urls = set()
 
     try:
@@ -70,10 +89,29 @@ def save_documents_database(
                 continue
             seen_urls.add(url)
 
-            # 2) skip kalau url sudah ada di DB
+            # 2) url sudah ada di DB -> update kalau ada field yang berubah
             exists = db.query(Job).filter(Job.url == url).first()
             if exists:
-                skipped += 1
+                changes = {
+                    f: item.get(f) for f in JOB_FIELDS
+                    if f in item and item.get(f) != getattr(exists, f)
+                }
+                if not changes and exists.index_status == "indexed":
+                    skipped += 1
+                    continue
+
+                for f, v in changes.items():
+                    setattr(exists, f, v)
+                exists.index_status = "pending"
+                exists.index_updated_at = datetime.utcnow()
+
+                # job_id lama tetap dipakai (point_id di Qdrant berbasis job_id)
+                changed_jobs.append({
+                    **{f: getattr(exists, f) for f in JOB_FIELDS},
+                    "job_id": exists.job_id,
+                    "url": url,
+                })
+                updated += 1
                 continue
 
             db.add(Job(
@@ -93,17 +131,19 @@ def save_documents_database(
                 description=item.get("description"),
                 address=item.get("address"),
                 source=item.get("source"),
+                index_status="pending",
+                index_updated_at=datetime.utcnow(),
             ))
 
-            inserted_jobs.append(item)
+            changed_jobs.append(item)
             inserted += 1
 
         db.commit()
-        return inserted_jobs, inserted, skipped
+        return changed_jobs, inserted, skipped, updated
 
     except IntegrityError:
         db.rollback()
-        return inserted_jobs, inserted, skipped
+        return changed_jobs, inserted, skipped, updated
 
     finally:
         db.close()
@@ -265,9 +305,177 @@ def document_splitting_multi(scrapping_json: List[Dict[str, Any]]) -> List[Dict[
                 "payload": {**base_payload, "field": "benefits", "chunk_idx": 0}
             })
 
+    # 7) CONTENT HASH per chunk (untuk incremental re-embedding)
+    for d in out_docs:
+        d["content_hash"] = content_hash(d["text"])
+        d["payload"]["content_hash"] = d["content_hash"]
+
     return out_docs
 
 
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def payload_hash(doc: Dict[str, Any]) -> str:
+    """
+    Hash payload yang disimpan di Qdrant (sesuai PAYLOAD_PROFILE).
+    """
+    stored = point_payload(doc["payload"], point_id=doc["point_id"], text=doc["text"])
+    return content_hash(json.dumps(stored, sort_keys=True, default=str))
+
+
+# =========================
+# 2b) DIFF CHUNK vs YANG SUDAH TER-INDEX
+# =========================
+def plan_chunk_changes(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Bandingkan docs (hasil document_splitting_multi) dengan jobs_chunks:
+      to_embed: chunk baru / teks berubah -> embed + upsert
+      to_set_payload: teks sama tapi payload berubah -> overwrite payload saja
+      stale_point_ids: chunk lama yang sudah tidak ada (mis. deskripsi memendek) -> delete
+      unchanged: jumlah chunk yang tidak perlu disentuh
+    """
+    job_ids = list({d["job_id"] for d in docs})
+    if not job_ids:
+        return {"to_embed": [], "to_set_payload": [], "stale_point_ids": [], "unchanged": 0}
+
+    db = SessionLocal()
+    try:
+        rows = db.query(JobChunk).filter(JobChunk.job_id.in_(job_ids)).all()
+        existing = {r.point_id: (r.content_hash, r.payload_hash) for r in rows}
+    finally:
+        db.close()
+
+    to_embed: List[Dict[str, Any]] = []
+    to_set_payload: List[Dict[str, Any]] = []
+    unchanged = 0
+    for d in docs:
+        prev = existing.get(d["point_id"])
+        if prev is None or prev[0] != d["content_hash"]:
+            to_embed.append(d)
+        elif prev[1] != payload_hash(d):
+            to_set_payload.append(d)
+        else:
+            unchanged += 1
+
+    new_ids = {d["point_id"] for d in docs}
+    stale = [pid for pid in existing if pid not in new_ids]
+
+    return {
+        "to_embed": to_embed,
+        "to_set_payload": to_set_payload,
+        "stale_point_ids": stale,
+        "unchanged": unchanged,
+    }
+
+
+def save_chunk_hashes(docs: List[Dict[str, Any]], stale_point_ids: List[str]) -> None:
+    """
+    Simpan hash chunk yang sudah ter-index (dipanggil SETELAH upsert Qdrant sukses).
+    """
+    db = SessionLocal()
+    try:
+        if stale_point_ids:
+            db.query(JobChunk).filter(JobChunk.point_id.in_(stale_point_ids)).delete(synchronize_session=False)
+        for d in docs:
+            db.merge(JobChunk(
+                point_id=d["point_id"],
+                job_id=d["job_id"],
+                field=d["field"],
+                chunk_idx=d["payload"].get("chunk_idx", 0),
+                content_hash=d["content_hash"],
+                payload_hash=payload_hash(d),
+            ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def stage_chunk_hashes(collection_name: str, docs: List[Dict[str, Any]]) -> List[str]:
+    """
+    Simpan hash chunk yang sudah di-upsert ke shadow collection (reindex) di
+    jobs_chunks_staged, bukan jobs_chunks. Return point_id yang sebelumnya
+    di-stage untuk job yang sama tapi sudah tidak ada (job di-reindex ulang
+    saat catch-up dengan chunk lebih sedikit) -> hapus dari shadow collection.
+    """
+    job_ids = list({d["job_id"] for d in docs})
+    if not job_ids:
+        return []
+
+    db = SessionLocal()
+    try:
+        staged = db.query(JobChunkStaged.point_id).filter(
+            JobChunkStaged.collection == collection_name,
+            JobChunkStaged.job_id.in_(job_ids),
+        ).all()
+        new_ids = {d["point_id"] for d in docs}
+        stale = [pid for (pid,) in staged if pid not in new_ids]
+        if stale:
+            db.query(JobChunkStaged).filter(
+                JobChunkStaged.collection == collection_name,
+                JobChunkStaged.point_id.in_(stale),
+            ).delete(synchronize_session=False)
+        for d in docs:
+            db.merge(JobChunkStaged(
+                collection=collection_name,
+                point_id=d["point_id"],
+                job_id=d["job_id"],
+                field=d["field"],
+                chunk_idx=d["payload"].get("chunk_idx", 0),
+                content_hash=d["content_hash"],
+                payload_hash=payload_hash(d),
+            ))
+        db.commit()
+        return stale
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def publish_staged_chunk_hashes(collection_name: str) -> int:
+    """
+    Ganti seluruh jobs_chunks dengan hash yang di-stage untuk collection ini
+    (satu transaksi). Dipanggil SETELAH alias menunjuk ke collection tersebut.
+    """
+    columns = ["point_id", "job_id", "field", "chunk_idx", "content_hash", "payload_hash"]
+    db = SessionLocal()
+    try:
+        db.query(JobChunk).delete(synchronize_session=False)
+        res = db.execute(
+            insert(JobChunk).from_select(
+                columns,
+                select(*[getattr(JobChunkStaged, c) for c in columns]).where(JobChunkStaged.collection == collection_name),
+            )
+        )
+        db.query(JobChunkStaged).filter(JobChunkStaged.collection == collection_name).delete(synchronize_session=False)
+        db.commit()
+        return res.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def discard_staged_chunk_hashes(collection_name: str) -> int:
+    db = SessionLocal()
+    try:
+        n = db.query(JobChunkStaged).filter(JobChunkStaged.collection == collection_name).delete(synchronize_session=False)
+        db.commit()
+        return n
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 # =========================
 # 3) EMBEDDING DENSE (OpenAI)
 # =========================
@@ -276,7 +484,11 @@ def embed_texts_openai(
     *,
     api_key: Optional[str] = None,
     model: str = "text-embedding-3-small",
+    dimensions: Optional[int] = EMBEDDING_DIMENSIONS,
 ) -> List[List[float]]:
+    """
+    dimensions: target dimensi (EMBEDDING_DIMENSIONS), 0/None = ukuran penuh model.
+    """
     if not texts:
         return []
 
@@ -296,8 +508,12 @@ def embed_texts_openai(
     
     # OpenRouter embedding interface usually matches OpenAI
     try:
-        resp = client.embeddings.create(model=embedding_model, input=texts)
-        return [d.embedding for d in resp.data]
+        resp = client.embeddings.create(
+            model=embedding_model,
+            input=texts,
+            **embedding_request_kwargs(dimensions),
+        )
+        return [fit_dimensions(d.embedding, dimensions) for d in resp.data]
     except Exception as e:
         print(f"OpenRouter Embedding Error: {e}")
         return []
@@ -308,9 +524,44 @@ def embed_texts_openai(
 # =========================
 def embed_texts_sparse_manual(texts: List[str]) -> List[SparseVector]:
     """
-    Buat sparse vector manual untuk semua text.
+    Buat sparse vector manual untuk semua text (scheme dari SPARSE_SCHEME).
+    """
+    return [document_sparse_vector(t) for t in texts]
+
+
+def embed_documents(
+    docs: List[Dict[str, Any]],
+    *,
+    api_key: Optional[str] = None,
+    model: str = "text-embedding-3-small",
+) -> List[Dict[str, Any]]:
+    """
+    Dense + sparse untuk hasil document_splitting_multi,
+    output siap dipakai upsert_embeddings_to_qdrant.
     """
-    return [text_to_sparse_hash_vector(t) for t in texts]
+    texts = [d["text"] for d in docs]
+
+    # Dense (OpenAI)
+    dense_vectors = embed_texts_openai(
+        texts,
+        api_key=api_key,
+        model=model,
+    )
+
+    # Sparse (manual)
+    sparse_vectors = embed_texts_sparse_manual(texts)
+
+    embedded_docs: List[Dict[str, Any]] = []
+    for d, dv, sv in zip(docs, dense_vectors, sparse_vectors):
+        embedded_docs.append({
+            "point_id": d["point_id"],
+            "job_id": d["job_id"],
+            "payload": d["payload"],
+            "dense_vector": dv,
+            "sparse_vector": sv,
+            "text": d["text"],
+        })
+    return embedded_docs
 
 
 # =========================
@@ -326,20 +577,82 @@ def ensure_hybrid_collection(
 ) -> None:
     existing = {c.name for c in client.get_collections().collections}
 
-    if collection_name in existing:
-        if recreate:
-            client.recreate_collection(
-                collection_name=collection_name,
-                vectors_config={"dense": VectorParams(size=dense_size, distance=distance)},
-                sparse_vectors_config={"sparse": SparseVectorParams()},
+    # collection_name boleh berupa alias (lihat store.reindex)
+    is_alias = collection_name not in existing and resolve_collection_name(client, collection_name) != collection_name
+
+    if collection_name in existing and recreate:
+        client.recreate_collection(
+            collection_name=collection_name,
+            vectors_config={"dense": dense_vector_params(dense_size, distance)},
+            sparse_vectors_config={"sparse": sparse_vector_params()},
+        )
+    elif collection_name in existing or is_alias:
+        warn_sparse_modifier_mismatch(client, collection_name)
+        warn_dense_size_mismatch(client, collection_name, dense_size)
+    else:
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config={"dense": dense_vector_params(dense_size, distance)},
+            sparse_vectors_config={"sparse": sparse_vector_params()},
+        )
+
+    ensure_payload_indexes(client, collection_name)
+
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str) -> None:
+    """
+    Payload index sesuai PAYLOAD_INDEX_FIELDS (delete by job_id, grouping,
+    filter /retrieve). Hanya index yang belum ada yang dibuat.
+    """
+    real_name = resolve_collection_name(client, collection_name)
+    schema = client.get_collection(real_name).payload_schema or {}
+    for field_name, field_schema in PAYLOAD_INDEX_FIELDS.items():
+        if field_name not in schema:
+            client.create_payload_index(
+                collection_name=real_name,
+                field_name=field_name,
+                field_schema=field_schema,
             )
-        return
 
-    client.create_collection(
-        collection_name=collection_name,
-        vectors_config={"dense": VectorParams(size=dense_size, distance=distance)},
-        sparse_vectors_config={"sparse": SparseVectorParams()},
-    )
+
+def warn_sparse_modifier_mismatch(client: QdrantClient, collection_name: str) -> None:
+    """
+    Collection lama (tanpa IDF modifier) harus dimigrasi dengan
+    `python -m store.migrate_sparse_idf`, kalau tidak skor sparse BM25 tanpa IDF.
+    """
+    info = client.get_collection(resolve_collection_name(client, collection_name))
+    sparse_cfg = (info.config.params.sparse_vectors or {}).get("sparse")
+    current = getattr(sparse_cfg, "modifier", None) or Modifier.NONE
+    expected = sparse_vector_params().modifier or Modifier.NONE
+    if current != expected:
+        print(
+            f"WARNING: collection '{collection_name}' sparse modifier is '{current}', "
+            f"expected '{expected}'. Run `python -m store.migrate_sparse_idf` to migrate."
+        )
+
+
+def warn_dense_size_mismatch(client: QdrantClient, collection_name: str, dense_size: int) -> None:
+    """
+    Kalau EMBEDDING_DIMENSIONS diganti, collection lama harus di-reindex
+    (`python -m store.reindex`); vector dengan ukuran lain akan di-skip saat upsert.
+    """
+    info = client.get_collection(resolve_collection_name(client, collection_name))
+    current = info.config.params.vectors["dense"].size
+    if current != dense_size:
+        print(
+            f"WARNING: collection '{collection_name}' dense size is {current}, "
+            f"embeddings are {dense_size}. Run `python -m store.reindex` to rebuild."
+        )
+
+
+def resolve_collection_name(client: QdrantClient, name: str) -> str:
+    """
+    Alias -> nama collection sebenarnya (nama collection biasa dikembalikan apa adanya).
+    """
+    for a in client.get_aliases().aliases:
+        if a.alias_name == name:
+            return a.collection_name
+    return name
 
 
 # =========================
@@ -355,6 +668,7 @@ def upsert_embeddings_to_qdrant(
     distance: Distance = Distance.COSINE,
     batch_size: int = 128,
     recreate_collection: bool = False,
+    client: Optional[QdrantClient] = None,
 ) -> Dict[str, int]:
 
     items = [data] if isinstance(data, dict) else data
@@ -362,13 +676,15 @@ def upsert_embeddings_to_qdrant(
         raise ValueError("data harus dict atau list[dict] dan tidak boleh kosong")
 
     # Determine dense size if not provided
+    # (vector sudah dipotong ke EMBEDDING_DIMENSIONS oleh embed_texts_openai)
     if dense_size is None:
         first_vec = items[0].get("dense_vector")
         if not isinstance(first_vec, list) or len(first_vec) == 0:
             raise ValueError("dense_size tidak bisa ditentukan: item pertama tidak punya dense_vector yang valid")
         dense_size = len(first_vec)
 
-    client = QdrantClient(url=qdrant_url, api_key=api_key)
+    if client is None:
+        client = QdrantClient(url=qdrant_url, api_key=api_key)
 
     ensure_hybrid_collection(
         client,
@@ -409,12 +725,9 @@ def upsert_embeddings_to_qdrant(
             skipped += 1
             continue
 
-        qdrant_id = str(uuid.uuid5(uuid.NAMESPACE_URL, point_id))
+        qdrant_id = to_qdrant_id(point_id)
 
-        final_payload = dict(payload)
-        final_payload["point_id"] = point_id
-        if text is not None:
-            final_payload["text"] = text
+        final_payload = point_payload(payload, point_id=point_id, text=text)
 
         batch.append(
             PointStruct(
@@ -439,12 +752,93 @@ def upsert_embeddings_to_qdrant(
     return {"inserted": inserted, "skipped": skipped}
 
 
+def to_qdrant_id(point_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, point_id))
+
+
+def delete_points_from_qdrant(client: QdrantClient, collection_name: str, point_ids: List[str]) -> int:
+    if not point_ids:
+        return 0
+    client.delete(
+        collection_name=collection_name,
+        points_selector=PointIdsList(points=[to_qdrant_id(pid) for pid in point_ids]),
+    )
+    return len(point_ids)
+
+
+def overwrite_payloads_in_qdrant(client: QdrantClient, collection_name: str, docs: List[Dict[str, Any]]) -> int:
+    """
+    Update payload tanpa re-embed (teks chunk tidak berubah).
+    """
+    for d in docs:
+        client.overwrite_payload(
+            collection_name=collection_name,
+            payload=point_payload(d["payload"], point_id=d["point_id"], text=d["text"]),
+            points=[to_qdrant_id(d["point_id"])],
+        )
+    return len(docs)
+
+
 # =========================
-# 7) PIPELINE UTAMA: DB -> Split -> Dense+Sparse -> Qdrant
+# 7) PIPELINE UTAMA: per batch DB -> Split -> Dense+Sparse -> Qdrant
 # =========================
-def store_jobs_pipeline(
-    payload: Union[Dict[str, Any], List[Dict[str, Any]]],
+# Peak memory tergantung STORE_BATCH_SIZE (jumlah job per batch), bukan ukuran payload.
+STORE_BATCH_SIZE = int(os.getenv("STORE_BATCH_SIZE", "50"))
+
+
+def iter_batches(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """
+    Potong iterable (list / generator) jadi list berukuran batch_size.
+    """
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def merge_counts(total: Dict[str, Any], part: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Jumlahkan dict counter bertingkat ({"db": {"inserted": 1}, ...}).
+    """
+    for k, v in part.items():
+        if isinstance(v, dict):
+            merge_counts(total.setdefault(k, {}), v)
+        elif isinstance(v, (int, float)):
+            total[k] = total.get(k, 0) + v
+    return total
+
+
+def mark_index_state(job_ids: List[str], status: str, error: Optional[str] = None) -> None:
+    """
+    Update outbox state jobs_docs: "indexed" / "failed" (attempts +1) / "pending".
+    """
+    if not job_ids:
+        return
+    db = SessionLocal()
+    try:
+        values: Dict[str, Any] = {
+            "index_status": status,
+            "index_error": error,
+            "index_updated_at": datetime.utcnow(),
+        }
+        if status == "failed":
+            values["index_attempts"] = Job.index_attempts + 1
+        elif status == "indexed":
+            values["index_attempts"] = 0
+        db.query(Job).filter(Job.job_id.in_(job_ids)).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def index_jobs(
+    jobs: List[Dict[str, Any]],
     *,
+    client: QdrantClient,
     collection_name: str,
     qdrant_url: str,
     qdrant_api_key: Optional[str] = None,
@@ -452,51 +846,138 @@ def store_jobs_pipeline(
     openai_api_key: Optional[str] = None,
     recreate_collection: bool = False,
 ) -> Dict[str, Any]:
+    """
+    Split -> diff hash -> embed -> upsert/delete Qdrant untuk job yang sudah ada di DB,
+    lalu tandai index_status. Gagal -> "failed" + error, exception diteruskan.
+    """
+    job_ids = [j["job_id"] for j in jobs]
+    try:
+        docs = document_splitting_multi(jobs)
+        plan = plan_chunk_changes(docs)
+
+        qdrant_res: Dict[str, int] = {"inserted": 0, "skipped": 0}
+        if plan["to_embed"]:
+            embedded_docs = embed_documents(plan["to_embed"], api_key=openai_api_key, model=embedding_model)
+            if len(embedded_docs) != len(plan["to_embed"]):
+                raise RuntimeError("Embedding failed: embedding provider returned no vectors")
+            qdrant_res = upsert_embeddings_to_qdrant(
+                data=embedded_docs,
+                collection_name=collection_name,
+                qdrant_url=qdrant_url,
+                api_key=qdrant_api_key,
+                dense_size=len(embedded_docs[0]["dense_vector"]) if embedded_docs else None,
+                recreate_collection=recreate_collection,
+                client=client,
+            )
+        qdrant_res["payload_updated"] = overwrite_payloads_in_qdrant(client, collection_name, plan["to_set_payload"])
+        qdrant_res["deleted"] = delete_points_from_qdrant(client, collection_name, plan["stale_point_ids"])
 
-    inserted_jobs, db_inserted, db_skipped = save_documents_database(payload)
+        save_chunk_hashes(plan["to_embed"] + plan["to_set_payload"], plan["stale_point_ids"])
+    except Exception as e:
+        mark_index_state(job_ids, "failed", error=str(e)[:2000])
+        # sebagian batch mungkin sudah ter-upsert -> anggap index berubah (doc Postgres tidak)
+        bump_generation(collection_name, job_ids=[])
+        raise
 
-    if not inserted_jobs:
-        return {
-            "db": {"inserted": db_inserted, "skipped": db_skipped},
-            "docs": {"generated": 0},
-            "qdrant": {"inserted": 0, "skipped": 0},
-        }
+    mark_index_state(job_ids, "indexed")
+    if plan["to_embed"] or plan["to_set_payload"] or plan["stale_point_ids"]:
+        # invalidasi cache hasil /retrieve
+        bump_generation(collection_name, job_ids=[])
 
-    docs = document_splitting_multi(inserted_jobs)
-    texts = [d["text"] for d in docs]
+    return {
+        "docs": {
+            "generated": len(docs),
+            "embedded": len(plan["to_embed"]),
+            "unchanged": plan["unchanged"],
+        },
+        "qdrant": qdrant_res,
+    }
 
-    # Dense (OpenAI)
-    dense_vectors = embed_texts_openai(
-        texts,
-        api_key=openai_api_key,
-        model=embedding_model,
-    )
 
-    # Sparse (manual)
-    sparse_vectors = embed_texts_sparse_manual(texts)
+def store_jobs_batch(
+    jobs: List[Dict[str, Any]],
+    *,
+    client: QdrantClient,
+    collection_name: str,
+    qdrant_url: str,
+    qdrant_api_key: Optional[str] = None,
+    embedding_model: str = "text-embedding-3-small",
+    openai_api_key: Optional[str] = None,
+    recreate_collection: bool = False,
+) -> Dict[str, Any]:
 
-    embedded_docs: List[Dict[str, Any]] = []
-    for d, dv, sv in zip(docs, dense_vectors, sparse_vectors):
-        embedded_docs.append({
-            "point_id": d["point_id"],
-            "job_id": d["job_id"],
-            "payload": d["payload"],
-            "dense_vector": dv,
-            "sparse_vector": sv,
-            "text": d["text"],
-        })
+    changed_jobs, db_inserted, db_skipped, db_updated = save_documents_database(jobs)
+    db_res = {"inserted": db_inserted, "skipped": db_skipped, "updated": db_updated}
+    if db_updated:
+        # row lama berubah (mungkin hanya kolom non-chunk, mis. logo / salary):
+        # evict hydration cache job itu saja + invalidasi cache hasil /retrieve
+        # walau tidak ada chunk yang berubah
+        changed_ids = [j["job_id"] for j in changed_jobs]
+        evict_hydrated(changed_ids)
+        bump_generation(collection_name, job_ids=changed_ids)
+
+    if not changed_jobs:
+        return {
+            "db": db_res,
+            "docs": {"generated": 0},
+            "qdrant": {"inserted": 0, "skipped": 0},
+        }
 
-    qdrant_res = upsert_embeddings_to_qdrant(
-        data=embedded_docs,
+    res = index_jobs(
+        changed_jobs,
+        client=client,
         collection_name=collection_name,
         qdrant_url=qdrant_url,
-        api_key=qdrant_api_key,
-        dense_size=len(dense_vectors[0]) if dense_vectors else None,
+        qdrant_api_key=qdrant_api_key,
+        embedding_model=embedding_model,
+        openai_api_key=openai_api_key,
         recreate_collection=recreate_collection,
     )
+    return {"db": db_res, **res}
 
-    return {
-        "db": {"inserted": db_inserted, "skipped": db_skipped},
-        "docs": {"generated": len(docs)},
-        "qdrant": qdrant_res,
+
+def store_jobs_pipeline(
+    payload: Union[Dict[str, Any], Iterable[Dict[str, Any]]],
+    *,
+    collection_name: str,
+    qdrant_url: str,
+    qdrant_api_key: Optional[str] = None,
+    embedding_model: str = "text-embedding-3-small",
+    openai_api_key: Optional[str] = None,
+    recreate_collection: bool = False,
+    batch_size: int = STORE_BATCH_SIZE,
+    client: Optional[QdrantClient] = None,
+) -> Dict[str, Any]:
+    """
+    payload: {"data": [...]} atau list / generator job dict.
+    Job diproses per batch_size sehingga chunk, text, dan vector
+    hanya ada di memory untuk satu batch.
+    """
+    data = payload.get("data", []) if isinstance(payload, dict) else payload
+    if isinstance(payload, dict) and not isinstance(data, list):
+        raise ValueError("payload['data'] harus list")
+
+    if client is None:
+        client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
+
+    total: Dict[str, Any] = {
+        "db": {"inserted": 0, "skipped": 0, "updated": 0},
+        "docs": {"generated": 0},
+        "qdrant": {"inserted": 0, "skipped": 0},
+        "batches": 0,
     }
+    for i, batch in enumerate(iter_batches(data, batch_size)):
+        res = store_jobs_batch(
+            batch,
+            client=client,
+            collection_name=collection_name,
+            qdrant_url=qdrant_url,
+            qdrant_api_key=qdrant_api_key,
+            embedding_model=embedding_model,
+            openai_api_key=openai_api_key,
+            recreate_collection=recreate_collection and i == 0,
+        )
+        merge_counts(total, res)
+        total["batches"] += 1
+
+    return total
@@ -0,0 +1,190 @@
+"""
+Poster image preprocessing + perceptual-hash cache for /store/upload-image(s).
+
+- preprocess_image(): apply EXIF orientation, downsize to IMAGE_MAX_SIDE,
+  re-encode as JPEG (IMAGE_JPEG_QUALITY) without EXIF/metadata.
+- image_hashes(): 64-bit dHash + pHash (hex), computed on the decoded image
+  so re-encoded / resized copies of the same poster hash (almost) the same.
+- find_cached_extraction() / save_extraction(): table image_extractions maps
+  a hash to the prior vision result + Supabase URL. Near-duplicate =
+  dHash AND pHash within IMAGE_HASH_MAX_DISTANCE bits.
+- Near-duplicate candidates come from image_hash_bands (each hash split into
+  four 16-bit bands, indexed): only rows sharing at least one band with the
+  new poster are compared, at most IMAGE_CACHE_MAX_CANDIDATES of them (newest
+  first). A pair whose dHash + pHash distance is below 8 bits always shares a
+  band; beyond that the lookup is best effort, and a miss only costs one
+  extra vision call.
+"""
+import io
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from sqlalchemy import and_, or_, select
+
+from database.database import SessionLocal
+from database.models import ImageExtraction, ImageHashBand
+
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1536"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_HASH_MAX_DISTANCE = int(os.getenv("IMAGE_HASH_MAX_DISTANCE", "6"))
+IMAGE_CACHE_MAX_CANDIDATES = int(os.getenv("IMAGE_CACHE_MAX_CANDIDATES", "200"))
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def open_image(image_bytes: bytes) -> Image.Image:
+    """
+    Decode + apply EXIF orientation, lalu flatten ke RGB (alpha -> putih).
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def preprocess_image(
+    image_bytes: bytes,
+    max_side: int = IMAGE_MAX_SIDE,
+    quality: int = IMAGE_JPEG_QUALITY,
+) -> Tuple[bytes, str, Image.Image]:
+    """
+    Return (jpeg_bytes, mime_type, decoded_image). Raise ValueError kalau bukan gambar valid.
+    """
+    try:
+        img = open_image(image_bytes)
+    except Exception as e:
+        raise ValueError(f"Invalid image: {e}")
+
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    out = io.BytesIO()
+    # tanpa exif=... -> metadata (GPS, device, dll) tidak ikut tersimpan
+    img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue(), "image/jpeg", img
+
+
+def dhash(img: Image.Image, size: int = 8) -> int:
+    pixels = np.asarray(img.convert("L").resize((size + 1, size), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def phash(img: Image.Image) -> int:
+    pixels = np.asarray(img.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT32 @ pixels @ _DCT32.T)[:8, :8].flatten()
+    median = np.median(low[1:])  # tanpa komponen DC
+    return int("".join("1" if v > median else "0" for v in low), 2)
+
+
+def image_hashes(img: Image.Image) -> Dict[str, str]:
+    return {"dhash": f"{dhash(img):016x}", "phash": f"{phash(img):016x}"}
+
+
+def prepare_poster(image_bytes: bytes) -> Tuple[bytes, str, Dict[str, str]]:
+    """
+    preprocess_image + image_hashes dalam satu call (blocking, jalankan di threadpool).
+    """
+    jpeg_bytes, mime_type, img = preprocess_image(image_bytes)
+    return jpeg_bytes, mime_type, image_hashes(img)
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def hash_bands(hashes: Dict[str, str]) -> List[Tuple[int, str]]:
+    """
+    (band, 16-bit hex): band 0-3 dari dHash, 4-7 dari pHash.
+    """
+    hex_ = hashes["dhash"] + hashes["phash"]
+    return [(i, hex_[i * 4:(i + 1) * 4]) for i in range(len(hex_) // 4)]
+
+
+def band_candidates(db: Any, hashes: Dict[str, str], limit: int = IMAGE_CACHE_MAX_CANDIDATES) -> List[Tuple[int, str, str]]:
+    """
+    (id, dhash, phash) row yang punya minimal satu band sama, terbaru dulu.
+    """
+    match = or_(*[and_(ImageHashBand.band == band, ImageHashBand.value == value) for band, value in hash_bands(hashes)])
+    ids = (
+        db.query(ImageHashBand.extraction_id)
+        .filter(match)
+        .distinct()
+        .order_by(ImageHashBand.extraction_id.desc())
+        .limit(limit)
+        .subquery()
+    )
+    return db.query(ImageExtraction.id, ImageExtraction.dhash, ImageExtraction.phash).filter(ImageExtraction.id.in_(select(ids))).all()
+
+
+def find_cached_extraction(hashes: Dict[str, str], max_distance: int = IMAGE_HASH_MAX_DISTANCE) -> Optional[Dict[str, Any]]:
+    """
+    Cari ekstraksi sebelumnya untuk gambar yang (hampir) sama.
+    Exact match dicek lewat index dHash dulu, baru Hamming distance ke
+    kandidat dari image_hash_bands (bukan scan seluruh tabel).
+    """
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(ImageExtraction)
+            .filter(ImageExtraction.dhash == hashes["dhash"], ImageExtraction.phash == hashes["phash"])
+            .first()
+        )
+        best = (row, 0) if row else None
+
+        if best is None and max_distance > 0:
+            for cand_id, cand_d, cand_p in band_candidates(db, hashes):
+                distance = max(hamming(cand_d, hashes["dhash"]), hamming(cand_p, hashes["phash"]))
+                if distance <= max_distance and (best is None or distance < best[1]):
+                    best = (cand_id, distance)
+            if best is not None:
+                best = (db.get(ImageExtraction, best[0]), best[1])
+
+        if best is None:
+            return None
+        row, distance = best
+        return {
+            "image_url": row.image_url,
+            "job_data": dict(row.job_data),
+            "distance": distance,
+        }
+    finally:
+        db.close()
+
+
+def save_extraction(hashes: Dict[str, str], image_url: str, job_data: Dict[str, Any]) -> None:
+    db = SessionLocal()
+    try:
+        row = ImageExtraction(
+            dhash=hashes["dhash"],
+            phash=hashes["phash"],
+            image_url=image_url,
+            job_id=job_data.get("job_id"),
+            job_data=job_data,
+        )
+        db.add(row)
+        db.flush()  # row.id untuk band
+        db.add_all([ImageHashBand(band=band, value=value, extraction_id=row.id) for band, value in hash_bands(hashes)])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Image cache save error: {e}")
+    finally:
+        db.close()
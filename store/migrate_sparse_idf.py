@@ -0,0 +1,90 @@
+"""
+Migration script to move an existing hybrid collection to BM25 sparse vectors.
+
+Copies every point of the source collection into a new collection whose
+"sparse" vector uses Qdrant's IDF modifier. Dense vectors are reused as-is
+(no re-embedding); sparse vectors are recomputed from payload["text"].
+Only collections written with PAYLOAD_PROFILE=full carry the chunk text;
+slim collections should be rebuilt with `python -m store.reindex` instead.
+
+Usage:
+    python -m store.migrate_sparse_idf --source jobs --target jobs_bm25
+
+Afterwards point COLLECTION_NAME at the target collection.
+"""
+import argparse
+import os
+
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from utils.sparse import document_sparse_vector
+
+from .helper import ensure_hybrid_collection
+
+load_dotenv()
+
+
+def migrate(source: str, target: str, batch_size: int = 256) -> dict:
+    client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+
+    info = client.get_collection(source)
+    dense_cfg = info.config.params.vectors["dense"]
+
+    ensure_hybrid_collection(
+        client,
+        collection_name=target,
+        dense_size=dense_cfg.size,
+        distance=dense_cfg.distance,
+    )
+
+    copied = 0
+    skipped = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=["dense"],
+        )
+
+        batch = []
+        for p in points:
+            payload = p.payload or {}
+            text = payload.get("text")
+            dense = (p.vector or {}).get("dense")
+            if not text or not dense:
+                skipped += 1
+                continue
+            batch.append(PointStruct(
+                id=p.id,
+                vector={"dense": dense, "sparse": document_sparse_vector(text)},
+                payload=payload,
+            ))
+
+        if batch:
+            client.upsert(collection_name=target, points=batch)
+            copied += len(batch)
+        print(f"Copied {copied} points ({skipped} skipped)")
+
+        if offset is None:
+            break
+
+    return {"copied": copied, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate hybrid collection to BM25 + IDF sparse vectors")
+    parser.add_argument("--source", default=os.getenv("COLLECTION_NAME"))
+    parser.add_argument("--target", default=None, help="Default: <source>_bm25")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if not args.source:
+        raise SystemExit("--source or COLLECTION_NAME is required")
+
+    res = migrate(args.source, args.target or f"{args.source}_bm25", batch_size=args.batch_size)
+    print(f"✅ Migration finished: {res}")
@@ -0,0 +1,209 @@
+"""
+Durable ingestion queue for /store (Postgres table ingest_tasks).
+
+- enqueue_ingest(): stores the payload and returns a ticket. The same
+  Idempotency-Key (or, by default, the same payload) returns the same
+  ticket, so client retries never enqueue twice.
+- Workers are opt-in: an app process only starts INGEST_WORKERS threads
+  when it is set (> 0), e.g. on the replicas that should ingest, after
+  ingest_tasks has been created. Default 0 = no polling.
+- Background worker threads claim tasks with SELECT ... FOR UPDATE
+  SKIP LOCKED and a lease (locked_until), run store_jobs_pipeline and
+  record the counts. A task whose worker died is re-claimed after the
+  lease expires; re-running is safe because the pipeline upserts by url
+  and only re-embeds chunks whose content hash changed.
+"""
+import hashlib
+import json
+import os
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from database.database import SessionLocal
+from database.models import IngestTask
+
+from .helper import store_jobs_pipeline
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))  # 0 = proses ini tidak memproses antrian
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "2"))
+INGEST_LEASE_SECONDS = int(os.getenv("INGEST_LEASE_SECONDS", "900"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+
+_stop = threading.Event()
+_workers: List[threading.Thread] = []
+
+
+def task_to_dict(task: IngestTask) -> Dict[str, Any]:
+    return {
+        "task_id": task.task_id,
+        "status": task.status,
+        "jobs": task.jobs_count,
+        "attempts": task.attempts,
+        "result": task.result,
+        "error": task.error,
+        "created_at": task.created_at.isoformat() if task.created_at else None,
+        "updated_at": task.updated_at.isoformat() if task.updated_at else None,
+    }
+
+
+def payload_key(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def enqueue_ingest(payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    data = payload.get("data", []) if isinstance(payload, dict) else payload
+    if not isinstance(data, list):
+        raise ValueError("payload['data'] harus list")
+
+    key = idempotency_key or payload_key(payload)
+
+    db = SessionLocal()
+    try:
+        existing = db.query(IngestTask).filter(IngestTask.idempotency_key == key).first()
+        if existing:
+            if existing.status == "failed":
+                # retry eksplisit dari client setelah gagal permanen -> antrikan lagi
+                existing.status = "queued"
+                existing.attempts = 0
+                db.commit()
+                db.refresh(existing)
+            return task_to_dict(existing)
+
+        task = IngestTask(
+            task_id=uuid.uuid4().hex,
+            idempotency_key=key,
+            status="queued",
+            payload={"data": data},
+            jobs_count=len(data),
+            attempts=0,
+        )
+        db.add(task)
+        try:
+            db.commit()
+        except IntegrityError:
+            # request lain dengan key yang sama menang race
+            db.rollback()
+            return task_to_dict(db.query(IngestTask).filter(IngestTask.idempotency_key == key).one())
+        db.refresh(task)
+        return task_to_dict(task)
+    finally:
+        db.close()
+
+
+def get_task(task_id: str) -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        task = db.get(IngestTask, task_id)
+        return task_to_dict(task) if task else None
+    finally:
+        db.close()
+
+
+def claim_next_task() -> Optional[str]:
+    """
+    Ambil satu task queued (atau running yang lease-nya habis) dan kunci dengan lease.
+    Lease habis = worker mati di tengah task (OOM / crash); kalau attempts sudah
+    INGEST_MAX_ATTEMPTS task di-fail, tidak di-claim ulang terus-menerus.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        while True:
+            task = (
+                db.query(IngestTask)
+                .filter(or_(
+                    IngestTask.status == "queued",
+                    (IngestTask.status == "running") & (IngestTask.locked_until < now),
+                ))
+                .order_by(IngestTask.created_at)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if not task:
+                db.rollback()
+                return None
+            if task.status != "running" or (task.attempts or 0) < INGEST_MAX_ATTEMPTS:
+                break
+
+            task.status = "failed"
+            task.error = f"Lease expired after {task.attempts} attempt(s), worker did not finish the task"
+            task.locked_until = None
+            db.commit()
+
+        task.status = "running"
+        task.attempts = (task.attempts or 0) + 1
+        task.locked_until = now + timedelta(seconds=INGEST_LEASE_SECONDS)
+        db.commit()
+        return task.task_id
+    finally:
+        db.close()
+
+
+def finish_task(task_id: str, *, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+    db = SessionLocal()
+    try:
+        task = db.get(IngestTask, task_id)
+        if error is None:
+            task.status = "done"
+            task.result = result
+            task.error = None
+        else:
+            task.status = "failed" if task.attempts >= INGEST_MAX_ATTEMPTS else "queued"
+            task.error = error
+        task.locked_until = None
+        db.commit()
+    finally:
+        db.close()
+
+
+def process_task(task_id: str, pipeline_kwargs: Dict[str, Any]) -> None:
+    db = SessionLocal()
+    try:
+        payload = db.get(IngestTask, task_id).payload
+    finally:
+        db.close()
+
+    try:
+        result = store_jobs_pipeline(payload, **pipeline_kwargs)
+    except Exception as e:
+        traceback.print_exc()
+        finish_task(task_id, error=str(e))
+        return
+    finish_task(task_id, result=result)
+
+
+def worker_loop(pipeline_kwargs: Dict[str, Any]) -> None:
+    while not _stop.is_set():
+        try:
+            task_id = claim_next_task()
+        except Exception as e:
+            print(f"Ingest worker claim error: {e}")
+            task_id = None
+
+        if task_id is None:
+            _stop.wait(INGEST_POLL_SECONDS)
+            continue
+        process_task(task_id, pipeline_kwargs)
+
+
+def start_ingest_workers(pipeline_kwargs: Dict[str, Any], workers: int = INGEST_WORKERS) -> None:
+    if _workers:
+        return
+    _stop.clear()
+    for i in range(workers):
+        t = threading.Thread(target=worker_loop, args=(pipeline_kwargs,), name=f"ingest-worker-{i}", daemon=True)
+        t.start()
+        _workers.append(t)
+
+
+def stop_ingest_workers(timeout: float = 10.0) -> None:
+    _stop.set()
+    for t in _workers:
+        t.join(timeout=timeout)
+    _workers.clear()
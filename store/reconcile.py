@@ -0,0 +1,161 @@
+"""
+Reconciler between Postgres jobs_docs (source of truth) and the Qdrant index.
+
+1) Outbox: index jobs whose index_status is "pending" / "failed"
+   (attempts < RECONCILE_MAX_ATTEMPTS), oldest first, in batches.
+2) Drift Postgres -> Qdrant: jobs marked "indexed" that have no point in
+   Qdrant are reset to "pending" (and their jobs_chunks rows dropped so
+   every chunk is re-embedded).
+3) Drift Qdrant -> Postgres: points whose job_id no longer exists in
+   jobs_docs are deleted.
+
+Usage:
+    python -m store.reconcile                 # outbox only
+    python -m store.reconcile --drift         # outbox + both drift checks
+    python -m store.reconcile --loop 60       # repeat every 60 seconds
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Set
+
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient
+from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchAny
+
+from database.database import SessionLocal
+from database.models import Job, JobChunk
+from database.index_generation import bump_generation
+
+from .helper import JOB_FIELDS, STORE_BATCH_SIZE, index_jobs, iter_batches
+
+load_dotenv()
+
+RECONCILE_MAX_ATTEMPTS = int(os.getenv("RECONCILE_MAX_ATTEMPTS", "5"))
+# Jangan sentuh job "pending" yang baru saja ditulis (mungkin sedang di-index pipeline)
+RECONCILE_GRACE_SECONDS = int(os.getenv("RECONCILE_GRACE_SECONDS", "300"))
+
+
+def qdrant_client() -> QdrantClient:
+    return QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+
+
+def pipeline_kwargs() -> Dict[str, Any]:
+    return dict(
+        collection_name=os.getenv("COLLECTION_NAME"),
+        qdrant_url=os.getenv("QDRANT_URL"),
+        qdrant_api_key=os.getenv("QDRANT_API_KEY"),
+        embedding_model=os.getenv("EMBEDDING_MODEL"),
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+    )
+
+
+def process_outbox(client: QdrantClient, *, batch_size: int = STORE_BATCH_SIZE, limit: int = 1000) -> Dict[str, int]:
+    cutoff = datetime.utcnow() - timedelta(seconds=RECONCILE_GRACE_SECONDS)
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Job)
+            .filter(Job.index_status.in_(["pending", "failed"]))
+            .filter(Job.index_attempts < RECONCILE_MAX_ATTEMPTS)
+            .filter((Job.index_updated_at == None) | (Job.index_updated_at < cutoff))  # noqa: E711
+            .order_by(Job.created_at)
+            .limit(limit)
+            .all()
+        )
+        jobs = [{"job_id": r.job_id, "url": r.url, **{f: getattr(r, f) for f in JOB_FIELDS}} for r in rows]
+    finally:
+        db.close()
+
+    indexed = 0
+    failed = 0
+    for batch in iter_batches(jobs, batch_size):
+        try:
+            index_jobs(batch, client=client, **pipeline_kwargs())
+            indexed += len(batch)
+        except Exception as e:
+            # index_jobs sudah menandai batch ini "failed" + attempts
+            print(f"Reconcile batch failed: {e}")
+            failed += len(batch)
+
+    return {"candidates": len(jobs), "indexed": indexed, "failed": failed}
+
+
+def iter_qdrant_job_ids(client: QdrantClient, collection_name: str, page_size: int = 1000) -> Iterator[str]:
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=["job_id"],
+            with_vectors=False,
+        )
+        for p in points:
+            job_id = (p.payload or {}).get("job_id")
+            if job_id:
+                yield job_id
+        if offset is None:
+            break
+
+
+def repair_drift(client: QdrantClient, collection_name: str, *, batch_size: int = 500) -> Dict[str, int]:
+    qdrant_job_ids: Set[str] = set(iter_qdrant_job_ids(client, collection_name))
+
+    db = SessionLocal()
+    try:
+        db_job_ids: Dict[str, str] = dict(db.query(Job.job_id, Job.index_status).all())
+
+        # Postgres -> Qdrant: "indexed" tapi tidak ada point-nya
+        missing = [jid for jid, status in db_job_ids.items() if status == "indexed" and jid not in qdrant_job_ids]
+        for batch in iter_batches(missing, batch_size):
+            db.query(JobChunk).filter(JobChunk.job_id.in_(batch)).delete(synchronize_session=False)
+            db.query(Job).filter(Job.job_id.in_(batch)).update(
+                {"index_status": "pending", "index_attempts": 0, "index_updated_at": None},
+                synchronize_session=False,
+            )
+        db.commit()
+
+        # Qdrant -> Postgres: point yatim (job sudah tidak ada di jobs_docs)
+        orphans: List[str] = [jid for jid in qdrant_job_ids if jid not in db_job_ids]
+        for batch in iter_batches(orphans, batch_size):
+            client.delete(
+                collection_name=collection_name,
+                points_selector=FilterSelector(
+                    filter=Filter(must=[FieldCondition(key="job_id", match=MatchAny(any=batch))])
+                ),
+            )
+            db.query(JobChunk).filter(JobChunk.job_id.in_(batch)).delete(synchronize_session=False)
+        db.commit()
+        if orphans:
+            bump_generation(collection_name, job_ids=[])
+    finally:
+        db.close()
+
+    return {"reset_to_pending": len(missing), "orphans_deleted": len(orphans)}
+
+
+def reconcile(*, drift: bool = False, batch_size: int = STORE_BATCH_SIZE) -> Dict[str, Any]:
+    client = qdrant_client()
+    collection_name = os.getenv("COLLECTION_NAME")
+
+    report: Dict[str, Any] = {}
+    if drift:
+        report["drift"] = repair_drift(client, collection_name)
+    report["outbox"] = process_outbox(client, batch_size=batch_size)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile jobs_docs index state with Qdrant")
+    parser.add_argument("--drift", action="store_true", help="Also repair drift in both directions (full scan)")
+    parser.add_argument("--batch-size", type=int, default=STORE_BATCH_SIZE)
+    parser.add_argument("--loop", type=int, default=0, help="Repeat every N seconds")
+    args = parser.parse_args()
+
+    while True:
+        print(f"{datetime.utcnow().isoformat()} {reconcile(drift=args.drift, batch_size=args.batch_size)}")
+        if not args.loop:
+            break
+        time.sleep(args.loop)
@@ -0,0 +1,290 @@
+"""
+Zero-downtime bulk reindex: Postgres jobs_docs -> shadow collection -> alias swap.
+
+- Streams jobs from Postgres with a server-side cursor (ordered by job_id).
+- Splits + embeds + upserts in parallel batches into a fresh shadow collection.
+- Writes a checkpoint (last fully indexed job_id) so a crashed run can resume.
+- Re-indexes jobs created or updated while the run was in progress (catch-up pass).
+- Atomically repoints the alias (COLLECTION_NAME) to the shadow collection.
+- Chunk hashes are staged per shadow collection (jobs_chunks_staged) and
+  replace jobs_chunks only after the alias swap, so an aborted run never
+  desyncs jobs_chunks from the live collection.
+
+/retrieve and /store always use COLLECTION_NAME, so after the first run
+that name is an alias and search never sees a half-built index.
+
+Usage:
+    python -m store.reindex                    # new shadow collection
+    python -m store.reindex --resume           # continue from checkpoint
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func, or_, select
+from qdrant_client import QdrantClient
+from qdrant_client.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+
+from database.database import SessionLocal
+from database.models import Job
+from database.index_generation import bump_generation
+
+from .helper import (
+    delete_points_from_qdrant,
+    discard_staged_chunk_hashes,
+    document_splitting_multi,
+    embed_documents,
+    publish_staged_chunk_hashes,
+    resolve_collection_name,
+    stage_chunk_hashes,
+    upsert_embeddings_to_qdrant,
+)
+
+load_dotenv()
+
+
+def job_row_to_dict(job: Job) -> Dict[str, Any]:
+    return {c.name: getattr(job, c.name) for c in Job.__table__.columns}
+
+
+def iter_job_batches(
+    batch_size: int,
+    *,
+    after_job_id: Optional[str] = None,
+    created_since: Optional[datetime] = None,
+    updated_since: Optional[datetime] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield lists of job dicts, streamed with a server-side cursor
+    (stream_results) so memory depends on batch_size, not table size.
+    created_since / updated_since digabung OR (job baru atau job yang
+    di-update lewat /store).
+    """
+    db = SessionLocal()
+    try:
+        stmt = select(Job)
+        if after_job_id:
+            stmt = stmt.where(Job.job_id > after_job_id)
+        changed = []
+        if created_since is not None:
+            changed.append(Job.created_at >= created_since)
+        if updated_since is not None:
+            changed.append(Job.index_updated_at >= updated_since)  # UTC
+        if changed:
+            stmt = stmt.where(or_(*changed))
+        stmt = stmt.order_by(Job.job_id).execution_options(stream_results=True, yield_per=batch_size)
+
+        batch: List[Dict[str, Any]] = []
+        for job in db.scalars(stmt):
+            batch.append(job_row_to_dict(job))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        db.close()
+
+
+def index_batch(
+    client: QdrantClient,
+    jobs: List[Dict[str, Any]],
+    *,
+    collection_name: str,
+    embedding_model: Optional[str] = None,
+) -> int:
+    docs = document_splitting_multi(jobs)
+    if not docs:
+        return 0
+
+    embedded_docs = embed_documents(docs, model=embedding_model)
+    if len(embedded_docs) != len(docs):
+        # embed_texts_openai mengembalikan [] kalau gagal -> jangan majukan checkpoint
+        raise RuntimeError(f"Embedding failed for batch ending at job_id={jobs[-1]['job_id']}")
+
+    res = upsert_embeddings_to_qdrant(
+        data=embedded_docs,
+        collection_name=collection_name,
+        qdrant_url=os.getenv("QDRANT_URL"),
+        client=client,
+    )
+    stale = stage_chunk_hashes(collection_name, docs)
+    if stale:
+        delete_points_from_qdrant(client, collection_name, stale)
+    return res["inserted"]
+
+
+def db_now() -> datetime:
+    """
+    Waktu dari clock Postgres (sama dengan server_default created_at).
+    """
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.now()))
+    finally:
+        db.close()
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)  # atomic rename
+
+
+def swap_alias(client: QdrantClient, alias: str, new_collection: str) -> Optional[str]:
+    """
+    Point `alias` at `new_collection` in a single aliases request (atomic).
+    Returns the collection the alias pointed to before, if any.
+    """
+    old = resolve_collection_name(client, alias)
+    operations = []
+
+    if old != alias:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    elif client.collection_exists(alias):
+        # First run: COLLECTION_NAME is still a real collection. A collection and
+        # an alias cannot share a name, so this one-time switch has a short gap.
+        print(f"WARNING: '{alias}' is a collection, deleting it so it can become an alias")
+        client.delete_collection(alias)
+        old = None
+    else:
+        old = None
+
+    operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=new_collection, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    # resume setelah swap (mis. publish hash gagal): alias sudah ke new_collection
+    return None if old == new_collection else old
+
+
+def reindex(
+    alias: str,
+    *,
+    batch_size: int = 64,
+    workers: int = 4,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = False,
+    keep_old: bool = False,
+) -> Dict[str, Any]:
+    client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+    embedding_model = os.getenv("EMBEDDING_MODEL")
+    checkpoint_path = checkpoint_path or f".reindex_{alias}.json"
+
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state and state.get("alias") != alias:
+        raise SystemExit(f"Checkpoint {checkpoint_path} belongs to alias '{state.get('alias')}'")
+    if not state:
+        previous = load_checkpoint(checkpoint_path)
+        if previous and previous.get("alias") == alias:
+            # run lama yang tidak di-resume: hash yang di-stage untuknya tidak terpakai
+            discard_staged_chunk_hashes(previous["shadow"])
+        shadow = f"{alias}_{datetime.utcnow():%Y%m%d%H%M%S}"
+        n = 1
+        while client.collection_exists(shadow) or resolve_collection_name(client, alias) == shadow:
+            n += 1
+            shadow = f"{alias}_{datetime.utcnow():%Y%m%d%H%M%S}_{n}"
+        state = {
+            "alias": alias,
+            "shadow": shadow,
+            "started_at": db_now().isoformat(),
+            "started_at_utc": datetime.utcnow().isoformat(),  # clock index_updated_at
+            "last_job_id": None,
+            "points": 0,
+        }
+        save_checkpoint(checkpoint_path, state)
+
+    shadow = state["shadow"]
+    print(f"Reindexing into shadow collection '{shadow}' (alias '{alias}')")
+    t0 = time.time()
+
+    def run(batch: List[Dict[str, Any]]) -> int:
+        return index_batch(client, batch, collection_name=shadow, embedding_model=embedding_model)
+
+    batches = iter_job_batches(batch_size, after_job_id=state["last_job_id"])
+
+    # Batch pertama synchronous supaya shadow collection dibuat sekali (dense_size dari hasil embed)
+    first = next(batches, None)
+    if first:
+        state["points"] += run(first)
+        state["last_job_id"] = first[-1]["job_id"]
+        save_checkpoint(checkpoint_path, state)
+
+    # Sisanya paralel; checkpoint hanya maju berurutan (batch paling lama selesai dulu)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight: deque = deque()
+        for batch in batches:
+            in_flight.append((batch[-1]["job_id"], pool.submit(run, batch)))
+            while len(in_flight) >= workers * 2:
+                last_id, fut = in_flight.popleft()
+                state["points"] += fut.result()
+                state["last_job_id"] = last_id
+                save_checkpoint(checkpoint_path, state)
+                print(f"  ... {state['points']} points, last job_id={last_id}")
+        while in_flight:
+            last_id, fut = in_flight.popleft()
+            state["points"] += fut.result()
+            state["last_job_id"] = last_id
+            save_checkpoint(checkpoint_path, state)
+
+    # Catch-up: job baru (job_id-nya bisa < cursor) dan job yang di-update lewat
+    # /store selama reindex (ditulis ke collection lama lewat alias)
+    started_at = datetime.fromisoformat(state["started_at"])
+    started_at_utc = datetime.fromisoformat(state.get("started_at_utc") or state["started_at"])
+    for batch in iter_job_batches(batch_size, created_since=started_at, updated_since=started_at_utc):
+        state["points"] += run(batch)
+
+    old = swap_alias(client, alias, shadow)
+    print(f"Alias '{alias}' -> '{shadow}' (was: {old})")
+    chunks = publish_staged_chunk_hashes(shadow)
+    print(f"jobs_chunks replaced with {chunks} staged chunk hashes")
+    bump_generation(alias, job_ids=[])  # isi Postgres tidak berubah
+
+    if old and not keep_old:
+        client.delete_collection(old)
+        print(f"Dropped old collection '{old}'")
+
+    os.remove(checkpoint_path)
+    return {
+        "alias": alias,
+        "collection": shadow,
+        "previous": old,
+        "points": state["points"],
+        "seconds": round(time.time() - t0, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the Qdrant index from Postgres with an alias swap")
+    parser.add_argument("--alias", default=os.getenv("COLLECTION_NAME"))
+    parser.add_argument("--batch-size", type=int, default=64, help="Jobs per embed/upsert batch")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default=None, help="Default: .reindex_<alias>.json")
+    parser.add_argument("--resume", action="store_true", help="Continue the run recorded in the checkpoint")
+    parser.add_argument("--keep-old", action="store_true", help="Do not delete the previous collection")
+    args = parser.parse_args()
+
+    if not args.alias:
+        raise SystemExit("--alias or COLLECTION_NAME is required")
+
+    res = reindex(
+        args.alias,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+        keep_old=args.keep_old,
+    )
+    print(f"✅ Reindex finished: {res}")
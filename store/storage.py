@@ -1,8 +1,13 @@
 import os
 import uuid
+from functools import lru_cache
+from typing import Optional
+
 from supabase import create_client, Client
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
@@ -10,33 +15,50 @@ def get_supabase_client() -> Client:
         raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env")
     return create_client(url, key)
 
-async def upload_image_to_supabase(file: UploadFile, bucket_name: str = "job-posters") -> str:
+def upload_bytes_to_supabase(
+    content: bytes,
+    filename: Optional[str],
+    content_type: Optional[str],
+    bucket_name: str = "job-posters",
+) -> str:
     """
-    Uploads a file to Supabase Storage and returns the public URL.
+    Blocking upload of raw bytes to Supabase Storage, returns the public URL.
+    Run it in a threadpool from async code.
     """
     supabase = get_supabase_client()
-    
-    file_ext = file.filename.split(".")[-1]
+
+    file_ext = (filename or "image.jpg").split(".")[-1]
     file_name = f"{uuid.uuid4()}.{file_ext}"
-    
-    # Read file content
-    content = await file.read()
-    
-    # Reset cursor for other readers
-    await file.seek(0)
-    
+
     try:
-        # Upload
         supabase.storage.from_(bucket_name).upload(
             path=file_name,
             file=content,
-            file_options={"content-type": file.content_type}
+            file_options={"content-type": content_type or "application/octet-stream"}
         )
-        
-        # Get Public URL
-        public_url = supabase.storage.from_(bucket_name).get_public_url(file_name)
-        return public_url
-        
+        return supabase.storage.from_(bucket_name).get_public_url(file_name)
     except Exception as e:
         print(f"Supabase upload error: {e}")
         raise e
+
+def delete_image_from_supabase(public_url: str, bucket_name: str = "job-posters") -> None:
+    """
+    Best-effort removal of an uploaded object (e.g. when extraction failed).
+    """
+    file_name = public_url.split("?")[0].rstrip("/").split("/")[-1]
+    try:
+        get_supabase_client().storage.from_(bucket_name).remove([file_name])
+    except Exception as e:
+        print(f"Supabase delete error: {e}")
+
+async def upload_image_to_supabase(file: UploadFile, bucket_name: str = "job-posters") -> str:
+    """
+    Uploads a file to Supabase Storage and returns the public URL.
+    """
+    # Read file content
+    content = await file.read()
+
+    # Reset cursor for other readers
+    await file.seek(0)
+
+    return await run_in_threadpool(upload_bytes_to_supabase, content, file.filename, file.content_type, bucket_name)
@@ -5,7 +5,7 @@ import uuid
 from openai import OpenAI
 from typing import Dict, Any
 
-def extract_job_from_image(image_bytes: bytes) -> Dict[str, Any]:
+def extract_job_from_image(image_bytes: bytes, mime_type: str = "image/jpeg") -> Dict[str, Any]:
     # Prioritize OPENROUTER_API_KEY, fallback to OPENAI_API_KEY (if user reused it)
     api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
     if not api_key:
@@ -48,7 +48,7 @@ def extract_job_from_image(image_bytes: bytes) -> Dict[str, Any]:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
+                                "url": f"data:{mime_type};base64,{base64_image}"
                             },
                         },
                     ],
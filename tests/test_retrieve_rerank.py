@@ -0,0 +1,85 @@
+"""
+Regression: /retrieve dan /retrieve/sync dengan rerank=true.
+
+Embedding, Qdrant, hydration Postgres dan cross-encoder diganti fake, jadi
+yang dites hanya wiring endpoint -> search_docs(_async) -> rerank_docs(_async)
+(termasuk budget rerank dari RERANK_BUDGET_MS).
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ["RESULT_CACHE_SIZE"] = "0"
+os.environ["HYDRATION_CACHE_SIZE"] = "0"
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from qdrant_client.models import SparseVector
+
+import retrieval.app as retrieval_app
+
+DOCS = [{"job_id": f"job-{i}", "score": 1.0 / (i + 1), "title": f"Job {i}"} for i in range(3)]
+
+
+class FakeQdrant:
+    def query_points_groups(self, **kwargs):
+        return None
+
+
+class FakeAsyncQdrant:
+    async def query_points_groups(self, **kwargs):
+        return None
+
+
+def fake_vectors():
+    return [0.1, 0.2, 0.3], SparseVector(indices=[1], values=[1.0])
+
+
+def fake_rerank(calls):
+    def rerank(query, docs, qdrant_result, top_k, budget_ms):
+        calls.append(budget_ms)
+        ranked = [dict(d, score=float(i)) for i, d in enumerate(reversed(docs))]
+        return ranked[:top_k], True
+    return rerank
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+    rerank = fake_rerank(calls)
+
+    async def rerank_async(*args, **kwargs):
+        return rerank(*args, **kwargs)
+
+    async def embed_async(text, timeout=None, timings=None):
+        return fake_vectors()
+
+    async def hydrate_async(qdrant_res, fields=None, generation=None):
+        return [dict(d) for d in DOCS]
+
+    monkeypatch.setattr(retrieval_app, "embed_query", lambda text, timeout=None, timings=None: fake_vectors())
+    monkeypatch.setattr(retrieval_app, "embed_query_async", embed_async)
+    monkeypatch.setattr(retrieval_app, "qdrant_client", FakeQdrant())
+    monkeypatch.setattr(retrieval_app, "async_qdrant_client", FakeAsyncQdrant())
+    monkeypatch.setattr(retrieval_app, "hydrate_sync", lambda qdrant_res, fields=None, generation=None: [dict(d) for d in DOCS])
+    monkeypatch.setattr(retrieval_app, "hydrate_async", hydrate_async)
+    monkeypatch.setattr(retrieval_app, "rerank_docs", rerank)
+    monkeypatch.setattr(retrieval_app, "rerank_docs_async", rerank_async)
+
+    app = FastAPI()
+    app.include_router(retrieval_app.router)
+    test_client = TestClient(app)
+    test_client.rerank_calls = calls
+    return test_client
+
+
+@pytest.mark.parametrize("path", ["/retrieve", "/retrieve/sync"])
+def test_rerank_true(client, path):
+    r = client.post(path, json={"query": "backend engineer", "top_k": 2, "rerank": True, "parse_query": False})
+
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["reranked"] is True
+    assert [d["job_id"] for d in body["results"]] == ["job-2", "job-1"]
+    assert len(client.rerank_calls) == 1
+    assert 0 < client.rerank_calls[0] <= retrieval_app.RERANK_BUDGET_MS
@@ -0,0 +1,327 @@
+"""
+Small in-process LRU + TTL cache with an optional shared Redis tier.
+
+Used on the retrieval path (query embeddings, ...). Values must be JSON
+serialisable when a Redis URL is configured.
+
+    cache = get_cache("query_embedding", maxsize=2048, ttl=3600, redis_url=os.getenv("REDIS_URL"))
+    value = cache.get_or_compute(key, lambda: expensive())
+    value = await cache.aget_or_compute(key, lambda: expensive_async())
+    cache_stats()  # {"query_embedding": {"hits": ..., "hit_rate": ..., "saved_ms": ...}}
+
+redis-py is optional (pip install redis); without it the Redis tier is
+skipped with a warning and the local LRU still works.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+
+class LRUCache:
+    """
+    Thread-safe LRU dengan TTL per entry (ttl <= 0 = tanpa expiry).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete_many(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache:
+    """
+    Shared tier untuk deployment multi-worker. Error Redis tidak pernah
+    menggagalkan request: dianggap miss.
+    """
+
+    def __init__(self, url: str, ttl: float = 3600.0, prefix: str = "cache"):
+        if redis is None:
+            raise RuntimeError("redis package is not installed")
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self.client.get(f"{self.prefix}:{key}")
+        except Exception as e:
+            print(f"Redis cache get error: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            self.client.set(f"{self.prefix}:{key}", json.dumps(value), ex=int(self.ttl) if self.ttl > 0 else None)
+        except Exception as e:
+            print(f"Redis cache set error: {e}")
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        try:
+            raws = self.client.mget([f"{self.prefix}:{k}" for k in keys])
+        except Exception as e:
+            print(f"Redis cache mget error: {e}")
+            return {}
+        return {k: json.loads(raw) for k, raw in zip(keys, raws) if raw is not None}
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(f"{self.prefix}:{key}", json.dumps(value), ex=int(self.ttl) if self.ttl > 0 else None)
+            pipe.execute()
+        except Exception as e:
+            print(f"Redis cache set_many error: {e}")
+
+    def delete_many(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        try:
+            self.client.delete(*[f"{self.prefix}:{k}" for k in keys])
+        except Exception as e:
+            print(f"Redis cache delete error: {e}")
+
+    def clear(self) -> None:
+        try:
+            for key in self.client.scan_iter(f"{self.prefix}:*"):
+                self.client.delete(key)
+        except Exception as e:
+            print(f"Redis cache clear error: {e}")
+
+
+class TieredCache:
+    """
+    Local LRU di depan (opsional) Redis, plus statistik hit/miss dan
+    perkiraan latency yang dihemat (durasi compute awal entry yang di-hit).
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 3600.0, redis_url: Optional[str] = None):
+        self.name = name
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.shared: Optional[RedisCache] = None
+        if redis_url:
+            try:
+                self.shared = RedisCache(redis_url, ttl=ttl, prefix=name)
+            except Exception as e:
+                print(f"Cache '{name}': Redis tier disabled ({e})")
+
+        self._lock = threading.Lock()
+        self.hits_local = 0
+        self.hits_shared = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.compute_ms = 0.0
+
+    def _record(self, attr: str, saved_ms: float = 0.0) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+            self.saved_ms += saved_ms
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.local.get(key)
+        if entry is not None:
+            self._record("hits_local", entry.get("ms", 0.0))
+            return entry["value"]
+
+        if self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry)
+                self._record("hits_shared", entry.get("ms", 0.0))
+                return entry["value"]
+
+        self._record("misses")
+        return None
+
+    def set(self, key: str, value: Any, ms: float = 0.0) -> None:
+        entry = {"value": value, "ms": ms}
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(key, entry)
+
+    def record_misses(self, count: int) -> None:
+        with self._lock:
+            self.misses += count
+
+    def get_many(self, keys: List[str], record_misses: bool = True) -> Dict[str, Any]:
+        """
+        Lookup banyak key sekaligus (satu round-trip Redis); return hanya yang hit.
+        record_misses=False -> caller menghitung miss sendiri (mis. beberapa key per item).
+        """
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in keys:
+            entry = self.local.get(key)
+            if entry is not None:
+                found[key] = entry["value"]
+                self._record("hits_local", entry.get("ms", 0.0))
+            else:
+                missing.append(key)
+
+        if missing and self.shared is not None:
+            for key, entry in self.shared.get_many(missing).items():
+                self.local.set(key, entry)
+                found[key] = entry["value"]
+                self._record("hits_shared", entry.get("ms", 0.0))
+
+        if record_misses:
+            self.record_misses(len(keys) - len(found))
+        return found
+
+    def set_many(self, items: Dict[str, Any], ms: float = 0.0) -> None:
+        entries = {key: {"value": value, "ms": ms} for key, value in items.items()}
+        for key, entry in entries.items():
+            self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set_many(entries)
+
+    def get_or_compute(
+        self, key: str, compute: Callable[[], Any], cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        t0 = time.perf_counter()
+        value = compute()
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.compute_ms += ms
+        # cacheable(value) False -> hasil parsial (mis. fallback), jangan disimpan
+        if value is not None and (cacheable is None or cacheable(value)):
+            self.set(key, value, ms=ms)
+        return value
+
+    async def aget(self, key: str) -> Optional[Any]:
+        # Redis client-nya sync -> jalankan di thread supaya event loop tidak ter-block
+        if self.shared is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ms: float = 0.0) -> None:
+        if self.shared is None:
+            self.set(key, value, ms=ms)
+        else:
+            await asyncio.to_thread(self.set, key, value, ms)
+
+    async def aget_many(self, keys: List[str], record_misses: bool = True) -> Dict[str, Any]:
+        if self.shared is None:
+            return self.get_many(keys, record_misses)
+        return await asyncio.to_thread(self.get_many, keys, record_misses)
+
+    async def aset_many(self, items: Dict[str, Any], ms: float = 0.0) -> None:
+        if self.shared is None:
+            self.set_many(items, ms=ms)
+        else:
+            await asyncio.to_thread(self.set_many, items, ms)
+
+    async def aget_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]], cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        value = await self.aget(key)
+        if value is not None:
+            return value
+
+        t0 = time.perf_counter()
+        value = await compute()
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.compute_ms += ms
+        if value is not None and (cacheable is None or cacheable(value)):
+            await self.aset(key, value, ms=ms)
+        return value
+
+    def delete_many(self, keys: List[str], shared: bool = True) -> None:
+        """
+        Evict key dari local LRU (dan Redis kalau shared=True).
+        """
+        self.local.delete_many(keys)
+        if shared and self.shared is not None:
+            self.shared.delete_many(keys)
+
+    def clear(self, shared: bool = True) -> None:
+        self.local.clear()
+        if shared and self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.hits_local + self.hits_shared
+        lookups = hits + self.misses
+        return {
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+            "ttl": self.local.ttl,
+            "shared": self.shared is not None,
+            "hits": hits,
+            "hits_local": self.hits_local,
+            "hits_shared": self.hits_shared,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "saved_ms": round(self.saved_ms, 1),
+            "avg_miss_ms": round(self.compute_ms / self.misses, 1) if self.misses else 0.0,
+        }
+
+
+_CACHES: Dict[str, TieredCache] = {}
+
+
+def get_cache(name: str, maxsize: int = 1024, ttl: float = 3600.0, redis_url: Optional[str] = None) -> TieredCache:
+    """
+    Named cache singleton (dibuat sekali per proses).
+    """
+    if name not in _CACHES:
+        _CACHES[name] = TieredCache(name, maxsize=maxsize, ttl=ttl, redis_url=redis_url)
+    return _CACHES[name]
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _CACHES.items()}
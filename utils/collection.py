@@ -0,0 +1,158 @@
+"""
+Shared Qdrant collection settings for the hybrid collection.
+Used by both store (indexing) and retrieval (querying).
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    HnswConfigDiff,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+
+
+# Payload profile (env PAYLOAD_PROFILE):
+# - "full": base_payload (url, title, company, salary, ...) + point_id + chunk text
+# - "slim": only what retrieval / filtering reads; everything else is
+#           hydrated from Postgres by job_id anyway
+PAYLOAD_PROFILE = os.getenv("PAYLOAD_PROFILE", "slim").lower()
+
+PAYLOAD_PROFILES: Dict[str, Optional[List[str]]] = {
+    "full": None,  # None = keep everything
+    "slim": ["job_id", "field", "chunk_idx", "source", "content_hash", "work_type", "education", "address"],
+}
+
+# Payload indexes created by ensure_hybrid_collection. work_type / education /
+# address are free text ("Penuh Waktu", "Minimal S1", "Jakarta Selatan, DKI
+# Jakarta"), so they get a full-text index (word tokenizer, lowercased) and
+# are filtered with MatchText; see retrieval/filters.py.
+PAYLOAD_INDEX_FIELDS: Dict[str, PayloadSchemaType] = {
+    "job_id": PayloadSchemaType.KEYWORD,
+    "field": PayloadSchemaType.KEYWORD,
+    "source": PayloadSchemaType.KEYWORD,
+    "work_type": PayloadSchemaType.TEXT,
+    "education": PayloadSchemaType.TEXT,
+    "address": PayloadSchemaType.TEXT,
+}
+
+# Payload keys /retrieve asks Qdrant for
+RETRIEVAL_PAYLOAD_KEYS: List[str] = ["job_id"]
+
+
+def point_payload(
+    payload: Dict[str, Any],
+    *,
+    point_id: str,
+    text: Optional[str] = None,
+    profile: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Payload yang benar-benar disimpan di Qdrant untuk satu chunk.
+    """
+    profile = profile or PAYLOAD_PROFILE
+    if profile not in PAYLOAD_PROFILES:
+        raise ValueError(f"Unknown PAYLOAD_PROFILE '{profile}', expected one of {list(PAYLOAD_PROFILES)}")
+
+    keys = PAYLOAD_PROFILES[profile]
+    if keys is None:
+        final_payload = dict(payload)
+        final_payload["point_id"] = point_id
+        if text is not None:
+            final_payload["text"] = text
+        return final_payload
+
+    return {k: payload[k] for k in keys if k in payload}
+
+
+# Collection profile for the "dense" vector (env COLLECTION_PROFILE):
+# - "default"       : float32 in RAM (original behaviour)
+# - "scalar"        : int8 scalar quantization in RAM, originals in RAM
+# - "scalar_ondisk" : int8 in RAM, float32 originals on disk (rescored)
+# - "binary"        : 1-bit binary quantization in RAM, originals on disk,
+#                     oversampled + rescored (best for >= 1024-dim models)
+COLLECTION_PROFILE = os.getenv("COLLECTION_PROFILE", "default").lower()
+
+COLLECTION_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {"quantization": None, "on_disk": False},
+    "scalar": {"quantization": "scalar", "on_disk": False, "rescore": True, "oversampling": 1.5},
+    "scalar_ondisk": {"quantization": "scalar", "on_disk": True, "rescore": True, "oversampling": 2.0},
+    "binary": {"quantization": "binary", "on_disk": True, "rescore": True, "oversampling": 3.0},
+}
+
+
+def collection_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Profile + env overrides (QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT,
+    QDRANT_HNSW_EF, QDRANT_OVERSAMPLING).
+    """
+    name = (name or COLLECTION_PROFILE).lower()
+    if name not in COLLECTION_PROFILES:
+        raise ValueError(f"Unknown COLLECTION_PROFILE '{name}', expected one of {list(COLLECTION_PROFILES)}")
+
+    profile = dict(COLLECTION_PROFILES[name])
+    for key, env, cast in [
+        ("hnsw_m", "QDRANT_HNSW_M", int),
+        ("hnsw_ef_construct", "QDRANT_HNSW_EF_CONSTRUCT", int),
+        ("hnsw_ef", "QDRANT_HNSW_EF", int),
+        ("oversampling", "QDRANT_OVERSAMPLING", float),
+    ]:
+        if os.getenv(env):
+            profile[key] = cast(os.getenv(env))
+    return profile
+
+
+def dense_vector_params(
+    size: int,
+    distance: Distance = Distance.COSINE,
+    profile: Optional[str] = None,
+) -> VectorParams:
+    """
+    VectorParams for the "dense" vector according to the collection profile.
+    """
+    p = collection_profile(profile)
+
+    quantization = None
+    if p.get("quantization") == "scalar":
+        quantization = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif p.get("quantization") == "binary":
+        quantization = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+
+    hnsw = None
+    if p.get("hnsw_m") or p.get("hnsw_ef_construct"):
+        hnsw = HnswConfigDiff(m=p.get("hnsw_m"), ef_construct=p.get("hnsw_ef_construct"))
+
+    return VectorParams(
+        size=size,
+        distance=distance,
+        on_disk=p.get("on_disk") or None,
+        hnsw_config=hnsw,
+        quantization_config=quantization,
+    )
+
+
+def dense_search_params(profile: Optional[str] = None) -> Optional[SearchParams]:
+    """
+    Query-time params for the dense prefetch (rescoring / oversampling / hnsw_ef).
+    None for the default profile, so the request is unchanged.
+    """
+    p = collection_profile(profile)
+    quantization = None
+    if p.get("quantization"):
+        quantization = QuantizationSearchParams(
+            rescore=p.get("rescore", True),
+            oversampling=p.get("oversampling"),
+        )
+    if quantization is None and not p.get("hnsw_ef"):
+        return None
+    return SearchParams(hnsw_ef=p.get("hnsw_ef"), quantization=quantization)
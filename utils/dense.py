@@ -0,0 +1,39 @@
+"""
+Shared dense vector utilities (embedding dimension handling).
+Used by both store (indexing) and retrieval (querying).
+
+EMBEDDING_DIMENSIONS shortens dense vectors for models that support it
+(Matryoshka-style embeddings such as text-embedding-3-*). The value is sent
+as the `dimensions` parameter of the embeddings API (unless
+EMBEDDING_DIMENSIONS_PARAM=false) and vectors that still come back longer are
+truncated and re-normalised client side, so ingest and query always agree.
+"""
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None  # None = model default
+EMBEDDING_DIMENSIONS_PARAM = os.getenv("EMBEDDING_DIMENSIONS_PARAM", "true").lower() == "true"
+
+
+def embedding_request_kwargs(dimensions: Optional[int] = EMBEDDING_DIMENSIONS) -> Dict[str, Any]:
+    """
+    Extra kwargs for client.embeddings.create(...).
+    """
+    if dimensions and EMBEDDING_DIMENSIONS_PARAM:
+        return {"dimensions": dimensions}
+    return {}
+
+
+def fit_dimensions(vector: List[float], dimensions: Optional[int] = EMBEDDING_DIMENSIONS) -> List[float]:
+    """
+    Truncate to `dimensions` and L2 re-normalise (no-op if already short enough).
+    """
+    if not dimensions or len(vector) <= dimensions:
+        return vector
+    head = vector[:dimensions]
+    norm = math.sqrt(sum(v * v for v in head))
+    if norm == 0:
+        return head
+    return [v / norm for v in head]
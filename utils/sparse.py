@@ -1,20 +1,76 @@
 """
 Shared sparse vector utilities for hybrid search.
 Used by both store (indexing) and retrieval (querying).
+
+Two schemes are supported (env SPARSE_SCHEME):
+- "bm25"   : documents get BM25 TF saturation + length normalization,
+             queries get binary weights, and Qdrant applies IDF at query
+             time via the `idf` modifier on the "sparse" vector.
+- "hashed" : legacy l2-normalised log-TF hashing (no IDF).
+
+Both schemes share the same analyzer (tokenize -> stopwords -> optional
+light stemming) and md5 hashing trick, so the sparse index stays
+vocabulary-free. Document vectors can be capped to the SPARSE_MAX_TERMS
+highest-weighted terms to keep the sparse index small.
 """
+import os
 import re
 import math
 import hashlib
 from collections import Counter, defaultdict
-from typing import List
+from typing import Dict, FrozenSet, List, Optional
 
-from qdrant_client.models import SparseVector
+from qdrant_client.models import Modifier, SparseVector, SparseVectorParams
 
 
 # Sparse vector configuration
 SPARSE_DIM = 262_144  # 2^18 - large enough to minimize collisions
 TOKEN_RE = re.compile(r"[a-zA-Z0-9_+#\.-]+")
 
+SPARSE_SCHEME = os.getenv("SPARSE_SCHEME", "bm25").lower()  # "bm25" or "hashed"
+
+# BM25 parameters. Qdrant computes IDF over the collection, so only the
+# TF part (k1, b, average chunk length in tokens) is done client side.
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+BM25_AVG_LEN = float(os.getenv("BM25_AVG_LEN", "64"))
+
+# Pruning. SPARSE_STOPWORDS: comma list of "id", "en", "template" (or "none").
+# SPARSE_STEMMER: "light" or "none". SPARSE_MAX_TERMS: 0 = no cap.
+SPARSE_STOPWORDS = os.getenv("SPARSE_STOPWORDS", "id,en,template")
+SPARSE_STEMMER = os.getenv("SPARSE_STEMMER", "none").lower()
+SPARSE_MAX_TERMS = int(os.getenv("SPARSE_MAX_TERMS", "64"))
+
+
+STOPWORDS_ID = frozenset("""
+ada adalah agar akan aku anda antara apa apabila atas atau bagi bahwa baik
+banyak beberapa belum berbagai bisa dalam dan dapat dari demikian dengan di
+dia harus hingga ia ialah ini itu jadi jika juga kalau kami kamu karena ke
+kepada kita lagi lain lebih maka masih melalui mereka namun nya oleh pada
+para per pula pun saat saja sampai sangat saya se sebagai sebelum sedang
+sehingga sekitar selama semua sendiri seperti serta setelah setiap sudah
+supaya tanpa telah tentang terhadap tersebut tetapi tidak untuk yaitu yakni
+yang
+""".split())
+
+STOPWORDS_EN = frozenset("""
+a about above after all also am an and any are as at be been being both but
+by can could did do does doing during each few for from further had has have
+having he her here hers him his how i if in into is its me more most my no
+nor not of off on once only or other our ours out over own same she should so
+some such than that the their them then there these they this those through
+to too under until up very was we were what when where which while who whom
+why will with would you your yours
+""".split())  # "it" intentionally kept: "IT support", "staff IT"
+
+# Boilerplate words added by document_splitting_multi to every chunk of a field.
+STOPWORDS_TEMPLATE = frozenset("""
+posisi perusahaan keterampilan teknis dibutuhkan meliputi persyaratan
+tambahan diperlukan deskripsi diunggah ditawarkan
+""".split())
+
+_STOPWORD_SETS = {"id": STOPWORDS_ID, "en": STOPWORDS_EN, "template": STOPWORDS_TEMPLATE}
+
 
 def tokenize(text: str) -> List[str]:
     """
@@ -26,6 +82,81 @@ def tokenize(text: str) -> List[str]:
     return TOKEN_RE.findall(text.lower())
 
 
+def build_stopwords(spec: str) -> FrozenSet[str]:
+    """
+    "id,en,template" -> union of the named stopword lists ("none" / "" -> empty).
+    """
+    words = set()
+    for name in (spec or "").split(","):
+        words |= _STOPWORD_SETS.get(name.strip().lower(), frozenset())
+    return frozenset(words)
+
+
+DEFAULT_STOPWORDS = build_stopwords(SPARSE_STOPWORDS)
+
+_ID_PARTICLES = ("lah", "kah", "tah", "pun")
+_ID_POSSESSIVES = ("nya", "ku", "mu")
+
+
+def light_stem(token: str) -> str:
+    """
+    Very light ID/EN suffix stripping, only for plain alphabetic tokens
+    (skill tokens like node.js, c++, s1 are left untouched):
+    - ID: particles (-lah, -kah, -tah, -pun) then possessives (-nya, -ku, -mu)
+    - EN: -ies -> -y, -ing, -ed, plural -s (not -ss/-is/-us: bisnis, status)
+    """
+    if len(token) <= 4 or not token.isalpha():
+        return token
+
+    for suf in _ID_PARTICLES:
+        if token.endswith(suf) and len(token) - len(suf) >= 4:
+            token = token[: -len(suf)]
+            break
+    for suf in _ID_POSSESSIVES:
+        if token.endswith(suf) and len(token) - len(suf) >= 4:
+            return token[: -len(suf)]
+
+    if token.endswith("ies") and len(token) > 5:
+        return token[:-3] + "y"
+    if token.endswith("ing") and len(token) > 6:
+        return token[:-3]
+    if token.endswith("ed") and len(token) > 5:
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "is", "us")):
+        return token[:-1]
+    return token
+
+
+def analyze(
+    text: str,
+    *,
+    stopwords: Optional[FrozenSet[str]] = None,
+    stemmer: Optional[str] = None,
+) -> List[str]:
+    """
+    tokenize -> drop stopwords -> optional light stemming.
+    None means "use the configured default" (SPARSE_STOPWORDS / SPARSE_STEMMER).
+    """
+    stopwords = DEFAULT_STOPWORDS if stopwords is None else stopwords
+    stemmer = SPARSE_STEMMER if stemmer is None else stemmer
+
+    toks = [t for t in tokenize(text) if t not in stopwords]
+    if stemmer == "light":
+        toks = [light_stem(t) for t in toks]
+    return toks
+
+
+def top_terms(tf: Counter, max_terms: int) -> Counter:
+    """
+    Keep the `max_terms` most frequent tokens. Ties are broken by token
+    length (longer tokens tend to be more specific: "kubernetes" > "tim").
+    """
+    if max_terms <= 0 or len(tf) <= max_terms:
+        return tf
+    ranked = sorted(tf.items(), key=lambda kv: (kv[1], len(kv[0])), reverse=True)
+    return Counter(dict(ranked[:max_terms]))
+
+
 def stable_hash(token: str) -> int:
     """
     Deterministic hash across sessions (python's hash() is random per session).
@@ -34,27 +165,40 @@ def stable_hash(token: str) -> int:
     return int(h, 16)
 
 
+def hashed_term_frequencies(tf: Counter, *, dim: int = SPARSE_DIM) -> Dict[int, int]:
+    """
+    Map token frequencies to hash buckets (collisions are merged).
+    """
+    bucket: Dict[int, int] = defaultdict(int)
+    for tok, freq in tf.items():
+        bucket[stable_hash(tok) % dim] += freq
+    return bucket
+
+
 def text_to_sparse_vector(
     text: str,
     *,
     dim: int = SPARSE_DIM,
     tf_weight: str = "log",  # "raw" or "log"
     l2_normalize: bool = True,
+    max_terms: int = 0,
+    stopwords: Optional[FrozenSet[str]] = None,
+    stemmer: Optional[str] = None,
 ) -> SparseVector:
     """
     Create sparse vector using lexical hashing:
     - index = md5(token) % dim
     - value = tf (raw or 1+log(tf))
-    
+
     This is not exact BM25, but works well for hybrid dense+sparse search:
     - Dense: semantic understanding
     - Sparse: keyword matching (exact token presence)
     """
-    toks = tokenize(text)
+    toks = analyze(text, stopwords=stopwords, stemmer=stemmer)
     if not toks:
         return SparseVector(indices=[], values=[])
 
-    tf = Counter(toks)
+    tf = top_terms(Counter(toks), max_terms)
 
     bucket = defaultdict(float)
     for tok, freq in tf.items():
@@ -76,6 +220,87 @@ def text_to_sparse_vector(
     return SparseVector(indices=indices, values=values)
 
 
+def text_to_bm25_vector(
+    text: str,
+    *,
+    dim: int = SPARSE_DIM,
+    k1: float = BM25_K1,
+    b: float = BM25_B,
+    avg_len: float = BM25_AVG_LEN,
+    max_terms: int = SPARSE_MAX_TERMS,
+    stopwords: Optional[FrozenSet[str]] = None,
+    stemmer: Optional[str] = None,
+) -> SparseVector:
+    """
+    Document side of BM25:
+    - value = tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avg_len))
+
+    IDF is NOT included here; the collection must use Modifier.IDF so
+    Qdrant multiplies by IDF (kept up to date as documents are added).
+
+    Document length is measured after stopword removal but before the
+    `max_terms` cap, so pruning does not inflate the remaining weights.
+    """
+    toks = analyze(text, stopwords=stopwords, stemmer=stemmer)
+    if not toks:
+        return SparseVector(indices=[], values=[])
+
+    doc_len = len(toks)
+    norm = k1 * (1.0 - b + b * doc_len / avg_len)
+
+    bucket = hashed_term_frequencies(top_terms(Counter(toks), max_terms), dim=dim)
+    indices = list(bucket.keys())
+    values = [bucket[i] * (k1 + 1.0) / (bucket[i] + norm) for i in indices]
+
+    return SparseVector(indices=indices, values=values)
+
+
+def query_to_bm25_vector(
+    text: str,
+    *,
+    dim: int = SPARSE_DIM,
+    stopwords: Optional[FrozenSet[str]] = None,
+    stemmer: Optional[str] = None,
+) -> SparseVector:
+    """
+    Query side of BM25: every unique term gets weight 1.0,
+    so the score is sum(idf * doc_tf_weight) over matched terms.
+    """
+    toks = analyze(text, stopwords=stopwords, stemmer=stemmer)
+    if not toks:
+        return SparseVector(indices=[], values=[])
+
+    indices = list(hashed_term_frequencies(Counter(toks), dim=dim).keys())
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
+
+
+def document_sparse_vector(text: str) -> SparseVector:
+    """
+    Sparse vector for an indexed chunk, using the configured scheme.
+    """
+    if SPARSE_SCHEME == "bm25":
+        return text_to_bm25_vector(text)
+    return text_to_sparse_vector(text, max_terms=SPARSE_MAX_TERMS)
+
+
+def query_sparse_vector(text: str) -> SparseVector:
+    """
+    Sparse vector for a user query, using the configured scheme.
+    """
+    if SPARSE_SCHEME == "bm25":
+        return query_to_bm25_vector(text)
+    return text_to_sparse_vector(text)
+
+
+def sparse_vector_params() -> SparseVectorParams:
+    """
+    Config for the "sparse" named vector. BM25 relies on Qdrant's IDF modifier.
+    """
+    if SPARSE_SCHEME == "bm25":
+        return SparseVectorParams(modifier=Modifier.IDF)
+    return SparseVectorParams()
+
+
 # Alias for backward compatibility
-sparse_query_manual = text_to_sparse_vector
+sparse_query_manual = query_sparse_vector
 text_to_sparse_hash_vector = text_to_sparse_vector